@@ -0,0 +1,185 @@
+"""Small DAG orchestrator for the underwriting agents.
+
+Each ``Node`` declares the names of its inputs: either run inputs (e.g.
+``applicant_data``) or other nodes. ``AgentGraph.run`` starts every node as
+soon as its inputs are available, so independent nodes run in parallel.
+Successful node outputs are memoized on a hash of the node's name, salt and
+input values (its fingerprint); a node whose function raises or returns None
+uses its fallback. A run can also be given the ``memo`` of an earlier run, so
+nodes whose fingerprint is unchanged reuse that output without touching the
+shared cache.
+"""
+import copy
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from generation_profiles import ResponseCache
+from job_executor import checkpoint
+
+NODE_OK = "ok"
+NODE_CACHED = "cached"
+NODE_FALLBACK = "fallback"
+NODE_REUSED = "reused"
+
+
+class Node:
+    """One step of the graph.
+
+    fn          -- called with the declared inputs as keyword arguments
+    inputs      -- names of run inputs or upstream nodes
+    fallback    -- called with the same arguments when fn raises or returns None
+    cacheable   -- memoize successful outputs (off for nodes with side effects)
+    cache_salt  -- extra key material for settings not passed as inputs (model, API key hash)
+    label       -- progress text shown when the node starts
+    """
+
+    def __init__(self, name, fn, inputs=(), fallback=None, cacheable=True, cache_salt="", label=None):
+        self.name = name
+        self.fn = fn
+        self.inputs = tuple(inputs)
+        self.fallback = fallback
+        self.cacheable = cacheable
+        self.cache_salt = cache_salt
+        self.label = label or name
+
+    def cache_key(self, values):
+        raw = json.dumps([self.name, self.cache_salt, [values[name] for name in self.inputs]], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def __repr__(self):
+        return f"Node({self.name!r}, inputs={list(self.inputs)})"
+
+
+class GraphRun:
+    """Outputs of every node, the per-node timing trace and the memo for the next run"""
+
+    def __init__(self, outputs, trace, elapsed, memo):
+        self.outputs = outputs
+        self.trace = trace
+        self.elapsed = elapsed
+        self.memo = memo
+
+    def status(self, name):
+        return next((entry['status'] for entry in self.trace if entry['node'] == name), None)
+
+
+class AgentGraph:
+    def __init__(self, nodes, run_inputs=()):
+        self.nodes = {}
+        for node in nodes:
+            if node.name in self.nodes:
+                raise ValueError(f"duplicate node {node.name!r}")
+            self.nodes[node.name] = node
+        self.run_inputs = set(run_inputs)
+        self.order = self._topological_order()
+
+    def _topological_order(self):
+        for node in self.nodes.values():
+            unknown = [name for name in node.inputs if name not in self.nodes and name not in self.run_inputs]
+            if unknown:
+                raise ValueError(f"node {node.name!r} has unknown inputs: {', '.join(unknown)}")
+        order, state = [], {}
+
+        def visit(name, path):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"cycle in agent graph: {' -> '.join(path + [name])}")
+            state[name] = "visiting"
+            for dependency in self.nodes[name].inputs:
+                if dependency in self.nodes:
+                    visit(dependency, path + [name])
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.nodes:
+            visit(name, [])
+        return order
+
+    def run(self, inputs, max_workers=4, cache=None, previous=None, progress_callback=None, cancel_event=None):
+        """Run every node; returns a GraphRun. Raises JobCancelled if ``cancel_event`` is set.
+
+        previous -- ``GraphRun.memo`` of an earlier run ({node: {'fingerprint', 'output'}})
+        """
+        missing = self.run_inputs - set(inputs)
+        if missing:
+            raise ValueError(f"missing run inputs: {', '.join(sorted(missing))}")
+
+        values = dict(inputs)
+        trace = []
+        lock = threading.Lock()
+        run_start = time.perf_counter()
+        pending = {name: set(d for d in node.inputs if d in self.nodes) for name, node in self.nodes.items()}
+        running = {}
+        memo = {}
+        previous = previous or {}
+
+        def execute(node, arguments):
+            start = time.perf_counter()
+            status, output = NODE_OK, None
+            key = node.cache_key(values) if node.cacheable else None
+            if key is not None and previous.get(node.name, {}).get('fingerprint') == key:
+                status, output = NODE_REUSED, copy.deepcopy(previous[node.name]['output'])
+            elif key is not None and cache is not None:
+                output = cache.get(key)
+                if output is not None:
+                    status, output = NODE_CACHED, copy.deepcopy(output)
+            if output is None:
+                try:
+                    output = node.fn(**arguments)
+                except Exception as exc:
+                    # Only a fallback can absorb the failure; otherwise keep the original cause
+                    if node.fallback is None:
+                        raise RuntimeError(f"node {node.name!r} failed and has no fallback: {exc}") from exc
+                    output = None
+                if output is None:
+                    if node.fallback is None:
+                        raise RuntimeError(f"node {node.name!r} returned no output and has no fallback")
+                    status, output = NODE_FALLBACK, node.fallback(**arguments)
+                elif key is not None and cache is not None:
+                    cache.put(key, copy.deepcopy(output))
+            end = time.perf_counter()
+            with lock:
+                if key is not None and status != NODE_FALLBACK:
+                    memo[node.name] = {'fingerprint': key, 'output': copy.deepcopy(output)}
+                trace.append({
+                    'node': node.name,
+                    'status': status,
+                    'start_ms': round((start - run_start) * 1000, 2),
+                    'duration_ms': round((end - start) * 1000, 2),
+                    'thread': threading.current_thread().name
+                })
+            return output
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent-node") as pool:
+            while pending or running:
+                for name in [n for n in self.order if n in pending and not pending[n]]:
+                    node = self.nodes[name]
+                    done_share = len(values) - len(inputs)
+                    checkpoint(cancel_event, progress_callback, 10 + int(80 * done_share / len(self.nodes)), node.label)
+                    del pending[name]
+                    running[pool.submit(execute, node, {i: values[i] for i in node.inputs})] = name
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    values[name] = future.result()
+                    for waiting in pending.values():
+                        waiting.discard(name)
+
+        trace.sort(key=lambda entry: entry['start_ms'])
+        outputs = {name: values[name] for name in self.nodes}
+        return GraphRun(outputs, trace, time.perf_counter() - run_start, memo)
+
+
+def format_trace(trace):
+    """One line per node for logs and reports"""
+    return [
+        f"{entry['node']:<20} {entry['status']:<8} start {entry['start_ms']:>8.1f}ms  took {entry['duration_ms']:>8.1f}ms"
+        for entry in trace
+    ]
+
+
+node_cache = ResponseCache(max_entries=1024)
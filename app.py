@@ -1,12 +1,24 @@
 import streamlit as st
+import functools
 import json
-from datetime import datetime
-import pandas as pd
-import requests
+import math
 import time
 import os
-from langchain_huggingface import HuggingFaceEndpoint, ChatHuggingFace
-from langchain_core.messages import HumanMessage
+import sqlite3
+from underwriting_core import (
+    analyze_with_ai_agents, analyze_with_fallback, analysis_time, report_content_hash,
+    generate_json_report, generate_text_report, get_model_router, get_confidence_gate,
+    get_llm_client, get_llm_client_pool, prewarm_llm_clients, get_assessment_store
+)
+from structured_decision import format_decision
+from pricing_engine import format_quote
+from model_router import RISK_BOUNDARIES
+from llm_client_pool import looks_like_api_key
+from rerun_metrics import RerunMetrics
+from job_executor import AnalysisJobExecutor, JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED
+from claims_editor import render_claims_controls, render_claims_grid, commit_claims
+from assessment_store import next_page_cursor
+from portfolio_analytics import portfolio_summary
 
 st.set_page_config(
     page_title="Underwriting Assistant AI",
@@ -51,7 +63,7 @@ st.markdown("""
         border-left: 4px solid #667eea;
         margin: 1rem 0;
     }
-    .stButton>button {
+    .stButton>button, .stFormSubmitButton>button {
         width: 100%;
         background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
         color: white;
@@ -61,7 +73,7 @@ st.markdown("""
         font-weight: 600;
         transition: all 0.3s;
     }
-    .stButton>button:hover {
+    .stButton>button:hover, .stFormSubmitButton>button:hover {
         transform: translateY(-2px);
         box-shadow: 0 4px 12px rgba(102, 126, 234, 0.4);
     }
@@ -111,24 +123,44 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+def get_default_api_key():
+    """API key configured for the deployment (environment or Streamlit secrets)."""
+    try:
+        return os.environ.get("HUGGINGFACE_API_KEY") or st.secrets.get("HUGGINGFACE_API_KEY", "")
+    except:
+        return os.environ.get("HUGGINGFACE_API_KEY", "")
+
 @st.cache_resource
-def get_llm_client(api_key):
-    """Initializes and caches the LLM client based on the provided API key."""
-    if not api_key:
-        return None
-        
+def prewarm_default_llm_clients():
+    """Start building clients for the deployment's API key once per process."""
+    prewarm_llm_clients(get_default_api_key())
+    return True
+
+def metrics_frame(metrics):
+    """One row per key of a {name: {metric: value}} dict (pandas is only imported when a table is shown)"""
+    import pandas as pd
+    return pd.DataFrame.from_dict(metrics, orient='index')
+
+@st.cache_resource
+def get_job_executor():
+    """Process-wide background executor shared by all sessions."""
+    max_workers = int(os.environ.get("UNDERWRITING_MAX_WORKERS", "4"))
+    return AnalysisJobExecutor(max_workers=max_workers)
+
+def records_frame(rows):
+    """DataFrame of a list of row dicts (pandas is only imported when a table is shown)"""
+    import pandas as pd
+    return pd.DataFrame(rows)
+
+def save_assessment(results, applicant_data, claims_history, external_reports):
+    """Store a finished analysis in the history database; the app keeps working if the store is unavailable."""
+    store = get_assessment_store()
+    if store is None:
+        return
     try:
-        llm = HuggingFaceEndpoint(
-            repo_id="mistralai/Mixtral-8x7B-Instruct-v0.1",
-            huggingfacehub_api_token=api_key, # Use the passed key
-            temperature=0.7,
-            max_new_tokens=500,
-            client_kwargs={"timeout": 60} 
-        )
-        return ChatHuggingFace(llm=llm)
-    except Exception as e:
-        st.error(f"Failed to initialize LLM: {e}")
-        return None
+        store.save(results, applicant_data, claims_history, external_reports)
+    except sqlite3.Error as e:
+        st.warning(f"⚠️ The assessment could not be saved to history: {e}")
 
 if 'ai_analysis_results' not in st.session_state:
     st.session_state.ai_analysis_results = None
@@ -144,6 +176,29 @@ if 'current_claims_history' not in st.session_state:
     st.session_state.current_claims_history = []
 if 'current_external_reports' not in st.session_state:
     st.session_state.current_external_reports = {}
+if 'ai_node_memo' not in st.session_state:
+    st.session_state.ai_node_memo = {}
+if 'fallback_node_memo' not in st.session_state:
+    st.session_state.fallback_node_memo = {}
+if 'ai_job_inputs' not in st.session_state:
+    st.session_state.ai_job_inputs = None
+if 'history_cursors' not in st.session_state:
+    st.session_state.history_cursors = [None]
+if 'exposure_results' not in st.session_state:
+    st.session_state.exposure_results = None
+if 'cutoff_results' not in st.session_state:
+    st.session_state.cutoff_results = None
+if 'ai_job_id' not in st.session_state:
+    st.session_state.ai_job_id = None
+if 'ai_job_notice' not in st.session_state:
+    st.session_state.ai_job_notice = None
+if 'rerun_metrics' not in st.session_state:
+    st.session_state.rerun_metrics = RerunMetrics()
+
+DEFAULT_CLAIMS = [
+    {'type': "Auto", 'amount': 4500, 'date': '2023-01-15'},
+    {'type': "Property", 'amount': 8000, 'date': '2024-03-20'}
+]
 
 OCCUPATIONS = sorted([
     "Software Engineer", "Data Scientist", "DevOps Engineer", "Cloud Architect",
@@ -196,603 +251,566 @@ OCCUPATIONS = sorted([
     "Business Owner", "Self-Employed", "Contractor", "Other"
 ])
 
-class UnderwritingAgent:
-    def __init__(self, api_key=None):
-        self.chat_model = get_llm_client(api_key) 
-    
-    def query_llm(self, prompt):
-        """Query LangChain LLM Client"""
-        if self.chat_model is None:
-            return None
-        
-        try:
-            response = self.chat_model.invoke([HumanMessage(content=prompt)])
-            return response.content.strip()
-        except Exception as e:
-            return None
-        
-
-class DataSummarizationAgent(UnderwritingAgent):
-
-    def summarize_applicant(self, applicant_data):
-        """Agent 1: Summarize applicant information - AI Mode"""
-        prompt = f"""You are an expert insurance underwriting assistant. Provide a comprehensive analysis of the following applicant:
-
-APPLICANT PROFILE:
-- Name: {applicant_data['name']}
-- Age: {applicant_data['age']} years old
-- Occupation: {applicant_data['occupation']}
-- Location: {applicant_data['location']}
-- Requested Coverage: ${applicant_data['coverage_amount']:,}
-- Health Status: {applicant_data['health_status']}
-- Lifestyle Factors: {applicant_data['lifestyle_factors']}
-
-Provide a detailed professional summary with the following structure:
-
-<strong>APPLICANT OVERVIEW:</strong>
-[10 sentences providing general profile overview]
-
-<strong>KEY RISK INDICATORS:</strong>
-• Demographic Risk: [Analyze age and occupation factors]
-• Health Risk: [Analyze health status and lifestyle]
-• Financial Exposure: [Analyze coverage amount requested]
-• Geographic Risk: [Analyze location factors]
-
-<strong>INITIAL ASSESSMENT:</strong>
-[5 sentences summarizing preliminary risk profile]
-
-Format your response with clear bullet points and bold headers as shown above."""
-
-        return self.query_llm(prompt)
-    
-    def fallback_summarize(self, applicant_data):
-        """Fallback summarization using rule-based logic"""
-        age_risk = self._assess_age_risk(applicant_data['age'])
-        occupation_risk = self._assess_occupation_risk(applicant_data['occupation'])
-        health_risk = self._assess_health_risk(applicant_data['health_status'])
-        
-        summary = f"""<strong>APPLICANT OVERVIEW:</strong>
-{applicant_data['name']}, a {applicant_data['age']}-year-old {applicant_data['occupation']} from {applicant_data['location']}, is seeking ${applicant_data['coverage_amount']:,} in coverage. The applicant reports {applicant_data['health_status'].lower()} health status with lifestyle factors including {applicant_data['lifestyle_factors']}.
-
-<strong>KEY RISK INDICATORS:</strong>
-• Demographic Risk: {age_risk} - Age {applicant_data['age']} contributes a baseline demographic risk profile
-• Health Risk: {health_risk} - Current health status and lifestyle choices are contributing factors
-• Financial Exposure: Coverage amount of ${applicant_data['coverage_amount']:,} represents a {'significant' if applicant_data['coverage_amount'] > 1000000 else 'moderate' if applicant_data['coverage_amount'] > 500000 else 'standard'} financial exposure
-• Geographic Risk: Location in {applicant_data['location']} presents {'urban' if 'City' in applicant_data['location'] or any(city in applicant_data['location'] for city in ['York', 'Angeles', 'Chicago', 'Houston', 'Phoenix', 'Philadelphia', 'San Antonio', 'San Diego', 'Dallas', 'San Jose', 'Austin', 'Jacksonville', 'Miami', 'Denver', 'Boston', 'Seattle', 'Washington', 'Atlanta']) else 'suburban/rural'} risk considerations
-
-<strong>INITIAL ASSESSMENT:</strong>
-{occupation_risk} Overall preliminary risk assessment indicates a {'favorable' if age_risk == 'Low' and health_risk == 'Low' else 'moderate' if age_risk in ['Low', 'Moderate'] and health_risk in ['Low', 'Moderate'] else 'elevated'} risk profile requiring further evaluation."""
-        
-        return summary
-    
-    def _assess_age_risk(self, age):
-        if age < 25:
-            return "High"
-        elif age < 35:
-            return "Low"
-        elif age < 55:
-            return "Low"
-        elif age < 65:
-            return "Moderate"
-        else:
-            return "High"
-    
-    def _assess_occupation_risk(self, occupation):
-        high_risk = ["pilot", "firefighter", "police officer", "stunt person", "construction worker", "roofer", "electrician"]
-        medium_risk = ["nurse", "doctor", "teacher", "lawyer", "truck driver"]
-        
-        occupation_lower = occupation.lower()
-        if any(h in occupation_lower for h in high_risk):
-            return "This high-risk occupation requires enhanced scrutiny."
-        elif any(m in occupation_lower for m in medium_risk):
-            return "This moderate-risk occupation warrants standard underwriting procedures."
-        else:
-            return "This occupation presents standard underwriting risk factors."
-    
-    def _assess_health_risk(self, health_status):
-        risk_map = {
-            "Excellent": "Low",
-            "Good": "Low",
-            "Fair": "Moderate",
-            "Poor": "High"
-        }
-        return risk_map.get(health_status, "Moderate")
-
-class ClaimsAnalysisAgent(UnderwritingAgent):
-    def analyze_claims(self, claims_history):
-        """Agent 2: Analyze claims history - AI Mode"""
-        if not claims_history:
-            prompt = """You are an insurance claims analyst. Analyze this applicant profile with NO previous claims on record and provide insights about risk patterns.
-
-Profile: Applicant with no previous claims history.
-
-Provide 10 sentences analysis focusing on the positive implications of a clean claims history."""
-            return self.query_llm(prompt)
-        
-        total_claims = len(claims_history)
-        total_amount = sum([c['amount'] for c in claims_history])
-        claim_types = ', '.join(set([c['type'] for c in claims_history]))
-        
-        prompt = f"""You are an insurance claims analyst. Analyze the following claims history and provide insights about risk patterns:
-
-Claims Summary:
-- Total Number of Claims: {total_claims}
-- Total Claim Amount: ${total_amount:,}
-- Types of Claims: {claim_types}
-- Claims Details: {json.dumps(claims_history, indent=2)}
-
-Provide 10 sentences analysis focusing on frequency, severity, and any concerning patterns."""
-
-        return self.query_llm(prompt)
-    
-    def fallback_analyze_claims(self, claims_history):
-        """Fallback claims analysis using rule-based logic"""
-        if not claims_history:
-            return "No previous claims on record. This is an excellent indicator for risk assessment, suggesting responsible and low-risk behavior throughout the applicant's insurance history."
-        
-        total_claims = len(claims_history)
-        total_amount = sum([c['amount'] for c in claims_history])
-        avg_claim = total_amount / total_claims if total_claims > 0 else 0
-        claim_types = set([c['type'] for c in claims_history])
-        
-        frequency_assessment = ""
-        if total_claims == 1:
-            frequency_assessment = "Single claim on record"
-        elif total_claims <= 2:
-            frequency_assessment = "Limited claims history"
-        elif total_claims <= 4:
-            frequency_assessment = "Moderate claims frequency"
-        else:
-            frequency_assessment = "High claims frequency pattern"
-        
-        severity_assessment = ""
-        if avg_claim < 5000:
-            severity_assessment = "claims are relatively low-severity"
-        elif avg_claim < 15000:
-            severity_assessment = "claims show moderate severity"
-        else:
-            severity_assessment = "claims indicate significant severity"
-        
-        diversity_note = f"involving {len(claim_types)} different claim categories" if len(claim_types) > 1 else "concentrated in a single category"
-        
-        return f"{frequency_assessment} with total claims value of ${total_amount:,}. The claims {severity_assessment}, averaging ${avg_claim:,.0f} per incident, {diversity_note}. This pattern suggests {'elevated' if total_claims > 3 else 'manageable'} risk exposure based on historical claims behavior."
-
-class RiskFactorAgent(UnderwritingAgent):
-    def identify_risk_factors(self, applicant_data, claims_history, external_reports):
-        """Agent 3: Identify key risk factors - AI Mode"""
-        prompt = f"""You are a risk assessment specialist. Identify the top 3-5 key risk factors based on:
-
-Applicant: Age {applicant_data['age']}, {applicant_data['occupation']}, Health: {applicant_data['health_status']}
-Lifestyle: {applicant_data['lifestyle_factors']}
-Claims: {len(claims_history)} previous claims
-Credit Score: {external_reports['credit_score']}
-Criminal Record: {'Yes' if external_reports['criminal_record'] else 'No'}
-Driving Record: {external_reports['driving_record']}
-
-List the most significant risk factors in bullet points, each with a brief explanation."""
-
-        return self.query_llm(prompt)
-    
-    def fallback_identify_risk_factors(self, applicant_data, claims_history, external_reports):
-        """Fallback risk factor identification using rule-based logic"""
-        risk_factors = []
-        
-        if applicant_data['age'] < 25:
-            risk_factors.append("• Youth Factor: Applicant under 25 years old presents elevated risk due to less experience and statistical higher incident rates")
-        elif applicant_data['age'] > 65:
-            risk_factors.append("• Advanced Age: Applicant over 65 years old presents age-related risk factors")
-        
-        if len(claims_history) > 3:
-            risk_factors.append(f"• Claims History: {len(claims_history)} previous claims indicate established pattern of claims, suggesting elevated risk profile")
-        elif len(claims_history) > 0:
-            risk_factors.append(f"• Prior Claims: {len(claims_history)} previous claim(s) on record affects risk assessment")
-        
-        if applicant_data['health_status'] == 'Poor':
-            risk_factors.append("• Health Concerns: Poor health status represents a significant risk factor for coverage viability")
-        
-        if 'Smoker' in applicant_data['lifestyle_factors']:
-            risk_factors.append("• Smoking: Tobacco use is a substantial risk multiplier in underwriting assessment")
-        if 'High-risk sports' in applicant_data['lifestyle_factors']:
-            risk_factors.append("• High-Risk Activities: Participation in dangerous sports elevates overall risk exposure")
-        
-        if external_reports['credit_score'] < 600:
-            risk_factors.append(f"• Credit Risk: Credit score of {external_reports['credit_score']} indicates financial instability")
-        
-        if external_reports['criminal_record']:
-            risk_factors.append("• Criminal History: Presence of criminal record is a significant risk factor")
-        
-        if external_reports['driving_record'] != 'Clean':
-            risk_factors.append(f"• Driving Record: {external_reports['driving_record']} indicates elevated liability risk")
-        
-        if not risk_factors:
-            risk_factors.append("• Low Risk Profile: Applicant demonstrates favorable risk characteristics across all evaluation categories")
-        
-        return '\n'.join(risk_factors[:5])
-
-class RecommendationAgent(UnderwritingAgent):
-    def generate_recommendation(self, risk_score, risk_category, all_factors):
-        """Agent 4: Generate underwriting recommendation - AI Mode"""
-        prompt = f"""You are a senior underwriter. Based on the following risk assessment, provide a clear underwriting decision and recommendation:
-
-Risk Score: {risk_score}/100
-Risk Category: {risk_category}
-Key Factors: {all_factors}
-
-Provide:
-1. Clear decision (Approve/Approve with Conditions/Decline/Manual Review)
-2. Specific recommendations for premium adjustments or policy conditions
-3. Any additional steps needed
-
-Keep response concise and actionable (10 sentences)."""
-
-        return self.query_llm(prompt)
-    
-    def fallback_generate_recommendation(self, risk_score, risk_category):
-        """Fallback recommendation using rule-based logic"""
-        if risk_score < 40:
-            decision = "✅ APPROVE"
-            rationale = "Low-risk profile meets standard underwriting criteria."
-            recommendation = "Standard premium rates apply. Issue policy with standard terms and conditions."
-            additional = "No additional documentation required. Standard annual review recommended."
-        elif risk_score < 70:
-            decision = "✅ APPROVE WITH CONDITIONS"
-            rationale = "Medium-risk profile requires enhanced terms."
-            recommendation = f"Apply {'15-25%' if risk_score >= 60 else '10-15%'} premium increase. Consider higher deductibles or specific exclusions."
-            additional = f"Require annual {'health' if 'health' in risk_category.lower() else 'risk'} reassessment. Enhanced monitoring recommended."
-        else:
-            decision = "⚠️ MANUAL REVIEW REQUIRED"
-            rationale = "High-risk profile necessitates senior underwriter evaluation."
-            recommendation = "Refer to senior underwriting team for detailed risk assessment and policy customization."
-            additional = "May require additional documentation, medical records, or investigation. Decision pending specialist review."
-        
-        return f"{decision}\n\nRationale: {rationale}\n\nRecommendation: {recommendation}\n\nAdditional Steps: {additional}"
-
-def calculate_risk_score(applicant_data, claims_history, external_reports):
-    """Calculate numerical risk score"""
-    risk_score = 50  
-    
-    if applicant_data['age'] < 25:
-        risk_score += 10
-    elif applicant_data['age'] > 65:
-        risk_score += 15
-    else:
-        risk_score -= 5
-    
-    total_claims = len(claims_history)
-    if total_claims > 3:
-        risk_score += 20
-    elif total_claims > 0:
-        risk_score += 10
-    else:
-        risk_score -= 10
-    
-    if applicant_data['health_status'] == 'Excellent':
-        risk_score -= 15
-    elif applicant_data['health_status'] == 'Poor':
-        risk_score += 25
-    
-    if 'Smoker' in applicant_data['lifestyle_factors']:
-        risk_score += 15
-    if 'High-risk sports' in applicant_data['lifestyle_factors']:
-        risk_score += 10
-    
-    if external_reports['credit_score'] < 600:
-        risk_score += 10
-    elif external_reports['credit_score'] > 750:
-        risk_score -= 5
-    
-    if external_reports['criminal_record']:
-        risk_score += 20
-    
-    if external_reports['driving_record'] != 'Clean':
-        risk_score += 5 
-        
-    risk_score = max(0, min(100, risk_score))
-    
-    if risk_score < 40:
-        risk_category = "Low Risk"
-        color_class = "risk-low"
-    elif risk_score < 70:
-        risk_category = "Medium Risk"
-        color_class = "risk-medium"
-    else:
-        risk_category = "High Risk"
-        color_class = "risk-high"
-    
-    return risk_score, risk_category, color_class
-
-def analyze_with_ai_agents(applicant_data, claims_history, external_reports, api_key):
-    """Orchestrate multi-agent analysis - AI Mode"""
-    
-    data_agent = DataSummarizationAgent(api_key=api_key)
-    claims_agent = ClaimsAnalysisAgent(api_key=api_key)
-    risk_agent = RiskFactorAgent(api_key=api_key)
-    rec_agent = RecommendationAgent(api_key=api_key)
-    
-    if data_agent.chat_model is None:
-        return analyze_with_fallback(applicant_data, claims_history, external_reports, fallback_only=True)
-
-    agent_outputs = {}
-    
-    summary = data_agent.summarize_applicant(applicant_data)
-    agent_outputs['applicant_summary'] = summary if summary else "LLM API Call Failed. Fallback Summary:\n" + data_agent.fallback_summarize(applicant_data)
-    time.sleep(0.5)
-    
-    claims = claims_agent.analyze_claims(claims_history)
-    agent_outputs['claims_analysis'] = claims if claims else "LLM API Call Failed. Fallback Claims Analysis:\n" + claims_agent.fallback_analyze_claims(claims_history)
-    time.sleep(0.5)
-    
-    risk_factors = risk_agent.identify_risk_factors(applicant_data, claims_history, external_reports)
-    agent_outputs['risk_factors'] = risk_factors if risk_factors else "LLM API Call Failed. Fallback Risk Factors:\n" + risk_agent.fallback_identify_risk_factors(applicant_data, claims_history, external_reports)
-    time.sleep(0.5)
-    
-    risk_score, risk_category, color_class = calculate_risk_score(applicant_data, claims_history, external_reports)
-    
-    all_factors = f"Applicant Summary:\n{agent_outputs['applicant_summary']}\nClaims Analysis:\n{agent_outputs['claims_analysis']}\nRisk Factors:\n{agent_outputs['risk_factors']}"
-    recommendation = rec_agent.generate_recommendation(risk_score, risk_category, all_factors)
-    agent_outputs['recommendation'] = recommendation if recommendation else "LLM API Call Failed. Fallback Recommendation:\n" + rec_agent.fallback_generate_recommendation(risk_score, risk_category)
-    
-    return {
-        'risk_score': risk_score,
-        'risk_category': risk_category,
-        'color_class': color_class,
-        'agent_outputs': agent_outputs,
-        'total_claims': len(claims_history),
-        'total_claim_amount': sum([c['amount'] for c in claims_history]) if claims_history else 0,
-        'mode': 'AI Mode'
-    }
-
-def analyze_with_fallback(applicant_data, claims_history, external_reports, fallback_only=False):
-    """Orchestrate multi-agent analysis - Fallback Mode (Rule-Based)"""
-    
-    data_agent = DataSummarizationAgent()
-    claims_agent = ClaimsAnalysisAgent()
-    risk_agent = RiskFactorAgent()
-    rec_agent = RecommendationAgent()
-    
-    agent_outputs = {}
-    
-    agent_outputs['applicant_summary'] = data_agent.fallback_summarize(applicant_data)
-    time.sleep(0.1) # Shorter sleep for faster rule-based mode
-    
-    agent_outputs['claims_analysis'] = claims_agent.fallback_analyze_claims(claims_history)
-    time.sleep(0.1)
-    
-    agent_outputs['risk_factors'] = risk_agent.fallback_identify_risk_factors(applicant_data, claims_history, external_reports)
-    time.sleep(0.1)
-    
-    risk_score, risk_category, color_class = calculate_risk_score(applicant_data, claims_history, external_reports)
-    
-    agent_outputs['recommendation'] = rec_agent.fallback_generate_recommendation(risk_score, risk_category)
-    
-    mode_label = 'Rule-based Mode (Fallback Only)' if fallback_only else 'Rule-based Mode'
-    return {
-        'risk_score': risk_score,
-        'risk_category': risk_category,
-        'color_class': color_class,
-        'agent_outputs': agent_outputs,
-        'total_claims': len(claims_history),
-        'total_claim_amount': sum([c['amount'] for c in claims_history]) if claims_history else 0,
-        'mode': mode_label
-    }
-
-def display_analysis_results(results, mode_type):
-    """Display analysis results for both AI and Fallback modes"""
-    
+def build_results_panel_markup(results):
+    """HTML for the results cards (mode badge, metric cards, agent cards, structured decision, premium quote)"""
     if "AI" in results['mode']:
-        st.markdown(f'<span class="mode-badge mode-ai">🛡️ {results["mode"]}</span>', unsafe_allow_html=True)
+        badge = f'<span class="mode-badge mode-ai">🛡️ {results["mode"]}</span>'
     else:
-        st.markdown(f'<span class="mode-badge mode-fallback">📊 {results["mode"]}</span>', unsafe_allow_html=True)
+        badge = f'<span class="mode-badge mode-fallback">📊 {results["mode"]}</span>'
     
-    st.markdown("---")
-    
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        st.markdown(f"""
+    metric_cards = [
+        f"""
         <div class="metric-card {results['color_class']}">
             <h3 style="margin:0;">Risk Score</h3>
             <h1 style="margin:0.5rem 0;">{results['risk_score']}/100</h1>
         </div>
-        """, unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown(f"""
+        """,
+        f"""
         <div class="metric-card {results['color_class']}">
             <h3 style="margin:0;">Risk Category</h3>
             <h1 style="margin:0.5rem 0;">{results['risk_category']}</h1>
         </div>
-        """, unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown(f"""
+        """,
+        f"""
         <div class="metric-card">
             <h3 style="margin:0;">Total Claims</h3>
             <h1 style="margin:0.5rem 0;">{results['total_claims']}</h1>
             <p style="margin:0;">${results['total_claim_amount']:,}</p>
         </div>
-        """, unsafe_allow_html=True)
-    
-    st.markdown("---")
-    
-    st.markdown("### 🛡️ Agent Analysis Results")
+        """
+    ]
     
     agent_outputs = results['agent_outputs']
-    
     card_class = "fallback-card" if "Fallback" in results['mode'] else "agent-card"
-    
-    st.markdown("#### 📊 Agent 1: Applicant Summary")
-    st.markdown(f"""
+    agent_cards = []
+    for heading, agent_title, output_key in [
+        ("#### 📊 Agent 1: Applicant Summary", "Data Summarization Agent", 'applicant_summary'),
+        ("#### 📋 Agent 2: Claims Analysis", "Claims Analysis Agent", 'claims_analysis'),
+        ("#### ⚠️ Agent 3: Risk Factors", "Risk Factor Identification Agent", 'risk_factors'),
+        ("#### 💡 Agent 4: Underwriting Recommendation", "Recommendation Agent", 'recommendation')
+    ]:
+        agent_cards.append((heading, f"""
     <div class="{card_class}">
-        <h4 style="margin:0 0 0.5rem 0;">Data Summarization Agent</h4>
-        <p style="margin:0; white-space: pre-wrap;">{agent_outputs.get('applicant_summary', 'N/A')}</p>
+        <h4 style="margin:0 0 0.5rem 0;">{agent_title}</h4>
+        <p style="margin:0; white-space: pre-wrap;">{agent_outputs.get(output_key, 'N/A')}</p>
     </div>
-    """, unsafe_allow_html=True)
-    
-    st.markdown("#### 📋 Agent 2: Claims Analysis")
-    st.markdown(f"""
-    <div class="{card_class}">
-        <h4 style="margin:0 0 0.5rem 0;">Claims Analysis Agent</h4>
-        <p style="margin:0; white-space: pre-wrap;">{agent_outputs.get('claims_analysis', 'N/A')}</p>
+    """))
+    
+    decision_card = None
+    if results.get('decision'):
+        decision_lines = '<br>'.join(format_decision(results['decision']))
+        decision_card = f"""
+    <div class="info-box">
+        <p style="margin:0;">{decision_lines}</p>
     </div>
-    """, unsafe_allow_html=True)
-    
-    st.markdown("#### ⚠️ Agent 3: Risk Factors")
-    st.markdown(f"""
-    <div class="{card_class}">
-        <h4 style="margin:0 0 0.5rem 0;">Risk Factor Identification Agent</h4>
-        <p style="margin:0; white-space: pre-wrap;">{agent_outputs.get('risk_factors', 'N/A')}</p>
+    """
+    
+    pricing_card = None
+    if results.get('pricing'):
+        pricing_lines = '<br>'.join(format_quote(results['pricing']))
+        pricing_card = f"""
+    <div class="info-box">
+        <p style="margin:0;">{pricing_lines}</p>
     </div>
-    """, unsafe_allow_html=True)
+    """
     
-    st.markdown("#### 💡 Agent 4: Underwriting Recommendation")
-    st.markdown(f"""
-    <div class="{card_class}">
-        <h4 style="margin:0 0 0.5rem 0;">Recommendation Agent</h4>
-        <p style="margin:0; white-space: pre-wrap;">{agent_outputs.get('recommendation', 'N/A')}</p>
-    </div>
-    """, unsafe_allow_html=True)
+    return {
+        'badge': badge,
+        'metric_cards': metric_cards,
+        'agent_cards': agent_cards,
+        'decision_card': decision_card,
+        'pricing_card': pricing_card
+    }
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def get_results_panel_markup(analysis_id, _results):
+    """Results card markup, built once per analysis; keyed by analysis id so the results are never hashed"""
+    return build_results_panel_markup(_results)
 
+@st.fragment
+def display_analysis_results(results, mode_type):
+    """Display analysis results for both AI and Fallback modes.
+    
+    Runs as a fragment: interactions inside the panel rerun only the panel, and
+    the card markup is rebuilt only when the results object changes.
+    """
+    metrics_start = time.perf_counter()
+    if results.get('analysis_id'):
+        markup = get_results_panel_markup(results['analysis_id'], results)
+    else:
+        markup = build_results_panel_markup(results)
+    
+    st.markdown(markup['badge'], unsafe_allow_html=True)
+    
+    st.markdown("---")
+    
+    for column, card in zip(st.columns(3), markup['metric_cards']):
+        with column:
+            st.markdown(card, unsafe_allow_html=True)
+    
+    st.markdown("---")
+    
+    st.markdown("### 🛡️ Agent Analysis Results")
+    
+    for heading, card in markup['agent_cards']:
+        st.markdown(heading)
+        st.markdown(card, unsafe_allow_html=True)
+    
+    if markup['decision_card']:
+        st.markdown("#### 🧾 Structured Decision")
+        st.markdown(markup['decision_card'], unsafe_allow_html=True)
+    
+    if markup['pricing_card']:
+        st.markdown("#### 💵 Premium Quote")
+        st.markdown(markup['pricing_card'], unsafe_allow_html=True)
+    
     # Export options
     st.markdown("---")
     st.markdown("### 📥 Export Report")
     
-    # Prepare data for export
+    # Payloads are built only when a download is requested
     applicant_data = st.session_state.current_applicant_data or {}
     claims_history = st.session_state.current_claims_history or []
     external_reports = st.session_state.current_external_reports or {}
-    
-    # Generate JSON report
-    json_report = {
-        'timestamp': datetime.now().isoformat(),
-        'analysis_mode': results['mode'],
-        'applicant': applicant_data,
-        'risk_assessment': {
-            'risk_score': results['risk_score'],
-            'risk_category': results['risk_category'],
-            'total_claims': results['total_claims'],
-            'total_claim_amount': results['total_claim_amount']
-        },
-        'agent_outputs': agent_outputs
-    }
-    
-    json_data = json.dumps(json_report, indent=2)
-    
-    # Generate text report
-    text_report = generate_text_report(results, applicant_data, claims_history, external_reports)
+    report_inputs = (results, applicant_data, claims_history, external_reports)
+    file_stem = f"risk_assessment_{results['mode'].replace(' ', '_')}_{analysis_time(results).strftime('%Y%m%d_%H%M%S')}"
     
     col1, col2 = st.columns(2)
     
     with col1:
         st.download_button(
             label="📄 Download JSON Report",
-            data=json_data,
-            file_name=f"risk_assessment_{results['mode'].replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            data=functools.partial(get_report_payload, 'json', *report_inputs),
+            file_name=f"{file_stem}.json",
             mime="application/json",
+            on_click="ignore",
             use_container_width=True
         )
     
     with col2:
         st.download_button(
             label="📝 Download Text Report",
-            data=text_report,
-            file_name=f"risk_assessment_{results['mode'].replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
+            data=functools.partial(get_report_payload, 'text', *report_inputs),
+            file_name=f"{file_stem}.txt",
             mime="text/plain",
+            on_click="ignore",
             use_container_width=True
         )
-
-def generate_text_report(results, applicant_data, claims_history, external_reports):
-    """Generate a detailed text report"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
-    report = f"""
-{'='*80}
-INSURANCE UNDERWRITING RISK ASSESSMENT REPORT
-{'='*80}
+    st.session_state.rerun_metrics.record(f'results_panel_{mode_type}', time.perf_counter() - metrics_start)
 
-REPORT METADATA
-Generated: {timestamp}
-Analysis Mode: {results['mode']}
-Applicant: {applicant_data.get('name', 'N/A')}
+@st.cache_data(max_entries=64, show_spinner=False)
+def build_report_payload(content_hash, kind, _results, _applicant_data, _claims_history, _external_reports):
+    """Report text memoized by content hash; the inputs themselves are not hashed by Streamlit"""
+    if kind == 'json':
+        return generate_json_report(_results, _applicant_data)
+    return generate_text_report(_results, _applicant_data, _claims_history, _external_reports)
 
-{'='*80}
-EXECUTIVE SUMMARY
-{'='*80}
+def get_report_payload(kind, results, applicant_data, claims_history, external_reports):
+    """Download callback: build (or reuse) the requested report"""
+    content_hash = report_content_hash(results, applicant_data, claims_history, external_reports)
+    return build_report_payload(content_hash, kind, results, applicant_data, claims_history, external_reports)
 
-Risk Score: {results['risk_score']}/100
-Risk Category: {results['risk_category']}
-Total Claims on Record: {results['total_claims']}
-Total Claim Amount: ${results['total_claim_amount']:,}
+@st.fragment(run_every=2)
+def display_ai_job_status():
+    """Poll the background AI analysis job without rerunning the whole script"""
+    executor = get_job_executor()
+    job = executor.get(st.session_state.ai_job_id)
+    
+    if job is None:
+        st.session_state.ai_job_id = None
+        st.session_state.ai_job_notice = ("warning", "⚠️ The background analysis is no longer available (the server may have restarted). Please run it again.")
+        st.rerun()
+    
+    if not job.done:
+        st.progress(job.progress)
+        st.text(f"{job.status_text} ({job.elapsed:.0f}s)")
+        if job.cancel_event.is_set():
+            st.caption("Cancellation requested - stopping after the current agent finishes...")
+        elif st.button("⛔ Cancel AI Analysis", use_container_width=True):
+            executor.cancel(job.job_id)
+            st.rerun(scope="fragment")
+        return
+    
+    if job.status == JOB_COMPLETED:
+        # Per-agent fingerprints and outputs, so the next run only recomputes agents whose inputs changed
+        st.session_state.ai_node_memo = job.result.pop('node_memo', {})
+        st.session_state.ai_analysis_results = job.result
+        save_assessment(job.result, *st.session_state.ai_job_inputs)
+        st.session_state.ai_agent_outputs = job.result['agent_outputs']
+        st.session_state.ai_job_notice = ("success", f"✅ AI Agent analysis complete in {job.elapsed:.1f}s! Results displayed below.")
+    elif job.status == JOB_FAILED:
+        st.session_state.ai_job_notice = ("error", f"❌ AI Agent analysis failed: {job.error}")
+    elif job.status == JOB_CANCELLED:
+        st.session_state.ai_job_notice = ("warning", "⚠️ AI Agent analysis cancelled.")
+    
+    executor.discard(job.job_id)
+    st.session_state.ai_job_id = None
+    st.rerun()
 
-{'='*80}
-APPLICANT INFORMATION
-{'='*80}
 
-Name: {applicant_data.get('name', 'N/A')}
-Age: {applicant_data.get('age', 'N/A')} years old
-Occupation: {applicant_data.get('occupation', 'N/A')}
-Location: {applicant_data.get('location', 'N/A')}
-Requested Coverage: ${applicant_data.get('coverage_amount', 0):,}
-Health Status: {applicant_data.get('health_status', 'N/A')}
-Lifestyle Factors: {applicant_data.get('lifestyle_factors', 'N/A')}
+HISTORY_PAGE_SIZE = 25
+HISTORY_COLUMNS = ['analyzed_at', 'applicant_name', 'occupation', 'location', 'coverage_amount', 'risk_score', 'risk_category', 'decision', 'mode', 'rules_version', 'model_version']
 
-{'='*80}
-EXTERNAL REPORTS
-{'='*80}
 
-Credit Score: {external_reports.get('credit_score', 'N/A')}
-Criminal Record: {'Yes' if external_reports.get('criminal_record') else 'No'}
-Driving Record: {external_reports.get('driving_record', 'N/A')}
-
-{'='*80}
-CLAIMS HISTORY
-{'='*80}
-
-Total Claims: {results['total_claims']}
-Total Claim Amount: ${results['total_claim_amount']:,}
-"""
-    
-    if claims_history:
-        report += "\nDetailed Claims:\n"
-        for i, claim in enumerate(claims_history, 1):
-            report += f"\nClaim {i}:\n"
-            report += f"  Type: {claim['type']}\n"
-            report += f"  Amount: ${claim['amount']:,}\n"
-            report += f"  Date: {claim['date']}\n"
+@st.fragment
+def render_history():
+    """Stored assessments, newest first; filtering and paging only rerun this fragment"""
+    metrics_start = time.perf_counter()
+    
+    st.markdown("### 🗂️ Assessment History")
+    store = get_assessment_store()
+    if store is None:
+        st.info("Assessment history is disabled (UNDERWRITING_DB_PATH is empty).")
+        return
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        name = st.text_input("Applicant name starts with", key="history_name")
+    with col2:
+        categories = st.multiselect("Risk Category", ["Low Risk", "Medium Risk", "High Risk"], key="history_categories")
+    with col3:
+        min_score, max_score = st.slider("Risk Score", 0, 100, (0, 100), key="history_scores")
+    with col4:
+        dates = st.date_input("Analyzed between", value=(), key="history_dates")
+    
+    filters = {
+        'name': name.strip() or None,
+        'categories': categories,
+        'min_score': min_score if min_score > 0 else None,
+        'max_score': max_score if max_score < 100 else None,
+        'since': dates[0] if len(dates) > 0 else None,
+        'until': dates[1] if len(dates) > 1 else None
+    }
+    # New filters start again from the newest page
+    if filters != st.session_state.get('history_filters'):
+        st.session_state.history_filters = filters
+        st.session_state.history_cursors = [None]
+    cursors = st.session_state.history_cursors
+    
+    rows = store.search(limit=HISTORY_PAGE_SIZE + 1, before=cursors[-1], **filters)
+    has_older = len(rows) > HISTORY_PAGE_SIZE
+    rows = rows[:HISTORY_PAGE_SIZE]
+    st.caption(f"{store.count(**filters):,} matching assessments - page {len(cursors)}")
+    
+    if not rows:
+        st.info("No stored assessments match. Assessments are saved here when an analysis completes.")
     else:
-        report += "\nNo previous claims on record.\n"
+        st.dataframe(records_frame(rows)[HISTORY_COLUMNS], hide_index=True, use_container_width=True)
     
-    report += f"""
-{'='*80}
-AI AGENT ANALYSIS OUTPUTS
-{'='*80}
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("◀ Newer", use_container_width=True, disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun(scope="fragment")
+    with col2:
+        if st.button("Older ▶", use_container_width=True, disabled=not has_older):
+            cursors.append(next_page_cursor(rows))
+            st.rerun(scope="fragment")
+    
+    if rows:
+        labels = {row['analysis_id']: f"{row['analyzed_at'][:19]} - {row['applicant_name']} ({row['risk_score']}, {row['risk_category']})" for row in rows}
+        analysis_id = st.selectbox("Assessment details", list(labels), format_func=labels.get, key="history_selected")
+        assessment = store.get(analysis_id)
+        if assessment:
+            st.markdown(f"**Decision:** {assessment['decision'] or 'N/A'} · **Mode:** {assessment['mode']} · **Rules:** {assessment['rules_version']} · **Models:** {assessment['model_version']}")
+            for agent, output in assessment['agent_outputs'].items():
+                with st.expander(f"{agent.replace('_', ' ').title()}" + (f" ({output['model']})" if output['model'] else "")):
+                    st.markdown(output['output'])
+            st.download_button(
+                "📥 Download Stored Assessment (JSON)",
+                json.dumps(assessment, indent=2, default=str),
+                file_name=f"assessment_{analysis_id}.json",
+                mime="application/json",
+                use_container_width=True
+            )
+    
+    st.session_state.rerun_metrics.record('history', time.perf_counter() - metrics_start)
 
-AGENT 1: APPLICANT DATA SUMMARIZATION
-{'-'*80}
-{results['agent_outputs'].get('applicant_summary', 'N/A')}
+PORTFOLIO_TOP_GROUPS = 15
 
-AGENT 2: CLAIMS HISTORY ANALYSIS
-{'-'*80}
-{results['agent_outputs'].get('claims_analysis', 'N/A')}
+@st.fragment
+def render_portfolio():
+    """Portfolio dashboard read from the running aggregates, so its cost does not grow with the history"""
+    metrics_start = time.perf_counter()
+    
+    st.markdown("### 📈 Portfolio Analytics")
+    store = get_assessment_store()
+    if store is None:
+        st.info("Portfolio analytics need the assessment history, which is disabled (UNDERWRITING_DB_PATH is empty).")
+        return
+    
+    summary = portfolio_summary(store.portfolio_stats(top=PORTFOLIO_TOP_GROUPS))
+    if not summary['assessments']:
+        st.info("No assessments stored yet. Portfolio figures update as soon as an analysis completes.")
+        return
+    
+    col1, col2, col3, col4, col5 = st.columns(5)
+    with col1:
+        st.metric("Assessments", f"{summary['assessments']:,}")
+    with col2:
+        st.metric("Total Coverage Exposure", f"${summary['total_coverage']:,.0f}")
+    with col3:
+        st.metric("Mean Risk Score", f"{summary['mean_score']:.1f}")
+    with col4:
+        st.metric("Manual Referral Rate", f"{summary['referral_rate']:.1%}")
+    with col5:
+        st.metric("Decline Rate", f"{summary['decline_rate']:.1%}")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("#### Risk Category Mix")
+        category_mix = records_frame([dict(figures, category=category) for category, figures in summary['category_mix'].items()]).set_index('category')
+        st.bar_chart(category_mix['assessments'])
+        st.dataframe(category_mix[['assessments', 'share', 'mean_score', 'coverage']], use_container_width=True)
+    with col2:
+        st.markdown("#### Risk Score Distribution")
+        st.bar_chart(records_frame([{'score': band, 'assessments': n} for band, n in summary['score_histogram'].items()]).set_index('score'))
+        st.markdown("#### Decision Mix")
+        st.dataframe(records_frame([{'decision': decision, 'share': rate} for decision, rate in summary['decision_mix'].items()]), hide_index=True, use_container_width=True)
+    
+    col1, col2 = st.columns(2)
+    for column, dimension in ((col1, 'occupation'), (col2, 'location')):
+        with column:
+            st.markdown(f"#### Mean Score by {dimension.title()} (top {PORTFOLIO_TOP_GROUPS})")
+            groups = summary[f'by_{dimension}']
+            st.dataframe(records_frame(groups)[[dimension, 'assessments', 'mean_score', 'coverage']], hide_index=True, use_container_width=True)
+    
+    if st.button("🔄 Refresh Portfolio", use_container_width=True):
+        st.rerun(scope="fragment")
+    
+    st.session_state.rerun_metrics.record('portfolio', time.perf_counter() - metrics_start)
 
-AGENT 3: RISK FACTOR IDENTIFICATION
-{'-'*80}
-{results['agent_outputs'].get('risk_factors', 'N/A')}
+@st.fragment
+def render_exposure_report():
+    """Concentration of coverage exposure over the stored assessments or an uploaded policy book"""
+    import exposure_report
+    metrics_start = time.perf_counter()
+    
+    st.markdown("### 🧭 Concentration of Exposure")
+    st.caption("Coverage exposure by city, occupation risk tier and risk category, scanned in chunks so large books stay within bounded memory.")
+    
+    with st.form("exposure_form", border=False):
+        source = st.radio("Policies", ["Stored assessments", "Uploaded policy CSV"], horizontal=True)
+        upload = st.file_uploader("Policy CSV (location, occupation, coverage_amount and risk_category or risk_score columns)", type="csv")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            top = st.number_input("Top groups", 1, 100, 10)
+        with col2:
+            city_limit = st.number_input("City limit (% of exposure)", 0.0, 100.0, exposure_report.DEFAULT_CONCENTRATION_LIMITS['city'] * 100, step=1.0)
+        with col3:
+            tier_limit = st.number_input("Occupation tier limit (% of exposure)", 0.0, 100.0, exposure_report.DEFAULT_CONCENTRATION_LIMITS['occupation_tier'] * 100, step=1.0)
+        with col4:
+            high_risk_limit = st.number_input("High Risk share limit (%)", 0.0, 100.0, exposure_report.DEFAULT_HIGH_RISK_LIMIT * 100, step=1.0)
+        run = st.form_submit_button("📊 Run Exposure Report", use_container_width=True)
+    
+    if run:
+        if source == "Stored assessments":
+            store = get_assessment_store()
+            chunks = exposure_report.store_chunks(store) if store is not None else None
+        else:
+            chunks = exposure_report.read_book_chunks(upload) if upload is not None else None
+        if chunks is None:
+            st.warning("Upload a policy CSV first." if source != "Stored assessments" else "The assessment history is disabled (UNDERWRITING_DB_PATH is empty).")
+            st.session_state.exposure_results = None
+        else:
+            try:
+                report = exposure_report.ExposureReport().add_chunks(chunks)
+            except (ValueError, KeyError) as e:
+                st.error(f"Could not read the policies: {e}")
+                st.session_state.exposure_results = None
+            else:
+                limits = {'city': city_limit / 100, 'occupation_tier': tier_limit / 100}
+                st.session_state.exposure_results = {
+                    'report': report,
+                    'top': int(top),
+                    'breaches': report.breaches(limits, high_risk_limit / 100)
+                }
+    
+    results = st.session_state.exposure_results
+    if results:
+        report = results['report']
+        summary = report.summary()
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Policies", f"{summary['policies']:,}")
+        with col2:
+            st.metric("Total Exposure", f"${summary['exposure']:,.0f}")
+        with col3:
+            st.metric("High Risk Share of Exposure", f"{summary['high_risk_share']:.1%}")
+        with col4:
+            st.metric("Limit Breaches", len(results['breaches']))
+        
+        if results['breaches']:
+            st.markdown("#### ⚠️ Limit Breaches")
+            st.dataframe(records_frame(results['breaches']), hide_index=True, use_container_width=True)
+            st.download_button("📥 Download Breaches (CSV)", exposure_report.breaches_csv(results['breaches']), "exposure_breaches.csv", "text/csv")
+        
+        for dimension, title in (('city', "City"), ('occupation_tier', "Occupation Risk Tier"), ('risk_category', "Risk Category")):
+            st.markdown(f"#### Exposure by {title} (top {results['top']})")
+            rows = report.table(dimension, results['top'])
+            if rows:
+                st.dataframe(records_frame(rows), hide_index=True, use_container_width=True)
+            st.download_button(f"📥 Download by {title} (CSV)", exposure_report.table_csv(report, dimension), f"exposure_by_{dimension}.csv", "text/csv", key=f"exposure_download_{dimension}")
+    
+    st.session_state.rerun_metrics.record('exposure_report', time.perf_counter() - metrics_start)
 
-AGENT 4: UNDERWRITING RECOMMENDATION
-{'-'*80}
-{results['agent_outputs'].get('recommendation', 'N/A')}
+@st.fragment
+def render_cutoff_optimizer():
+    """Category cutoffs meeting target approval/referral rates or loss ratios, exported as a rule configuration"""
+    import cutoff_optimizer
+    import numpy as np
+    metrics_start = time.perf_counter()
+    
+    st.markdown("### 🎯 Category Cutoff Optimizer")
+    low, high = RISK_BOUNDARIES
+    st.caption(f"Current cutoffs: Low Risk below {low:g}, High Risk (manual review) from {high:g}. Targets are met with one sort of the scored batch.")
+    
+    with st.form("cutoff_form", border=False):
+        source = st.radio("Scored batch", ["Stored assessments", "Uploaded scored CSV"], horizontal=True, key="cutoff_source")
+        upload = st.file_uploader("Scored CSV (risk_score or the scoring inputs; loss_amount and premium for loss-ratio targets)", type="csv", key="cutoff_upload")
+        col1, col2 = st.columns(2)
+        with col1:
+            high_target = st.selectbox("High Risk cutoff", ["Keep current", "Max referral rate (%)", "Max accepted loss ratio (%)"])
+            high_value = st.number_input("High Risk target", 0.0, 1000.0, 8.0, step=0.5)
+        with col2:
+            low_target = st.selectbox("Low Risk cutoff", ["Keep current", "Min approval rate (%)", "Max approved loss ratio (%)"])
+            low_value = st.number_input("Low Risk target", 0.0, 1000.0, 40.0, step=0.5)
+        run = st.form_submit_button("🎯 Optimize Cutoffs", use_container_width=True)
+    
+    if run:
+        st.session_state.cutoff_results = None
+        targets = {
+            'max_referral_rate': high_value / 100 if high_target.startswith("Max referral") else None,
+            'max_accepted_loss_ratio': high_value / 100 if high_target.startswith("Max accepted") else None,
+            'min_approval_rate': low_value / 100 if low_target.startswith("Min approval") else None,
+            'max_approved_loss_ratio': low_value / 100 if low_target.startswith("Max approved") else None
+        }
+        try:
+            if source == "Stored assessments":
+                store = get_assessment_store()
+                if store is None:
+                    raise ValueError("the assessment history is disabled (UNDERWRITING_DB_PATH is empty)")
+                chunks = [chunk['risk_score'] for chunk in store.iter_columns(('risk_score',))]
+                batch = (np.concatenate(chunks) if chunks else np.array([]), None, None)
+            elif upload is None:
+                raise ValueError("upload a scored CSV first")
+            else:
+                batch = cutoff_optimizer.read_scored_batch(upload)
+            if not len(batch[0]):
+                raise ValueError("the batch has no scored policies")
+            st.session_state.cutoff_results = cutoff_optimizer.optimize_cutoffs(*batch, **targets)
+        except (ValueError, KeyError) as e:
+            st.error(f"Could not optimize the cutoffs: {e}")
+    
+    result = st.session_state.cutoff_results
+    if result:
+        new_low, new_high = result['boundaries']
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Policies", f"{result['policies']:,}")
+        with col2:
+            st.metric("Low Risk Cutoff", f"{new_low:g}", f"{new_low - result['current_boundaries'][0]:+g}")
+        with col3:
+            st.metric("High Risk Cutoff", f"{new_high:g}", f"{new_high - result['current_boundaries'][1]:+g}")
+        with col4:
+            st.metric("Referral Rate", f"{result['category_mix']['High Risk']['share']:.1%}", f"{result['category_mix']['High Risk']['share'] - result['current_mix']['High Risk']['share']:+.1%}", delta_color="inverse")
+        
+        for name, figures in result['targets'].items():
+            if not figures['met']:
+                st.warning(f"Target {name.replace('_', ' ')} of {figures['target']:.1%} cannot be met with this batch.")
+        
+        mix = records_frame(cutoff_optimizer.mix_rows(result)).set_index('category')
+        st.markdown("#### Category Mix: Current vs Optimized")
+        st.bar_chart(mix[['current_share', 'new_share']], stack=False)
+        st.dataframe(mix, use_container_width=True)
+        st.download_button(
+            "📥 Download Cutoffs (rule configuration JSON)",
+            json.dumps(cutoff_optimizer.cutoff_config(result), indent=2),
+            "risk_cutoffs.json",
+            "application/json"
+        )
+        st.caption("Apply the cutoffs by pointing `UNDERWRITING_RISK_CUTOFFS` at the downloaded file and restarting the app.")
+    
+    st.session_state.rerun_metrics.record('cutoff_optimizer', time.perf_counter() - metrics_start)
 
-{'='*80}
-END OF REPORT
-{'='*80}
-"""
+@st.fragment
+def render_application_form():
+    """Application form; edits are batched in a form and committed once on save"""
+    metrics_start = time.perf_counter()
+    
+    st.markdown("### Applicant Information")
+    
+    # Import and paging reshape the claims grid, so they sit outside the form; using them only reruns this fragment
+    claims_page = render_claims_controls("claims", DEFAULT_CLAIMS)
+    
+    with st.form("application_form", border=False):
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            name = st.text_input("Applicant Name", "John Smith")
+            age = st.number_input("Age", 18, 100, 35)
+            occupation = st.selectbox("Occupation", OCCUPATIONS)
+            location = st.text_input("Location", "New York, NY")
+            coverage_amount = st.number_input("Coverage Amount ($)", 50000, 5000000, 500000, step=50000)
+        
+        with col2:
+            health_status = st.selectbox("Health Status", 
+                ["Excellent", "Good", "Fair", "Poor"])
+            lifestyle_factors = st.multiselect("Lifestyle Factors",
+                ["Non-smoker", "Smoker", "Regular exercise", "High-risk sports", "Alcohol consumption"],
+                ["Non-smoker", "Regular exercise"])
+            
+        st.markdown("### Claims History")
+        
+        render_claims_grid("claims", claims_page)
+        
+        st.markdown("### External Reports")
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            credit_score = st.slider("Credit Score", 300, 850, 720)
+        with col2:
+            criminal_record = st.checkbox("Criminal Record")
+        with col3:
+            driving_record = st.selectbox("Driving Record", ["Clean", "Minor violations", "Major violations"])
+        
+        st.markdown("---")
+        
+        submitted = st.form_submit_button("💾 Save Application Data", use_container_width=True)
+    
+    if submitted:
+        st.session_state.current_applicant_data = {
+            'name': name,
+            'age': age,
+            'occupation': occupation,
+            'location': location,
+            'coverage_amount': coverage_amount,
+            'health_status': health_status,
+            'lifestyle_factors': ', '.join(lifestyle_factors)
+        }
+        
+        st.session_state.current_external_reports = {
+            'credit_score': credit_score,
+            'criminal_record': criminal_record,
+            'driving_record': driving_record
+        }
+        
+        st.session_state.current_claims_history = commit_claims("claims")
+        st.session_state.application_saved = True
+        
+        # The analysis tabs read the saved data, so refresh the whole app once
+        st.rerun()
     
-    return report
+    if st.session_state.pop('application_saved', False):
+        st.success("✅ Application data saved! Navigate to AI Agent Analysis or Rule-based Analysis tab to proceed.")
+    
+    st.session_state.rerun_metrics.record('application_form', time.perf_counter() - metrics_start)
 # --- End of supporting functions ---
 
 
 def main():
+    metrics_start = time.perf_counter()
     st.markdown('<div class="main-header">🛡️ Underwriting Assistant AI</div>', unsafe_allow_html=True)
     st.markdown('<div class="sub-header">GenAI-Powered Risk Assessment with Multi-Agent System</div>', unsafe_allow_html=True)
     
@@ -812,11 +830,7 @@ def main():
         st.markdown("---")
         st.markdown("### 🔑 API Configuration")
         
-        try:
-            default_api_key = os.environ.get("HUGGINGFACE_API_KEY") or st.secrets.get("HUGGINGFACE_API_KEY", "")
-        except:
-            default_api_key = os.environ.get("HUGGINGFACE_API_KEY", "")
-
+        default_api_key = get_default_api_key()
         
         api_key = st.text_input(
             "Hugging Face API Key",
@@ -826,111 +840,50 @@ def main():
         )
         
         if api_key:
-            llm_client_status = get_llm_client(api_key)
-            if llm_client_status:
+            prewarm_default_llm_clients()
+            llm_pool = get_llm_client_pool()
+            default_model = get_model_router().default_model
+            if llm_pool.is_ready(api_key, default_model):
                  st.success("✅ API Key configured - AI Mode available")
-            else:
+            elif llm_pool.last_error(api_key, default_model):
                  st.error("❌ API Key configured but LLM initialization failed. Check key validity.")
+            elif looks_like_api_key(api_key):
+                 st.success("✅ API Key entered - AI Mode available (validated on first analysis)")
+            else:
+                 st.warning("⚠️ This doesn't look like a Hugging Face token (expected an 'hf_...' key).")
         else:
             st.warning("⚠️ No API key - Only Rule-based Mode available")
         
+        route_metrics = get_model_router().metrics()
+        if route_metrics:
+            with st.expander("📈 Model Routing Metrics"):
+                st.dataframe(metrics_frame(route_metrics), use_container_width=True)
+                gate_metrics = get_confidence_gate().metrics()
+                st.caption(f"Confidence gating skipped {gate_metrics['skipped_calls']} of {gate_metrics['analyses'] * 4} agent LLM calls ({gate_metrics['skipped_share']:.0%}).")
+        
+        with st.expander("⏱️ Rerun Metrics"):
+            st.caption("Reruns and render time for this session ('script' = full app reruns).")
+            rerun_summary = st.session_state.rerun_metrics.summary()
+            if rerun_summary:
+                st.dataframe(metrics_frame(rerun_summary), use_container_width=True)
+        
         st.markdown("---")
         st.markdown("### ℹ️ About")
         st.info("This system uses multiple AI agents powered by LLMs to perform comprehensive underwriting analysis through prompt chaining. Falls back to rule-based logic if API unavailable.")
     
     # Main content tabs
-    tab1, tab2, tab3, tab4, tab5 = st.tabs([
+    tab1, tab2, tab3, tab_history, tab_portfolio, tab4, tab5 = st.tabs([
         "📝 Application Form", 
         "📊 Rule-based Analysis",
         "🌐 AI Agent Analysis", 
+        "🗂️ History",
+        "📈 Portfolio",
         "🔄 System Flow", 
         "📚 Sample Data"
     ])
     
     with tab1:
-        st.markdown("### Applicant Information")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            name = st.text_input("Applicant Name", "John Smith")
-            age = st.number_input("Age", 18, 100, 35)
-            occupation = st.selectbox("Occupation", OCCUPATIONS)
-            location = st.text_input("Location", "New York, NY")
-            coverage_amount = st.number_input("Coverage Amount ($)", 50000, 5000000, 500000, step=50000)
-        
-        with col2:
-            health_status = st.selectbox("Health Status", 
-                ["Excellent", "Good", "Fair", "Poor"])
-            lifestyle_factors = st.multiselect("Lifestyle Factors",
-                ["Non-smoker", "Smoker", "Regular exercise", "High-risk sports", "Alcohol consumption"],
-                ["Non-smoker", "Regular exercise"])
-            
-        st.markdown("### Claims History")
-        num_claims = st.number_input("Number of Previous Claims", 0, 10, 2)
-        
-        claims_history = []
-        default_claims = [
-            {'type': "Auto", 'amount': 4500, 'date': '2023-01-15'},
-            {'type': "Property", 'amount': 8000, 'date': '2024-03-20'}
-        ]
-        
-        if num_claims > 0:
-            for i in range(num_claims):
-                with st.expander(f"Claim {i+1}"):
-                    col1, col2, col3 = st.columns(3)
-                    
-                    default_type = default_claims[i]['type'] if i < len(default_claims) else "Auto"
-                    default_amount = default_claims[i]['amount'] if i < len(default_claims) else 5000
-                    default_date_str = default_claims[i]['date'] if i < len(default_claims) else str(datetime.now().date())
-                    default_date = datetime.strptime(default_date_str, '%Y-%m-%d').date()
-                    
-                    with col1:
-                        claim_type = st.selectbox(f"Type", 
-                            ["Auto", "Property", "Health", "Liability"], index=["Auto", "Property", "Health", "Liability"].index(default_type), key=f"type_{i}")
-                    with col2:
-                        claim_amount = st.number_input(f"Amount ($)", 100, 100000, default_amount, key=f"amt_{i}")
-                    with col3:
-                        claim_date = st.date_input(f"Date", value=default_date, key=f"date_{i}")
-                    
-                    claims_history.append({
-                        'type': claim_type,
-                        'amount': claim_amount,
-                        'date': str(claim_date)
-                    })
-        
-        st.markdown("### External Reports")
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            credit_score = st.slider("Credit Score", 300, 850, 720)
-        with col2:
-            criminal_record = st.checkbox("Criminal Record")
-        with col3:
-            driving_record = st.selectbox("Driving Record", ["Clean", "Minor violations", "Major violations"])
-        
-        st.markdown("---")
-        
-        if st.button("💾 Save Application Data", use_container_width=True):
-            st.session_state.current_applicant_data = {
-                'name': name,
-                'age': age,
-                'occupation': occupation,
-                'location': location,
-                'coverage_amount': coverage_amount,
-                'health_status': health_status,
-                'lifestyle_factors': ', '.join(lifestyle_factors)
-            }
-            
-            st.session_state.current_external_reports = {
-                'credit_score': credit_score,
-                'criminal_record': criminal_record,
-                'driving_record': driving_record
-            }
-            
-            st.session_state.current_claims_history = claims_history
-            
-            st.success("✅ Application data saved! Navigate to AI Agent Analysis or Rule-based Analysis tab to proceed.")
+        render_application_form()
     with tab2:
         st.markdown("### 📊 Rule-Based Analysis")
         st.info("This mode uses deterministic rule-based logic for risk assessment. No API key required.")
@@ -973,10 +926,18 @@ def main():
                     results = analyze_with_fallback(
                         st.session_state.current_applicant_data,
                         st.session_state.current_claims_history,
-                        st.session_state.current_external_reports
+                        st.session_state.current_external_reports,
+                        previous_run=st.session_state.fallback_node_memo
                     )
                     
+                    st.session_state.fallback_node_memo = results.pop('node_memo', {})
                     st.session_state.fallback_analysis_results = results
+                    save_assessment(
+                        results,
+                        st.session_state.current_applicant_data,
+                        st.session_state.current_claims_history,
+                        st.session_state.current_external_reports
+                    )
                     st.session_state.fallback_agent_outputs = results['agent_outputs']
                     
                     progress_bar.progress(100)
@@ -1012,46 +973,34 @@ def main():
             
             st.markdown("---")
             
-            if st.button("🛡️ Run AI Agent Analysis", use_container_width=True):
+            if st.button("🛡️ Run AI Agent Analysis", use_container_width=True, disabled=st.session_state.ai_job_id is not None):
                 if not api_key:
                     st.error("❌ API key required for AI Agent Analysis. Please enter your Hugging Face API key in the sidebar or use Rule-based Analysis.")
                 elif not get_llm_client(api_key):
                     st.error("❌ LLM client failed to initialize with the provided API key. Check the key and try again.")
                 else:
-                    with st.spinner("🔄 AI Agents processing application..."):
-                        progress_bar = st.progress(0)
-                        status_text = st.empty()
-                        
-                        status_text.text("🛡️ Agent 1: Summarizing applicant data...")
-                        progress_bar.progress(25)
-                        time.sleep(0.5)
-                        
-                        status_text.text("🛡️ Agent 2: Analyzing claims history...")
-                        progress_bar.progress(50)
-                        time.sleep(0.5)
-                        
-                        status_text.text("🛡️ Agent 3: Identifying risk factors...")
-                        progress_bar.progress(75)
-                        time.sleep(0.5)
-                        
-                        status_text.text("🛡️ Agent 4: Generating recommendations...")
-                        progress_bar.progress(90)
-                        
-                        results = analyze_with_ai_agents(
-                            st.session_state.current_applicant_data,
-                            st.session_state.current_claims_history,
-                            st.session_state.current_external_reports,
-                            api_key=api_key 
-                        )
-                        
-                        st.session_state.ai_analysis_results = results
-                        st.session_state.ai_agent_outputs = results['agent_outputs']
-                        
-                        progress_bar.progress(100)
-                        status_text.text("✅ AI Agent analysis complete!")
-                        time.sleep(0.5)
-                        
-                        st.success("✅ AI Agent analysis complete! Results displayed below.")
+                    st.session_state.ai_job_notice = None
+                    # The inputs are kept with the job so the stored assessment matches what was analyzed
+                    st.session_state.ai_job_inputs = (
+                        dict(st.session_state.current_applicant_data),
+                        list(st.session_state.current_claims_history),
+                        dict(st.session_state.current_external_reports)
+                    )
+                    st.session_state.ai_job_id = get_job_executor().submit(
+                        analyze_with_ai_agents,
+                        *st.session_state.ai_job_inputs,
+                        api_key=api_key,
+                        previous_run=st.session_state.ai_node_memo,
+                        label=st.session_state.current_applicant_data['name']
+                    )
+            
+            if st.session_state.ai_job_id:
+                st.info("🔄 AI Agents are processing the application in the background. You can keep working - results will appear here when ready.")
+                display_ai_job_status()
+            
+            if st.session_state.ai_job_notice:
+                notice_level, notice_text = st.session_state.ai_job_notice
+                getattr(st, notice_level)(notice_text)
             
             if st.session_state.ai_analysis_results:
                 st.markdown("---")
@@ -1064,6 +1013,15 @@ def main():
                     st.rerun()
     
     
+    with tab_history:
+        render_history()
+    with tab_portfolio:
+        render_portfolio()
+        st.markdown("---")
+        render_exposure_report()
+        st.markdown("---")
+        render_cutoff_optimizer()
+    
     with tab4:
         st.markdown("### 🔄 Multi-Agent System Flow")
         
@@ -1144,7 +1102,9 @@ def main():
         
         st.markdown('<div class="process-arrow">↓</div>', unsafe_allow_html=True)
         
-        st.markdown("""
+        # Scores are whole points, so each band runs to the point below the next cutoff
+        low, high = (math.ceil(boundary) for boundary in RISK_BOUNDARIES)
+        st.markdown(f"""
         <div class="flow-step">
             <h3>📊 Step 5: Risk Score Calculation</h3>
             <p>**Method:** Weighted scoring algorithm (consistent across both modes)</p>
@@ -1160,9 +1120,9 @@ def main():
             </ul>
             <p>**Risk Categories:**</p>
             <ul>
-                <li>**Low Risk:** 0-39 (Green)</li>
-                <li>**Medium Risk:** 40-69 (Orange)</li>
-                <li>**High Risk:** 70-100 (Red)</li>
+                <li>**Low Risk:** 0-{low - 1} (Green)</li>
+                <li>**Medium Risk:** {low}-{high - 1} (Orange)</li>
+                <li>**High Risk:** {high}-100 (Red)</li>
             </ul>
         </div>
         """, unsafe_allow_html=True)
@@ -1307,7 +1267,7 @@ Expected Recommendation: MANUAL REVIEW REQUIRED
         **API Key Setup (for AI Mode):**
         - Get free API key from: https://huggingface.co/settings/tokens
         - **Enter the key in the sidebar text field.**
-        - The `get_llm_client` function is now dynamically loaded/re-initialized when you press the 'Run AI Agent Analysis' button with a new key.
+        - The LLM client for a new key is built and validated when you press the 'Run AI Agent Analysis' button, then reused from a bounded client pool.
         
         **Mode Comparison:**
         - **AI Mode:** Better for nuanced, context-aware analysis
@@ -1376,6 +1336,8 @@ Expected Recommendation: MANUAL REVIEW REQUIRED
             - Consider both perspectives for final decision
             - Export reports for documentation
         """)
+    
+    st.session_state.rerun_metrics.record('script', time.perf_counter() - metrics_start)
 
 if __name__ == "__main__":
     main()
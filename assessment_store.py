@@ -0,0 +1,316 @@
+"""Embedded SQLite store of applications, assessments and agent outputs.
+
+Every analysis result is stored with its applicant data, claims, external
+reports, agent outputs and the rule/model version that produced it, so
+assessments outlive the Streamlit session and can be queried across
+applicants. The database runs in WAL mode: readers (the history tab) never
+block the writer, and a batch of assessments is written in one transaction
+with ``executemany``.
+
+Listing is keyset-paginated on (analyzed_at, id), newest first. Together with
+the indexes on applicant name, date, risk category and score, each page is an
+index range scan and not an OFFSET walk over the table.
+"""
+import json
+import sqlite3
+import threading
+from datetime import date, timedelta
+
+from portfolio_analytics import DIMENSIONS, OPEN_DIMENSIONS, rebuild_queries, stat_deltas
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assessments (
+    id INTEGER PRIMARY KEY,
+    analysis_id TEXT NOT NULL UNIQUE,
+    analyzed_at TEXT NOT NULL,
+    applicant_name TEXT NOT NULL COLLATE NOCASE,
+    age INTEGER,
+    occupation TEXT,
+    location TEXT,
+    coverage_amount NUMERIC,
+    mode TEXT,
+    risk_score INTEGER,
+    risk_category TEXT,
+    decision TEXT,
+    total_claims INTEGER,
+    total_claim_amount NUMERIC,
+    rules_version TEXT,
+    model_version TEXT,
+    applicant TEXT,
+    external_reports TEXT,
+    results TEXT
+);
+CREATE INDEX IF NOT EXISTS assessments_name ON assessments (applicant_name, analyzed_at);
+CREATE INDEX IF NOT EXISTS assessments_analyzed_at ON assessments (analyzed_at);
+CREATE INDEX IF NOT EXISTS assessments_category ON assessments (risk_category, analyzed_at);
+CREATE INDEX IF NOT EXISTS assessments_score ON assessments (risk_score, analyzed_at);
+
+CREATE TABLE IF NOT EXISTS claims (
+    assessment_id INTEGER NOT NULL REFERENCES assessments (id) ON DELETE CASCADE,
+    type TEXT,
+    amount NUMERIC,
+    date TEXT
+);
+CREATE INDEX IF NOT EXISTS claims_assessment ON claims (assessment_id);
+
+CREATE TABLE IF NOT EXISTS agent_outputs (
+    assessment_id INTEGER NOT NULL REFERENCES assessments (id) ON DELETE CASCADE,
+    agent TEXT NOT NULL,
+    model TEXT,
+    output TEXT,
+    PRIMARY KEY (assessment_id, agent)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS portfolio_stats (
+    dimension TEXT NOT NULL,
+    key TEXT NOT NULL,
+    assessments INTEGER NOT NULL,
+    score_sum INTEGER NOT NULL,
+    coverage_sum NUMERIC NOT NULL,
+    PRIMARY KEY (dimension, key)
+) WITHOUT ROWID;
+"""
+
+UPSERT_STAT = """
+INSERT INTO portfolio_stats (dimension, key, assessments, score_sum, coverage_sum) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (dimension, key) DO UPDATE SET
+    assessments = assessments + excluded.assessments,
+    score_sum = score_sum + excluded.score_sum,
+    coverage_sum = coverage_sum + excluded.coverage_sum
+"""
+
+SUMMARY_COLUMNS = (
+    'id', 'analysis_id', 'analyzed_at', 'applicant_name', 'occupation', 'location', 'coverage_amount',
+    'mode', 'risk_score', 'risk_category', 'decision', 'total_claims', 'rules_version', 'model_version'
+)
+ASSESSMENT_COLUMNS = (
+    'id', 'analysis_id', 'analyzed_at', 'applicant_name', 'age', 'occupation', 'location', 'coverage_amount',
+    'mode', 'risk_score', 'risk_category', 'decision', 'total_claims', 'total_claim_amount',
+    'rules_version', 'model_version', 'applicant', 'external_reports', 'results'
+)
+# Kept out of the stored results: the agent outputs have their own table, the memo is session state
+UNSTORED_RESULT_KEYS = ('agent_outputs', 'node_memo')
+
+
+def model_version(results):
+    """Distinct models the agents ran on ('rules' when no LLM was called)"""
+    models = sorted(set(route['model'] for route in (results.get('model_routes') or {}).values() if route.get('model')))
+    return ','.join(models) or 'rules'
+
+
+def assessment_rows(assessment_id, results, applicant_data, claims_history, external_reports):
+    """(assessment row, claim rows, agent output rows) for one analysis"""
+    decision = results.get('decision') or {}
+    routes = results.get('model_routes') or {}
+    row = (
+        assessment_id,
+        results['analysis_id'],
+        results['analyzed_at'],
+        applicant_data['name'],
+        applicant_data.get('age'),
+        applicant_data.get('occupation'),
+        applicant_data.get('location'),
+        applicant_data.get('coverage_amount'),
+        results.get('mode'),
+        results['risk_score'],
+        results['risk_category'],
+        decision.get('decision'),
+        results.get('total_claims', len(claims_history)),
+        results.get('total_claim_amount'),
+        results.get('rules_version'),
+        model_version(results),
+        json.dumps(applicant_data),
+        json.dumps(external_reports),
+        json.dumps({key: value for key, value in results.items() if key not in UNSTORED_RESULT_KEYS}, default=str)
+    )
+    claims = [(assessment_id, claim['type'], claim['amount'], claim.get('date')) for claim in claims_history]
+    outputs = [
+        (assessment_id, agent, (routes.get(agent) or {}).get('model'), text)
+        for agent, text in (results.get('agent_outputs') or {}).items()
+    ]
+    return row, claims, outputs
+
+
+class AssessmentStore:
+    """Thread-safe handle on the assessment database; each thread gets its own connection"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        # Databases written before the portfolio aggregates existed get them in one pass
+        if conn.execute("SELECT 1 FROM portfolio_stats LIMIT 1").fetchone() is None and conn.execute("SELECT 1 FROM assessments LIMIT 1").fetchone():
+            self.rebuild_portfolio_stats()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def save(self, results, applicant_data, claims_history, external_reports):
+        """Store one analysis; returns its row id"""
+        return self.save_many([(results, applicant_data, claims_history, external_reports)])[0]
+
+    def save_many(self, records, batch_size=1000):
+        """Store (results, applicant_data, claims_history, external_reports) tuples, one transaction per batch"""
+        ids = []
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                ids.extend(self._insert_batch(batch))
+                batch = []
+        if batch:
+            ids.extend(self._insert_batch(batch))
+        return ids
+
+    def _insert_batch(self, records):
+        conn = self._connection()
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Ids are assigned here, under the write lock, so claims and outputs can be inserted with executemany
+                next_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM assessments").fetchone()[0]
+                rows, claims, outputs = [], [], []
+                for offset, record in enumerate(records):
+                    row, claim_rows, output_rows = assessment_rows(next_id + offset, *record)
+                    rows.append(row)
+                    claims.extend(claim_rows)
+                    outputs.extend(output_rows)
+                conn.executemany(f"INSERT INTO assessments ({', '.join(ASSESSMENT_COLUMNS)}) VALUES ({', '.join('?' * len(ASSESSMENT_COLUMNS))})", rows)
+                conn.executemany("INSERT INTO claims (assessment_id, type, amount, date) VALUES (?, ?, ?, ?)", claims)
+                conn.executemany("INSERT INTO agent_outputs (assessment_id, agent, model, output) VALUES (?, ?, ?, ?)", outputs)
+                deltas = stat_deltas(dict(zip(ASSESSMENT_COLUMNS, row)) for row in rows)
+                conn.executemany(UPSERT_STAT, [key + tuple(delta) for key, delta in deltas.items()])
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def _filters(name=None, categories=None, min_score=None, max_score=None, since=None, until=None):
+        clauses, params = [], []
+        if name:
+            # Prefix match as an index range on the NOCASE name column
+            clauses.append("applicant_name >= ? AND applicant_name < ?")
+            params += [name, name + '\U0010ffff']
+        if categories:
+            clauses.append(f"risk_category IN ({', '.join('?' * len(categories))})")
+            params += list(categories)
+        if min_score is not None:
+            clauses.append("risk_score >= ?")
+            params.append(min_score)
+        if max_score is not None:
+            clauses.append("risk_score <= ?")
+            params.append(max_score)
+        if since:
+            clauses.append("analyzed_at >= ?")
+            params.append(since.isoformat())
+        if until:
+            clauses.append("analyzed_at < ?")
+            params.append((until + timedelta(days=1)).isoformat() if isinstance(until, date) else until)
+        return clauses, params
+
+    def search(self, limit=50, before=None, **filters):
+        """One page of assessment summaries, newest first.
+
+        ``before`` is the (analyzed_at, id) cursor of the last row of the previous
+        page; filters are name (prefix), categories, min_score/max_score and
+        since/until dates.
+        """
+        clauses, params = self._filters(**filters)
+        if before:
+            clauses.append("(analyzed_at, id) < (?, ?)")
+            params += list(before)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connection().execute(
+            f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM assessments {where} ORDER BY analyzed_at DESC, id DESC LIMIT ?",
+            params + [limit]
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self, **filters):
+        clauses, params = self._filters(**filters)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._connection().execute(f"SELECT COUNT(*) FROM assessments {where}", params).fetchone()[0]
+
+    def get(self, analysis_id):
+        """Full stored assessment (applicant data, claims, reports, results, agent outputs) or None"""
+        conn = self._connection()
+        row = conn.execute(f"SELECT {', '.join(ASSESSMENT_COLUMNS)} FROM assessments WHERE analysis_id = ?", (analysis_id,)).fetchone()
+        if row is None:
+            return None
+        assessment = dict(row)
+        for key in ('applicant', 'external_reports', 'results'):
+            assessment[key] = json.loads(assessment[key])
+        assessment['claims_history'] = [
+            dict(claim) for claim in conn.execute("SELECT type, amount, date FROM claims WHERE assessment_id = ? ORDER BY rowid", (row['id'],))
+        ]
+        assessment['agent_outputs'] = {
+            output['agent']: {'model': output['model'], 'output': output['output']}
+            for output in conn.execute("SELECT agent, model, output FROM agent_outputs WHERE assessment_id = ?", (row['id'],))
+        }
+        return assessment
+
+    def iter_columns(self, columns, chunk_rows=100000):
+        """Stored assessments as {column: list} chunks of up to ``chunk_rows`` rows, for scans in bounded memory"""
+        unknown = set(columns) - set(ASSESSMENT_COLUMNS)
+        if unknown:
+            raise ValueError(f"unknown columns: {', '.join(sorted(unknown))}")
+        cursor = self._connection().execute(f"SELECT {', '.join(columns)} FROM assessments")
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                return
+            yield {column: list(values) for column, values in zip(columns, zip(*rows))}
+
+    def portfolio_stats(self, top=None):
+        """Rows of the portfolio aggregates; ``top`` keeps only the largest occupation/location groups"""
+        conn = self._connection()
+        closed = [dimension for dimension in DIMENSIONS if dimension not in OPEN_DIMENSIONS]
+        rows = conn.execute(
+            f"SELECT * FROM portfolio_stats WHERE dimension IN ({', '.join('?' * len(closed))})", closed
+        ).fetchall()
+        for dimension in OPEN_DIMENSIONS:
+            rows += conn.execute(
+                "SELECT * FROM portfolio_stats WHERE dimension = ? ORDER BY assessments DESC LIMIT ?", (dimension, top or -1)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def rebuild_portfolio_stats(self):
+        """Recompute the portfolio aggregates from the stored assessments"""
+        conn = self._connection()
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM portfolio_stats")
+                for query in rebuild_queries():
+                    conn.execute(query)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def analyze(self):
+        """Refresh the planner statistics (after bulk loads)"""
+        self._connection().execute("ANALYZE")
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def next_page_cursor(rows):
+    """Cursor for the page after ``rows`` (pass to search(before=...))"""
+    return (rows[-1]['analyzed_at'], rows[-1]['id']) if rows else None
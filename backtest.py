@@ -0,0 +1,331 @@
+"""Backtesting the risk score against historical loss outcomes.
+
+Given a labeled book (one row per historical policy with its loss outcome),
+the policies are scored in batch with the rule kernel
+``batch_scoring.score_features``, or a score column from a rule variant is
+used instead. The backtest then measures how well the score separates good
+risks from bad:
+
+* ROC curve, AUC, Gini and KS from one descending sort and cumulative counts
+  of losses and non-losses at each distinct score (no per-threshold loops)
+* a lift table by score decile (decile 1 holds the highest scores). It gives
+  the loss rate, lift, loss ratio and the cumulative share of losses captured.
+* a calibration curve of observed loss frequency (and the mean of an
+  optional predicted probability) per 10-point score bin, with the number of
+  inversions where a higher bin has fewer losses than the bin below it
+
+Loss ratios use the ``premium`` column when there is one. Otherwise the
+policies are priced with the current rate tables when ``coverage_amount`` is
+given.
+
+Labeled book columns: the scoring inputs (``age``, ``claim_count``,
+``health_status``, ``lifestyle_factors`` or ``smoker``/``high_risk_sports``
+flags, ``credit_score``, ``criminal_record``, ``driving_record``), the
+outcome (``loss_amount``, and ``had_loss`` when a loss can be zero), and
+optionally ``premium``, ``coverage_amount`` and ``occupation``.
+Claim-recency terms are not applied, since a flat book has no claim dates.
+
+    python backtest.py labeled.csv --out-dir backtest/
+    python backtest.py labeled.csv --score-column variant_score
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+from batch_scoring import score_features
+from exposure_report import factorize
+from pricing_engine import load_rate_tables
+from portfolio_analytics import SCORE_BIN_WIDTH
+
+DECILES = 10
+TRUE_VALUES = ('1', 'true', 'yes', 'y', 't')
+SCORING_COLUMNS = ('age', 'claim_count', 'health_status', 'lifestyle_factors', 'smoker', 'high_risk_sports', 'credit_score', 'criminal_record', 'driving_record')
+OUTCOME_COLUMNS = ('loss_amount', 'had_loss', 'premium', 'coverage_amount', 'occupation')
+LIFT_COLUMNS = ('decile', 'policies', 'min_score', 'max_score', 'mean_score', 'losses', 'loss_rate', 'lift', 'loss_amount', 'premium', 'loss_ratio', 'cumulative_policy_share', 'cumulative_loss_share', 'cumulative_lift')
+CALIBRATION_COLUMNS = ('score_bin', 'policies', 'mean_score', 'losses', 'observed_rate', 'mean_predicted', 'loss_ratio')
+
+
+def column_flags(values, **tests):
+    """0/1 arrays, one per named test, from a column factorized once; each test sees the distinct values only"""
+    keys, codes = factorize(values)
+    return {name: np.array([bool(test(key)) for key in keys], dtype=bool)[codes] for name, test in tests.items()}
+
+
+def truthy(value):
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def rating_flags(book):
+    """0/1 arrays of the rule inputs that are flags, from a labeled book"""
+    flags = column_flags(book['health_status'], excellent=lambda value: value == 'Excellent', poor_health=lambda value: value == 'Poor')
+    if 'smoker' in book and 'high_risk_sports' in book:
+        flags.update(column_flags(book['smoker'], smoker=truthy))
+        flags.update(column_flags(book['high_risk_sports'], high_risk_sports=truthy))
+    else:
+        # Same substring tests as the scalar rules
+        flags.update(column_flags(
+            book['lifestyle_factors'],
+            smoker=lambda value: isinstance(value, str) and 'Smoker' in value,
+            high_risk_sports=lambda value: isinstance(value, str) and 'High-risk sports' in value
+        ))
+    flags.update(column_flags(book['criminal_record'], criminal_record=truthy))
+    flags.update(column_flags(book['driving_record'], driving_violations=lambda value: value != 'Clean'))
+    return flags
+
+
+def score_book(book, flags=None):
+    """Current rule-based scores (0-100) of every policy in a labeled book"""
+    flags = flags or rating_flags(book)
+    score = score_features(
+        np.asarray(book['age'], dtype=np.float64),
+        np.asarray(book['claim_count'], dtype=np.float64),
+        flags['excellent'], flags['poor_health'], flags['smoker'], flags['high_risk_sports'],
+        np.asarray(book['credit_score'], dtype=np.float64),
+        flags['criminal_record'], flags['driving_violations']
+    )
+    return np.clip(score, 0, 100, out=score)
+
+
+def book_premiums(book, scores, flags=None, rate_tables=None):
+    """Premium column, or the current rate tables' premiums when the book has coverage amounts, else None"""
+    if 'premium' in book:
+        return np.asarray(book['premium'], dtype=np.float64)
+    if 'coverage_amount' not in book:
+        return None
+    flags = flags or rating_flags(book)
+    factors = {factor: flags[factor] for factor in ('smoker', 'high_risk_sports', 'poor_health', 'criminal_record', 'driving_violations')}
+    if 'occupation' in book:
+        from pricing_engine import book_factors
+        factors.update(book_factors({'occupation': book['occupation']}))
+    return (rate_tables or load_rate_tables()).price(scores, book['coverage_amount'], factors)['annual_premium']
+
+
+def loss_labels(book):
+    """1 for policies with a loss: ``had_loss`` when given, else a positive ``loss_amount``"""
+    if 'had_loss' in book:
+        return column_flags(book['had_loss'], had_loss=truthy)['had_loss'].astype(np.int64)
+    return (np.asarray(book['loss_amount'], dtype=np.float64) > 0).astype(np.int64)
+
+
+def descending_order(scores):
+    """Stable order of the scores from highest to lowest"""
+    scores = np.asarray(scores)
+    if scores.dtype.kind in 'iu' and len(scores) and -32767 <= scores.min() and scores.max() <= 32767:
+        # Small integers take NumPy's radix sort
+        return np.argsort(-scores.astype(np.int16), kind='stable')
+    return np.argsort(-scores, kind='stable')
+
+
+def roc_curve(scores, labels, order=None):
+    """(false positive rates, true positive rates, thresholds), one point per distinct score, highest first"""
+    order = descending_order(scores) if order is None else order
+    if not len(order):
+        return np.zeros(1), np.zeros(1), np.array([np.inf])
+    sorted_scores = np.asarray(scores)[order]
+    positives = np.cumsum(np.asarray(labels)[order])
+    negatives = np.arange(1, len(order) + 1) - positives
+    # The last row of each run of equal scores: ties move the curve together, diagonally
+    ends = np.r_[np.flatnonzero(np.diff(sorted_scores)), len(order) - 1]
+    total_positives, total_negatives = positives[-1], negatives[-1]
+    tpr = np.r_[0.0, positives[ends] / total_positives] if total_positives else np.zeros(len(ends) + 1)
+    fpr = np.r_[0.0, negatives[ends] / total_negatives] if total_negatives else np.zeros(len(ends) + 1)
+    return fpr, tpr, np.r_[np.inf, sorted_scores[ends]]
+
+
+def auc(fpr, tpr):
+    """Area under a ROC curve by the trapezoid rule"""
+    return float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1])) / 2)
+
+
+def lift_table(scores, labels, loss_amount=None, premiums=None, groups=DECILES, order=None):
+    """One row per score group of equal size, riskiest first; ties at a group edge are split by row order"""
+    order = descending_order(scores) if order is None else order
+    count = len(order)
+    if count < groups:
+        return []
+    starts = (np.arange(groups) * count + groups - 1) // groups
+    sizes = np.diff(np.r_[starts, count])
+    sorted_scores = np.asarray(scores, dtype=np.float64)[order]
+    losses = np.add.reduceat(np.asarray(labels)[order], starts)
+    amounts = np.add.reduceat(np.asarray(loss_amount, dtype=np.float64)[order], starts) if loss_amount is not None else None
+    premium = np.add.reduceat(np.asarray(premiums, dtype=np.float64)[order], starts) if premiums is not None else None
+    overall_rate = losses.sum() / count
+    cumulative_policies = np.cumsum(sizes)
+    cumulative_losses = np.cumsum(losses)
+
+    rows = []
+    for i in range(groups):
+        rate = losses[i] / sizes[i]
+        cumulative_rate = cumulative_losses[i] / cumulative_policies[i]
+        rows.append({
+            'decile': i + 1,
+            'policies': int(sizes[i]),
+            'min_score': float(sorted_scores[starts[i] + sizes[i] - 1]),
+            'max_score': float(sorted_scores[starts[i]]),
+            'mean_score': float(sorted_scores[starts[i]:starts[i] + sizes[i]].mean()),
+            'losses': int(losses[i]),
+            'loss_rate': float(rate),
+            'lift': float(rate / overall_rate) if overall_rate else None,
+            'loss_amount': float(amounts[i]) if amounts is not None else None,
+            'premium': float(premium[i]) if premium is not None else None,
+            'loss_ratio': float(amounts[i] / premium[i]) if amounts is not None and premium is not None and premium[i] else None,
+            'cumulative_policy_share': float(cumulative_policies[i] / count),
+            'cumulative_loss_share': float(cumulative_losses[i] / losses.sum()) if losses.sum() else None,
+            'cumulative_lift': float(cumulative_rate / overall_rate) if overall_rate else None
+        })
+    return rows
+
+
+def calibration_curve(scores, labels, predicted=None, loss_amount=None, premiums=None, bin_width=SCORE_BIN_WIDTH):
+    """Observed loss frequency per score bin (0-100 scale), with the mean predicted probability when given"""
+    scores = np.asarray(scores, dtype=np.float64)
+    top_bin = 100 // bin_width - 1
+    bins = np.clip(scores // bin_width, 0, top_bin).astype(np.int64)
+    size = top_bin + 1
+
+    def per_bin(weights):
+        return np.bincount(bins, weights=weights, minlength=size) if weights is not None else None
+
+    policies = np.bincount(bins, minlength=size)
+    score_sums = per_bin(scores)
+    losses = per_bin(np.asarray(labels, dtype=np.float64))
+    predicted_sums = per_bin(np.asarray(predicted, dtype=np.float64) if predicted is not None else None)
+    amounts = per_bin(np.asarray(loss_amount, dtype=np.float64) if loss_amount is not None else None)
+    premium = per_bin(np.asarray(premiums, dtype=np.float64) if premiums is not None else None)
+
+    rows = []
+    for i in range(size):
+        if not policies[i]:
+            continue
+        low = i * bin_width
+        rows.append({
+            'score_bin': f"{low}-{low + bin_width - 1 if i < top_bin else 100}",
+            'policies': int(policies[i]),
+            'mean_score': float(score_sums[i] / policies[i]),
+            'losses': int(losses[i]),
+            'observed_rate': float(losses[i] / policies[i]),
+            'mean_predicted': float(predicted_sums[i] / policies[i]) if predicted_sums is not None else None,
+            'loss_ratio': float(amounts[i] / premium[i]) if amounts is not None and premium is not None and premium[i] else None
+        })
+    return rows
+
+
+def backtest(scores, labels, loss_amount=None, premiums=None, predicted=None, groups=DECILES):
+    """Discrimination, lift and calibration of one score over a labeled book (parallel arrays)"""
+    scores = np.asarray(scores)
+    labels = np.asarray(labels, dtype=np.int64)
+    order = descending_order(scores)
+    fpr, tpr, thresholds = roc_curve(scores, labels, order)
+    area = auc(fpr, tpr)
+    calibration = calibration_curve(scores, labels, predicted, loss_amount, premiums)
+    rates = [row['observed_rate'] for row in calibration]
+    total_loss = float(np.sum(loss_amount)) if loss_amount is not None else None
+    total_premium = float(np.sum(premiums)) if premiums is not None else None
+    return {
+        'policies': len(scores),
+        'losses': int(labels.sum()),
+        'loss_rate': float(labels.mean()) if len(labels) else 0.0,
+        'auc': area,
+        'gini': 2 * area - 1,
+        'ks': float(np.max(tpr - fpr)) if len(tpr) else 0.0,
+        'loss_ratio': total_loss / total_premium if total_loss is not None and total_premium else None,
+        'roc': {'fpr': fpr, 'tpr': tpr, 'thresholds': thresholds},
+        'lift_table': lift_table(scores, labels, loss_amount, premiums, groups, order),
+        'calibration': calibration,
+        'calibration_inversions': sum(1 for low, high in zip(rates, rates[1:]) if high < low)
+    }
+
+
+def read_labeled_book(path_or_buffer, extra_columns=()):
+    """Labeled book as a DataFrame with only the columns the backtest uses"""
+    import pandas as pd
+    wanted = set(SCORING_COLUMNS + OUTCOME_COLUMNS + tuple(extra_columns))
+    return pd.read_csv(path_or_buffer, usecols=lambda column: column in wanted)
+
+
+def backtest_book(book, score_column=None, rate_tables=None, predicted_column=None):
+    """Backtest of the current rules (or the ``score_column`` of a rule variant) over a labeled book; priced books use that score"""
+    flags = rating_flags(book) if score_column is None or 'premium' not in book else None
+    scores = score_book(book, flags) if score_column is None else np.asarray(book[score_column])
+    return backtest(
+        scores,
+        loss_labels(book),
+        np.asarray(book['loss_amount'], dtype=np.float64),
+        book_premiums(book, scores, flags, rate_tables),
+        np.asarray(book[predicted_column], dtype=np.float64) if predicted_column else None
+    )
+
+
+def rows_to_csv(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(columns), extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def roc_csv(roc):
+    return rows_to_csv(
+        [{'threshold': t, 'fpr': f, 'tpr': p} for t, f, p in zip(roc['thresholds'].tolist(), roc['fpr'].tolist(), roc['tpr'].tolist())],
+        ('threshold', 'fpr', 'tpr')
+    )
+
+
+def format_backtest(label, result):
+    lines = [
+        f"{label}: {result['policies']:,} policies, {result['losses']:,} with a loss ({result['loss_rate']:.2%})",
+        f"  AUC {result['auc']:.4f}  Gini {result['gini']:.4f}  KS {result['ks']:.4f}"
+        + (f"  loss ratio {result['loss_ratio']:.1%}" if result['loss_ratio'] is not None else ""),
+        f"  {'decile':>6}{'scores':>12}{'loss rate':>11}{'lift':>7}{'loss ratio':>12}{'captured':>10}"
+    ]
+    for row in result['lift_table']:
+        loss_ratio = f"{row['loss_ratio']:.1%}" if row['loss_ratio'] is not None else "n/a"
+        captured = f"{row['cumulative_loss_share']:.1%}" if row['cumulative_loss_share'] is not None else "n/a"
+        lift = f"{row['lift']:.2f}" if row['lift'] is not None else "n/a"
+        lines.append(f"  {row['decile']:>6}{row['min_score']:>6g}-{row['max_score']:<5g}{row['loss_rate']:>11.2%}{lift:>7}{loss_ratio:>12}{captured:>10}")
+    lines.append(f"  calibration: {result['calibration_inversions']} inversion(s) across {len(result['calibration'])} score bins")
+    for row in result['calibration']:
+        lines.append(f"  {row['score_bin']:>8}{row['policies']:>12,}{row['observed_rate']:>10.2%}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the risk score against historical loss outcomes in a labeled policy CSV")
+    parser.add_argument("path", help="labeled policy CSV, or - for stdin")
+    parser.add_argument("--score-column", action="append", default=[], help="backtest this score column (a rule variant) alongside the current rules; repeatable")
+    parser.add_argument("--predicted-column", default=None, help="predicted loss probability column for the calibration curve")
+    parser.add_argument("--rates", default=None, help="rate tables JSON for pricing books without a premium column")
+    parser.add_argument("--out-dir", default=None, help="also write the lift table, calibration curve and ROC curve of each score as CSV here")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    extra = args.score_column + ([args.predicted_column] if args.predicted_column else [])
+    book = read_labeled_book(sys.stdin if args.path == "-" else args.path, extra)
+    loaded = time.perf_counter()
+    rate_tables = load_rate_tables(args.rates)
+    results = {}
+    for score_column in [None] + args.score_column:
+        results[score_column or 'rules'] = backtest_book(book, score_column, rate_tables, args.predicted_column)
+    print(f"read {len(book):,} policies in {loaded - start:.2f}s, backtested {len(results)} score(s) in {time.perf_counter() - loaded:.2f}s\n")
+    for label, result in results.items():
+        print("\n".join(format_backtest(label, result)) + "\n")
+
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+        for label, result in results.items():
+            for name, content in (
+                ('lift', rows_to_csv(result['lift_table'], LIFT_COLUMNS)),
+                ('calibration', rows_to_csv(result['calibration'], CALIBRATION_COLUMNS)),
+                ('roc', roc_csv(result['roc']))
+            ):
+                with open(os.path.join(args.out_dir, f"{label}_{name}.csv"), "w", newline="", encoding="utf-8") as f:
+                    f.write(content)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
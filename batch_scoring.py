@@ -0,0 +1,165 @@
+"""Vectorized risk scoring and a micro-batching dispatcher for concurrent callers.
+
+``calculate_risk_scores`` applies the rules of
+``underwriting_core.calculate_risk_score`` to many applicants at once with
+NumPy. ``MicroBatcher`` collects single-applicant requests that arrive within
+a short window and scores them through the kernel together, fulfilling each
+caller's future with its own result.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from model_router import RISK_BOUNDARIES
+from claims_temporal import temporal_features, temporal_score_adjustments
+
+RISK_CATEGORIES = ("Low Risk", "Medium Risk", "High Risk")
+COLOR_CLASSES = ("risk-low", "risk-medium", "risk-high")
+
+
+def calculate_risk_scores(applicants, claims_histories, external_reports, temporal=None, as_of=None):
+    """Vectorized calculate_risk_score; returns a list of (score, category, color class) tuples.
+
+    The three arguments are parallel sequences, one entry per applicant.
+    ``temporal`` adds the claim recency terms (defaults to underwriting_core.TEMPORAL_SCORING).
+    """
+    # One pass over the dicts; everything after this is array arithmetic
+    features = np.array([
+        (
+            a['age'],
+            len(c),
+            a['health_status'] == 'Excellent',
+            a['health_status'] == 'Poor',
+            'Smoker' in a['lifestyle_factors'],
+            'High-risk sports' in a['lifestyle_factors'],
+            r['credit_score'],
+            bool(r['criminal_record']),
+            r['driving_record'] != 'Clean'
+        )
+        for a, c, r in zip(applicants, claims_histories, external_reports)
+    ], dtype=np.float64).reshape(-1, 9)
+    score = score_features(*features.T)
+    if temporal is None:
+        from underwriting_core import TEMPORAL_SCORING as temporal
+    if temporal:
+        score += temporal_score_adjustments(temporal_features(claims_histories, as_of))
+    np.clip(score, 0, 100, out=score)
+
+    category = np.searchsorted(np.asarray(RISK_BOUNDARIES), score, side='right')
+    return [
+        (int(s), RISK_CATEGORIES[c], COLOR_CLASSES[c])
+        for s, c in zip(score.tolist(), category.tolist())
+    ]
+
+
+def score_features(age, claims, excellent, poor, smoker, sports, credit, criminal, driving):
+    """Unclipped rule-based scores from feature columns (claims is the claim count, the flags are 0/1)"""
+    score = np.full(len(age), 50, dtype=np.int64)
+    score += np.where(age < 25, 10, np.where(age > 65, 15, -5))
+    score += np.where(claims > 3, 20, np.where(claims > 0, 10, -10))
+    score += (25 * poor - 15 * excellent + 15 * smoker + 10 * sports + 20 * criminal + 5 * driving).astype(np.int64)
+    score += np.where(credit < 600, 10, np.where(credit > 750, -5, 0))
+    return score
+
+
+def score_applications(applications):
+    """Kernel for MicroBatcher: ``applications`` is a list of (applicant, claims, external reports)"""
+    applicants, claims_histories, external_reports = zip(*applications)
+    return calculate_risk_scores(applicants, claims_histories, external_reports)
+
+
+class MicroBatcher:
+    """Groups concurrent submissions into batches for a vectorized kernel.
+
+    max_batch  -- dispatch as soon as this many items are waiting
+    max_wait   -- seconds to wait for more items after the first one arrives
+    kernel     -- fn(list of items) -> list of results, in the same order
+
+    A larger window gives bigger batches (more throughput per kernel call) at
+    the cost of up to ``max_wait`` extra latency for the first item.
+    """
+
+    def __init__(self, kernel=score_applications, max_batch=64, max_wait=0.002):
+        self.kernel = kernel
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._max_seen = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        """Queue one item; returns a Future with its result. Raises RuntimeError once closed"""
+        future = Future()
+        # Checked and queued under the lock so nothing lands behind close()'s sentinel
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("batcher is closed")
+            self._queue.put((item, future))
+        return future
+
+    def _collect(self):
+        """Block for one item, then gather more until the batch is full or the window closes"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            collected = self._collect()
+            batch = [entry for entry in collected if entry is not None]
+            if batch:
+                self._dispatch(batch)
+            if len(batch) < len(collected):
+                return
+
+    def _dispatch(self, batch):
+        items = [item for item, _ in batch]
+        try:
+            results = self.kernel(items)
+        except Exception:
+            # Re-score one at a time so a bad item only fails its own caller
+            for item, future in batch:
+                try:
+                    future.set_result(self.kernel([item])[0])
+                except Exception as e:
+                    future.set_exception(e)
+        else:
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+        with self._lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._max_seen = max(self._max_seen, len(batch))
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'batches': self._batches,
+                'items': self._items,
+                'mean_batch_size': round(self._items / self._batches, 2) if self._batches else 0.0,
+                'max_batch_size': self._max_seen,
+                'max_batch': self.max_batch,
+                'max_wait_ms': self.max_wait * 1000
+            }
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join(timeout=5)
@@ -0,0 +1,99 @@
+"""Rerun count and render time of the Streamlit app for a typical editing session.
+
+    python benchmarks/bench_app_reruns.py --runs 20
+
+Uses Streamlit's AppTest harness to time full script reruns and reads the
+per-scope timings the app records in ``st.session_state.rerun_metrics``. The
+editing session is the application form: 11 field edits (name, age,
+occupation, location, coverage, health, lifestyle, two claim amounts in the
+grid, credit score, driving record) followed by a save.
+
+Full reruns are timed twice: with an empty session, and with both the
+rule-based and AI result sets populated (the AI run goes to the local
+stand-in LLM server).
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from streamlit.testing.v1 import AppTest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stand_in_llm_server import start_stand_in_server
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+FIELD_EDITS = 11
+# Edits to widgets inside the form, the claims grid included, cost nothing until save
+FRAGMENT_EDITS = 0
+
+
+def time_full_reruns(at, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        at.run()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def click(at, label_prefix):
+    next(b for b in at.button if b.label.startswith(label_prefix)).click().run()
+
+
+def populate_results(at):
+    """Save the form and run both analyses so both results panels render"""
+    click(at, "💾 Save Application Data")
+    click(at, "📊 Run Rule-based Analysis")
+    click(at, "🛡️ Run AI Agent Analysis")
+    deadline = time.time() + 60
+    while at.session_state.ai_job_id is not None and time.time() < deadline:
+        time.sleep(0.2)
+        at.run()
+    if not (at.session_state.ai_analysis_results and at.session_state.fallback_analysis_results):
+        raise RuntimeError("failed to populate both result sets")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.run()
+    full_rerun = time_full_reruns(at, args.runs)
+    scopes = at.session_state.rerun_metrics.summary()
+    form_fragment = scopes.get('application_form', {}).get('mean_ms', 0.0) / 1000
+
+    loose_reruns = FIELD_EDITS + 1
+    loose_time = loose_reruns * full_rerun
+    form_time = FRAGMENT_EDITS * form_fragment + full_rerun
+
+    print(f"full script rerun (median of {args.runs}): {full_rerun * 1000:.1f}ms")
+    print(f"application form fragment render: {form_fragment * 1000:.1f}ms")
+    print()
+    print(f"{'editing session':<34}{'full reruns':>12}{'fragment reruns':>17}{'render time':>13}")
+    print(f"{'loose widgets (one rerun per edit)':<34}{loose_reruns:>12}{0:>17}{loose_time * 1000:>11.0f}ms")
+    print(f"{'st.form + fragment':<34}{1:>12}{FRAGMENT_EDITS:>17}{form_time * 1000:>11.0f}ms")
+    print(f"\nper-scope metrics recorded by the app: {scopes}")
+
+    server, url = start_stand_in_server(ttft=0.01, per_token=0.0002)
+    os.environ["HUGGINGFACE_API_KEY"] = "hf_stand_in_benchmark_token"
+    os.environ["UNDERWRITING_LLM_ENDPOINT_URL"] = url
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.run()
+    populate_results(at)
+    at.session_state.rerun_metrics.reset()
+    populated_rerun = time_full_reruns(at, args.runs)
+    scopes = at.session_state.rerun_metrics.summary()
+    server.shutdown()
+
+    print(f"\nfull script rerun with both result sets populated (median of {args.runs}): {populated_rerun * 1000:.1f}ms")
+    print(f"per-scope metrics recorded by the app: {scopes}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""Write throughput and query latency of the SQLite assessment store at a million assessments.
+
+    python benchmarks/bench_assessment_store.py --rows 1000000
+
+Fills a temporary database with synthetic rule-based assessments (0-5 claims
+each, short stand-in agent outputs so the file stays around a gigabyte) and
+reports:
+
+* inserts/s committing every assessment on its own versus save_many batches
+* the latency of the history tab's queries (median of --repeats), including a
+  deep page reached by keyset cursor versus the same page by OFFSET
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assessment_store import AssessmentStore, SUMMARY_COLUMNS, next_page_cursor
+from claims_aggregator import aggregate_claims
+
+FIRST_NAMES = ("John", "Maria", "Wei", "Aisha", "Carlos", "Olga", "Kenji", "Fatima", "Liam", "Priya")
+LAST_NAMES = ("Smith", "Garcia", "Chen", "Khan", "Silva", "Ivanova", "Tanaka", "Haddad", "Murphy", "Patel")
+CITIES = ("New York, NY", "Springfield, IL", "Boston, MA", "Kansas City, MO", "Bend, OR", "Austin, TX")
+OCCUPATIONS = ("Software Engineer", "Teacher", "Pilot", "Registered Nurse", "Roofer", "Accountant")
+DECISIONS = {"Low Risk": "APPROVE", "Medium Risk": "APPROVE_WITH_CONDITIONS", "High Risk": "MANUAL_REVIEW"}
+
+
+def synthetic_records(count, seed=21):
+    rng = random.Random(seed)
+    start = datetime(2022, 1, 1)
+    for i in range(count):
+        applicant = {
+            'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.randint(1, 99999)}",
+            'age': rng.randint(18, 90),
+            'occupation': rng.choice(OCCUPATIONS),
+            'location': rng.choice(CITIES),
+            'coverage_amount': rng.choice((100000, 250000, 500000, 1000000, 2500000)),
+            'health_status': rng.choice(("Excellent", "Good", "Fair", "Poor")),
+            'lifestyle_factors': "Non-smoker, Regular exercise"
+        }
+        claims = [
+            {'type': rng.choice(("Auto", "Property", "Health")), 'amount': rng.randint(500, 40000), 'date': f"20{rng.randint(15, 24)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}"}
+            for _ in range(rng.randint(0, 5))
+        ]
+        reports = {'credit_score': rng.randint(300, 850), 'criminal_record': rng.random() < 0.05, 'driving_record': "Clean"}
+        score = rng.randint(0, 100)
+        category = "Low Risk" if score < 40 else "Medium Risk" if score < 70 else "High Risk"
+        summary = aggregate_claims(claims)
+        results = {
+            'risk_score': score,
+            'risk_category': category,
+            'decision': {'decision': DECISIONS[category], 'premium_adjustment': None, 'conditions': [], 'required_documents': []},
+            'total_claims': summary.count,
+            'total_claim_amount': summary.total_amount,
+            'claims_summary': summary.to_dict(),
+            'mode': "Rule-based Mode",
+            'analysis_id': uuid.UUID(int=rng.getrandbits(128)).hex,
+            'analyzed_at': (start + timedelta(seconds=i * 60)).isoformat(),
+            'rules_version': "1.0",
+            'agent_outputs': {agent: f"Stand-in {agent} for assessment {i}." for agent in ('applicant_summary', 'claims_analysis', 'risk_factors', 'recommendation')}
+        }
+        yield results, applicant, claims, reports
+
+
+def median_ms(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--single-rows", type=int, default=2000, help="assessments committed one at a time")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = AssessmentStore(os.path.join(tmp, "history.db"))
+        records = synthetic_records(args.rows)
+
+        # Records are built before the clock starts, so only the writes are timed
+        single_records = list(itertools.islice(records, args.single_rows))
+        start = time.perf_counter()
+        for record in single_records:
+            store.save(*record)
+        single = time.perf_counter() - start
+
+        batched = 0.0
+        while True:
+            chunk = list(itertools.islice(records, 5000))
+            if not chunk:
+                break
+            start = time.perf_counter()
+            store.save_many(chunk, batch_size=5000)
+            batched += time.perf_counter() - start
+        store.analyze()
+
+        size = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp))
+        print(f"{args.rows:,} assessments, {size / 2 ** 20:,.0f}MiB on disk")
+        print(f"one transaction per assessment: {args.single_rows / single:>10,.0f} inserts/s")
+        print(f"save_many, 5000 per batch:      {(args.rows - args.single_rows) / batched:>10,.0f} inserts/s")
+
+        newest = store.search(limit=25)
+        deep_offset = args.rows // 2
+        conn = store._connection()
+        cursor_row = conn.execute(
+            "SELECT analyzed_at, id FROM assessments ORDER BY analyzed_at DESC, id DESC LIMIT 1 OFFSET ?", (deep_offset - 1,)
+        ).fetchone()
+        deep_cursor = (cursor_row[0], cursor_row[1])
+        some_name = newest[3]['applicant_name']
+        queries = {
+            "newest page": lambda: store.search(limit=25),
+            "next page (keyset cursor)": lambda: store.search(limit=25, before=next_page_cursor(newest)),
+            f"page at row {deep_offset:,} (keyset)": lambda: store.search(limit=25, before=deep_cursor),
+            f"page at row {deep_offset:,} (OFFSET)": lambda: conn.execute(
+                f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM assessments ORDER BY analyzed_at DESC, id DESC LIMIT 25 OFFSET ?", (deep_offset,)
+            ).fetchall(),
+            "name prefix 'maria g'": lambda: store.search(limit=25, name="maria g"),
+            "exact name": lambda: store.search(limit=25, name=some_name),
+            "High Risk page": lambda: store.search(limit=25, categories=["High Risk"]),
+            "score 95-100 page": lambda: store.search(limit=25, min_score=95),
+            "score 95-100, March 2022": lambda: store.search(limit=25, min_score=95, since=datetime(2022, 3, 1).date(), until=datetime(2022, 3, 31).date()),
+            "count, all": lambda: store.count(),
+            "count, High Risk": lambda: store.count(categories=["High Risk"]),
+            "count, name prefix": lambda: store.count(name="maria g"),
+            "full assessment by analysis_id": lambda: store.get(newest[5]['analysis_id'])
+        }
+        print(f"\n{'query':<38}{'median':>10}")
+        for label, fn in queries.items():
+            print(f"{label:<38}{median_ms(fn, args.repeats):>8.2f}ms")
+        store.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Backtest throughput on a multi-million-row labeled book, and ROC/AUC by sort + cumsum versus a per-threshold loop.
+
+    python benchmarks/bench_backtest.py --policies 5000000
+
+Builds a synthetic labeled book in memory with the scoring inputs, a
+coverage amount and a loss outcome drawn from a hidden risk that the rules
+only partly see. Reports the time and rows/s of batch scoring, pricing for
+the loss ratios and the full backtest (ROC/AUC, lift table, calibration
+curve). Then times the AUC both ways, for the integer rule score (101
+distinct thresholds) and for a continuous variant score with one threshold
+per policy. The per-threshold loop is timed on --loop-thresholds thresholds
+of the variant and extrapolated. Also checks that both ways give the same AUC.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest import auc, backtest, book_premiums, loss_labels, rating_flags, roc_curve, score_book
+
+HEALTH = np.array(["Excellent", "Good", "Fair", "Poor"], dtype=object)
+LIFESTYLES = np.array(["Non-smoker, Regular exercise", "Smoker", "Non-smoker, High-risk sports", "Smoker, High-risk sports, Alcohol consumption"], dtype=object)
+OCCUPATIONS = np.array(["Software Engineer", "Teacher", "Pilot", "Roofer", "Accountant", "Electrician"], dtype=object)
+
+
+def synthetic_labeled_book(count, seed=23):
+    rng = np.random.default_rng(seed)
+    health = rng.choice(4, count, p=(0.3, 0.4, 0.2, 0.1))
+    lifestyle = rng.choice(4, count, p=(0.6, 0.2, 0.12, 0.08))
+    book = pd.DataFrame({
+        'age': rng.integers(18, 90, count),
+        'claim_count': rng.poisson(1.2, count),
+        'health_status': HEALTH[health],
+        'lifestyle_factors': LIFESTYLES[lifestyle],
+        'credit_score': rng.integers(300, 851, count),
+        'criminal_record': rng.random(count) < 0.05,
+        'driving_record': np.where(rng.random(count) < 0.2, "Minor violations", "Clean"),
+        'coverage_amount': rng.choice((100000, 250000, 500000, 1000000, 2500000), count),
+        'occupation': OCCUPATIONS[rng.integers(0, len(OCCUPATIONS), count)]
+    })
+    # Hidden risk: what the rules score plus what they cannot see
+    hidden = 0.35 * health + 0.5 * (lifestyle % 2) + 0.15 * book['claim_count'].to_numpy() + rng.normal(0, 0.8, count)
+    had_loss = rng.random(count) < 1 / (1 + np.exp(-(hidden - 2.2)))
+    book['loss_amount'] = np.where(had_loss, rng.lognormal(8.5, 1.0, count).round(2), 0.0)
+    return book
+
+
+def loop_auc(scores, labels, thresholds):
+    """One pass over the book per threshold"""
+    positives, negatives = labels.sum(), len(labels) - labels.sum()
+    tpr, fpr = [0.0], [0.0]
+    for threshold in thresholds:
+        flagged = scores >= threshold
+        tp = np.count_nonzero(flagged & (labels == 1))
+        tpr.append(tp / positives)
+        fpr.append((np.count_nonzero(flagged) - tp) / negatives)
+    return np.array(fpr), np.array(tpr)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--policies", type=int, default=5000000)
+    parser.add_argument("--loop-thresholds", type=int, default=200)
+    args = parser.parse_args()
+
+    book = synthetic_labeled_book(args.policies)
+    labels = loss_labels(book)
+    flags, flag_time = timed(rating_flags, book)
+    scores, score_time = timed(score_book, book, flags)
+    premiums, price_time = timed(book_premiums, book, scores, flags)
+    result, backtest_time = timed(backtest, scores, labels, book['loss_amount'].to_numpy(), premiums)
+
+    print(f"{args.policies:,} policies, {result['losses']:,} with a loss, AUC {result['auc']:.4f}, Gini {result['gini']:.4f}")
+    print(f"{'step':<40}{'time':>9}{'rows/s':>14}")
+    for label, seconds in (
+        ("rating flags (factorized columns)", flag_time),
+        ("batch scoring", score_time),
+        ("pricing for loss ratios", price_time),
+        ("backtest (ROC, lift, calibration)", backtest_time),
+        ("total", flag_time + score_time + price_time + backtest_time)
+    ):
+        print(f"{label:<40}{seconds:>8.2f}s{args.policies / seconds:>14,.0f}")
+
+    rng = np.random.default_rng(1)
+    variant = scores + rng.random(args.policies)
+    print(f"\n{'AUC':<40}{'sort+cumsum':>12}{'loop':>12}")
+    for label, values in (("rule score, 101 thresholds", scores), ("continuous variant, 1/policy", variant)):
+        (fpr, tpr, thresholds), sorted_time = timed(roc_curve, values, labels)
+        thresholds = thresholds[1:]
+        sample = thresholds if len(thresholds) <= 101 else thresholds[:args.loop_thresholds]
+        (loop_fpr, loop_tpr), loop_time = timed(loop_auc, values, labels, sample)
+        loop_time *= len(thresholds) / len(sample)
+        assert np.allclose(loop_tpr, tpr[:len(loop_tpr)]) and np.allclose(loop_fpr, fpr[:len(loop_fpr)]), "ROC curves disagree"
+        if len(sample) == len(thresholds):
+            assert abs(auc(loop_fpr, loop_tpr) - auc(fpr, tpr)) < 1e-12
+        extrapolated = "*" if len(sample) < len(thresholds) else " "
+        print(f"{label:<40}{sorted_time:>11.2f}s{loop_time:>11.1f}s{extrapolated}")
+    print(f"* timed on {args.loop_thresholds} thresholds and extrapolated")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Aggregating a large claim history: materialized multi-pass versus single-pass streaming.
+
+    python benchmarks/bench_claims_aggregation.py --claims 500000
+
+Writes a synthetic claims CSV to a temporary file. It is then summarized two
+ways. The first loads every claim into a list and walks it once per figure,
+as the analysis code used to. The second streams the file through
+claims_aggregator.aggregate_claims. Both report count, sum, mean, max,
+per-type counts/amounts and 1/3/5-year window counts. The benchmark prints
+wall time and peak traced memory for each.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from claims_aggregator import aggregate_claims, read_claims_csv, years_before
+
+CLAIM_TYPES = ("Auto", "Property", "Health", "Liability", "Life")
+
+
+def write_claims(path, count, seed=5):
+    rng = random.Random(seed)
+    today = date.today()
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        f.write("type,amount,date\n")
+        for _ in range(count):
+            claim_date = today - timedelta(days=rng.randint(0, 365 * 15))
+            f.write(f"{rng.choice(CLAIM_TYPES)},{rng.randint(100, 250000)},{claim_date.isoformat()}\n")
+
+
+def multi_pass(path):
+    """The previous approach: materialize the list, then one pass per figure"""
+    with open(path, newline="", encoding="utf-8") as f:
+        claims = list(read_claims_csv(f))
+    today = date.today()
+    cutoffs = {years: years_before(today, years).isoformat() for years in (1, 3, 5)}
+    types = set([c['type'] for c in claims])
+    return {
+        'count': len(claims),
+        'total_amount': sum([c['amount'] for c in claims]),
+        'mean_amount': sum([c['amount'] for c in claims]) / len(claims),
+        'max_amount': max([c['amount'] for c in claims]),
+        'by_type': {t: {'count': len([c for c in claims if c['type'] == t]), 'amount': sum([c['amount'] for c in claims if c['type'] == t])} for t in types},
+        'window_counts': {f"{years}y": len([c for c in claims if c['date'] >= cutoff]) for years, cutoff in cutoffs.items()}
+    }
+
+
+def single_pass(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return aggregate_claims(read_claims_csv(f)).to_dict()
+
+
+def measure(fn, path):
+    start = time.perf_counter()
+    result = fn(path)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--claims", type=int, default=500000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "claims.csv")
+        write_claims(path, args.claims)
+        print(f"{args.claims} claims, {os.path.getsize(path) / 2 ** 20:.1f}MiB CSV")
+        print(f"{'approach':<22}{'time':>9}{'claims/s':>12}{'peak memory':>14}")
+        results = {}
+        for label, fn in (("materialized, 8 pass", multi_pass), ("streamed, 1 pass", single_pass)):
+            elapsed, peak, results[label] = measure(fn, path)
+            print(f"{label:<22}{elapsed:>8.2f}s{args.claims / elapsed:>12.0f}{peak / 2 ** 20:>12.1f}MiB")
+
+    legacy, streamed = results.values()
+    assert all(legacy[key] == streamed[key] for key in legacy), "aggregates disagree"
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""Render time of the claims history section: one expander per claim versus the paged grid editor.
+
+    python benchmarks/bench_claims_editor.py --claims 2 10 50 200 500 --runs 10
+
+Uses Streamlit's AppTest harness to time reruns of two small scripts holding
+only the claims section. The first is the previous layout: an expander with
+type, amount and date widgets per claim, without the old cap of 10. The
+second is claims_editor's controls and grid, which render one page of at most
+PAGE_SIZE rows. Also reports the widget count of each layout.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from streamlit.testing.v1 import AppTest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from claims_editor import PAGE_SIZE
+
+
+# AppTest.from_function runs the function body as the script, so these import what they use
+def expander_layout(count, repo_dir):
+    from datetime import date
+    import streamlit as st
+    for i in range(count):
+        with st.expander(f"Claim {i+1}"):
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.selectbox("Type", ["Auto", "Property", "Health", "Liability"], key=f"type_{i}")
+            with col2:
+                st.number_input("Amount ($)", 100, 100000, 5000, key=f"amt_{i}")
+            with col3:
+                st.date_input("Date", value=date(2023, 1, 15), key=f"date_{i}")
+
+
+def grid_layout(count, repo_dir):
+    import sys
+    sys.path.insert(0, repo_dir)
+    from claims_editor import render_claims_controls, render_claims_grid
+    claims = [{'type': "Auto", 'amount': 5000 + i, 'date': '2023-01-15'} for i in range(count)]
+    render_claims_grid("claims", render_claims_controls("claims", claims))
+
+
+def median_rerun(script, count, runs):
+    at = AppTest.from_function(script, args=(count, REPO_DIR), default_timeout=120)
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        at.run()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), at
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--claims", type=int, nargs="+", default=[2, 10, 50, 200, 500])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'claims':>7}{'expanders':>12}{'widgets':>9}{'grid':>10}{'widgets':>9}{'speedup':>9}")
+    for count in args.claims:
+        expanders, at = median_rerun(expander_layout, count, args.runs)
+        expander_widgets = len(at.selectbox) + len(at.number_input) + len(at.date_input)
+        grid, at = median_rerun(grid_layout, count, args.runs)
+        grid_widgets = 1 + len(at.number_input) + 1  # grid, page selector, file uploader
+        print(f"{count:>7}{expanders * 1000:>10.1f}ms{expander_widgets:>9}{grid * 1000:>8.1f}ms{grid_widgets:>9}{expanders / grid:>8.1f}x")
+    print(f"\ngrid page size: {PAGE_SIZE} rows")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Category cutoff optimization on a multi-million-policy scored batch: sort + cumulative sums versus scanning candidate cutoffs.
+
+    python benchmarks/bench_cutoff_optimizer.py --policies 5000000
+
+Scores a synthetic labeled book (bench_backtest) with the current rules and
+prices it for loss ratios. Then finds the High Risk cutoff for at most 8%
+manual referrals and the Low Risk cutoff whose approvals stay within a 60%
+loss ratio, two ways. The first is cutoff_optimizer.optimize_cutoffs: one
+sort, then prefix sums. The second scans every candidate cutoff with a pass
+over the batch. The scan is timed for the integer rule score (101
+candidates). For a continuous variant score (one candidate per policy) it is
+timed on --scan-candidates candidates and extrapolated. Both ways must pick
+the same cutoffs.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest import book_premiums, rating_flags, score_book
+from bench_backtest import synthetic_labeled_book
+from cutoff_optimizer import optimize_cutoffs
+
+MAX_REFERRAL_RATE = 0.08
+MAX_APPROVED_LOSS_RATIO = 0.60
+
+
+def scan_cutoffs(scores, losses, premiums, candidates):
+    """One masked pass over the batch per candidate cutoff"""
+    high = low = None
+    for cutoff in candidates:
+        if high is None and np.count_nonzero(scores >= cutoff) <= MAX_REFERRAL_RATE * len(scores):
+            high = cutoff
+        below = scores < cutoff
+        premium = premiums[below].sum()
+        if premium and losses[below].sum() / premium <= MAX_APPROVED_LOSS_RATIO:
+            low = cutoff
+    return low, high
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--policies", type=int, default=5000000)
+    parser.add_argument("--scan-candidates", type=int, default=20)
+    args = parser.parse_args()
+
+    book = synthetic_labeled_book(args.policies)
+    flags = rating_flags(book)
+    scores = score_book(book, flags)
+    premiums = book_premiums(book, scores, flags)
+    losses = book['loss_amount'].to_numpy()
+    variant = scores + np.random.default_rng(3).random(args.policies)
+
+    print(f"{args.policies:,} policies; targets: at most {MAX_REFERRAL_RATE:.0%} referred, approvals within a {MAX_APPROVED_LOSS_RATIO:.0%} loss ratio")
+    print(f"{'score':<32}{'cutoffs':>14}{'sort+cumsum':>13}{'scan':>12}")
+    for label, values in (("rule score, 101 candidates", scores), ("continuous variant, 1/policy", variant)):
+        start = time.perf_counter()
+        result = optimize_cutoffs(values, losses, premiums, max_referral_rate=MAX_REFERRAL_RATE, max_approved_loss_ratio=MAX_APPROVED_LOSS_RATIO)
+        optimized = time.perf_counter() - start
+
+        candidates = np.unique(values)
+        candidates = np.r_[candidates, candidates[-1] + 1]
+        sample = candidates if len(candidates) <= 102 else candidates[:args.scan_candidates]
+        start = time.perf_counter()
+        scanned = scan_cutoffs(values, losses, premiums, sample)
+        scan = (time.perf_counter() - start) * len(candidates) / len(sample)
+        if len(sample) == len(candidates):
+            # The optimizer caps Low Risk at the High Risk cutoff
+            assert result['boundaries'] == (min(scanned[0] or candidates[0], scanned[1]), scanned[1]), (result['boundaries'], scanned)
+        extrapolated = "*" if len(sample) < len(candidates) else " "
+        cutoffs = "{:g}/{:g}".format(*result['boundaries'])
+        print(f"{label:<32}{cutoffs:>14}{optimized:>12.2f}s{scan:>11.1f}s{extrapolated}")
+    print(f"* timed on {args.scan_candidates} candidates and extrapolated")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
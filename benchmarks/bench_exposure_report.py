@@ -0,0 +1,96 @@
+"""Concentration-of-exposure report over a large policy book: materialized pandas group-by versus chunked bincount.
+
+    python benchmarks/bench_exposure_report.py --policies 2000000
+
+Writes a synthetic scored book (location, occupation, coverage_amount,
+risk_score over a few thousand cities) to a temporary CSV. It is then
+summarized two ways. The first loads the whole file into one DataFrame,
+derives city, occupation tier and risk category row by row, and runs a
+pandas group-by per dimension. The second streams it through
+exposure_report.ExposureReport in --chunk-rows chunks. The benchmark prints
+wall time, policies/s and peak traced memory for each, and checks that the
+exposure per group agrees.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exposure_report import DIMENSIONS, ExposureReport, city_of, occupation_tier_of, read_book_chunks
+from batch_scoring import RISK_CATEGORIES
+from model_router import RISK_BOUNDARIES
+
+OCCUPATIONS = ("Software Engineer", "Teacher", "Pilot", "Registered Nurse", "Roofer", "Accountant", "Commercial Fisherman", "Electrician")
+STATES = ("NY", "IL", "MA", "MO", "OR", "TX", "CA", "FL")
+
+
+def write_book(path, count, cities=3000, seed=9):
+    rng = np.random.default_rng(seed)
+    locations = np.array([f"City{i}, {STATES[i % len(STATES)]}" for i in range(cities)], dtype=object)
+    # Skewed toward the first cities, so the top of the table is a real concentration
+    city_index = np.minimum(rng.zipf(1.3, count) - 1, cities - 1)
+    frame_columns = {
+        'location': locations[city_index],
+        'occupation': np.array(OCCUPATIONS, dtype=object)[rng.integers(0, len(OCCUPATIONS), count)],
+        'coverage_amount': rng.choice((100000, 250000, 500000, 1000000, 2500000), count),
+        'risk_score': rng.integers(0, 101, count)
+    }
+    pd.DataFrame(frame_columns).to_csv(path, index=False)
+
+
+def materialized(path, chunk_rows):
+    """Whole book in memory, derived columns row by row, one group-by per dimension"""
+    book = pd.read_csv(path)
+    book['city'] = book['location'].map(city_of)
+    book['occupation_tier'] = book['occupation'].map(occupation_tier_of)
+    book['risk_category'] = book['risk_score'].map(lambda score: RISK_CATEGORIES[sum(score >= boundary for boundary in RISK_BOUNDARIES)])
+    return {dimension: book.groupby(dimension)['coverage_amount'].sum().to_dict() for dimension in DIMENSIONS}
+
+
+def chunked(path, chunk_rows):
+    report = ExposureReport().add_chunks(read_book_chunks(path, chunk_rows))
+    return {dimension: {row[dimension]: row['exposure'] for row in report.table(dimension)} for dimension in DIMENSIONS}
+
+
+def measure(fn, path, chunk_rows):
+    start = time.perf_counter()
+    result = fn(path, chunk_rows)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn(path, chunk_rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--policies", type=int, default=2000000)
+    parser.add_argument("--chunk-rows", type=int, default=250000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "book.csv")
+        write_book(path, args.policies)
+        print(f"{args.policies:,} policies, {os.path.getsize(path) / 2 ** 20:.1f}MiB CSV")
+        print(f"{'approach':<30}{'time':>9}{'policies/s':>14}{'peak memory':>14}")
+        results = {}
+        for label, fn in (("materialized pandas group-by", materialized), (f"chunked bincount ({args.chunk_rows:,})", chunked)):
+            elapsed, peak, results[label] = measure(fn, path, args.chunk_rows)
+            print(f"{label:<30}{elapsed:>8.2f}s{args.policies / elapsed:>14,.0f}{peak / 2 ** 20:>12.1f}MiB")
+
+    grouped, streamed = results.values()
+    for dimension in DIMENSIONS:
+        assert grouped[dimension].keys() == streamed[dimension].keys(), f"{dimension} groups disagree"
+        assert all(abs(grouped[dimension][key] - streamed[dimension][key]) < 1e-6 * max(1.0, grouped[dimension][key]) for key in grouped[dimension]), f"{dimension} exposure disagrees"
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Latency per agent generation profile against the local stand-in LLM server.
+
+    python benchmarks/bench_generation_profiles.py --runs 5
+
+Each agent is timed with its own profile and with the legacy shared settings
+(max 500 tokens, temperature 0.7) to show the saving from per-agent caps.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stand_in_llm_server import start_stand_in_server
+
+import underwriting_core as core
+from generation_profiles import AGENT_PROFILES, DEFAULT_PROFILE, response_cache
+
+SAMPLE_APPLICANT = {
+    'name': "John Smith",
+    'age': 35,
+    'occupation': "Software Engineer",
+    'location': "New York, NY",
+    'coverage_amount': 500000,
+    'health_status': "Good",
+    'lifestyle_factors': "Non-smoker, Regular exercise"
+}
+SAMPLE_CLAIMS = [
+    {'type': "Auto", 'amount': 4500, 'date': '2023-01-15'},
+    {'type': "Property", 'amount': 8000, 'date': '2024-03-20'}
+]
+SAMPLE_REPORTS = {'credit_score': 720, 'criminal_record': False, 'driving_record': "Clean"}
+
+
+def agent_calls(client):
+    """(profile name, agent, zero-arg call) for each of the four agents"""
+    agents = {
+        'summarization': core.DataSummarizationAgent(),
+        'claims_analysis': core.ClaimsAnalysisAgent(),
+        'risk_factors': core.RiskFactorAgent(),
+        'recommendation': core.RecommendationAgent()
+    }
+    for agent in agents.values():
+        agent.chat_model = client
+    return [
+        ('summarization', agents['summarization'], lambda: agents['summarization'].summarize_applicant(SAMPLE_APPLICANT)),
+        ('claims_analysis', agents['claims_analysis'], lambda: agents['claims_analysis'].analyze_claims(SAMPLE_CLAIMS)),
+        ('risk_factors', agents['risk_factors'], lambda: agents['risk_factors'].identify_risk_factors(SAMPLE_APPLICANT, SAMPLE_CLAIMS, SAMPLE_REPORTS)),
+        ('recommendation', agents['recommendation'], lambda: agents['recommendation'].generate_recommendation(45, "Medium Risk", "Sample factors"))
+    ]
+
+
+def time_call(call, runs, clear_cache=True):
+    samples = []
+    for _ in range(runs):
+        if clear_cache:
+            response_cache._entries.clear()
+        start = time.perf_counter()
+        output = call()
+        samples.append(time.perf_counter() - start)
+        if output is None:
+            raise RuntimeError("LLM call failed against the stand-in server")
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--ttft", type=float, default=0.05)
+    parser.add_argument("--per-token", type=float, default=0.004)
+    args = parser.parse_args()
+
+    server, url = start_stand_in_server(ttft=args.ttft, per_token=args.per_token)
+    client = core.build_llm_client("hf_stand_in_benchmark_token", endpoint_url=url)
+
+    print(f"{'agent':<18}{'profile':>34}{'legacy p50':>12}{'profile p50':>13}{'saving':>9}")
+    legacy_total = profile_total = 0.0
+    for profile_name, agent, call in agent_calls(client):
+        profile = AGENT_PROFILES[profile_name]
+        agent.profile = DEFAULT_PROFILE
+        legacy = statistics.median(time_call(call, args.runs))
+        agent.profile = profile
+        tuned = statistics.median(time_call(call, args.runs))
+        legacy_total += legacy
+        profile_total += tuned
+        described = f"max={profile.max_tokens} T={profile.temperature} stop={len(profile.stop_sequences)}"
+        print(f"{profile_name:<18}{described:>34}{legacy * 1000:>10.0f}ms{tuned * 1000:>11.0f}ms{1 - tuned / legacy:>9.0%}")
+    print(f"{'4-agent chain':<18}{'':>34}{legacy_total * 1000:>10.0f}ms{profile_total * 1000:>11.0f}ms{1 - profile_total / legacy_total:>9.0%}")
+
+    # Deterministic profiles are served from the response cache on repeat calls
+    _, rec_agent, rec_call = agent_calls(client)[-1]
+    cached = statistics.median(time_call(rec_call, args.runs, clear_cache=False)[1:] or [0.0])
+    print(f"\nrecommendation (temperature 0) repeat call served from cache: {cached * 1000:.2f}ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Cold import time of the app modules, from ``python -X importtime``.
+
+    python benchmarks/bench_import_time.py                 # app
+    python benchmarks/bench_import_time.py app --top 15
+    python benchmarks/bench_import_time.py app --max-ms 1500   # exit 1 above the budget
+
+Each module is imported in a fresh interpreter. The report lists the total
+import time, the slowest packages pulled in, and which of the heavy optional
+packages (the LLM stack) were loaded at import.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Packages that only the AI path needs; importing the app should not load them
+HEAVY_PACKAGES = ("langchain_huggingface", "langchain_core", "langchain", "huggingface_hub", "transformers")
+
+
+def measure_import(module):
+    """Return {module name: cumulative microseconds} for everything loaded by ``import module``"""
+    code = f"import sys; sys.path.insert(0, {REPO_DIR!r}); import {module}"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=REPO_DIR
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    timings = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = int(cumulative)
+    return timings
+
+
+def package_totals(timings, module):
+    """Cumulative time per root package (its slowest entry), excluding the measured module itself"""
+    totals = {}
+    for name, micros in timings.items():
+        root = name.split(".")[0]
+        if root == module.split(".")[0]:
+            continue
+        totals[root] = max(totals.get(root, 0), micros)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=["app"])
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=None, help="fail if any module takes longer to import")
+    args = parser.parse_args()
+
+    over_budget = False
+    for module in args.modules:
+        timings = measure_import(module)
+        total_ms = timings[module] / 1000
+        print(f"import {module}: {total_ms:.0f}ms")
+        totals = package_totals(timings, module)
+        for name, micros in sorted(totals.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"  {micros / 1000:>9.1f}ms  {name}")
+        loaded = [name for name in HEAVY_PACKAGES if name in timings]
+        print(f"  LLM stack loaded at import: {', '.join(loaded) if loaded else 'no'}")
+        print()
+        if args.max_ms is not None and total_ms > args.max_ms:
+            print(f"import {module} exceeds the {args.max_ms:.0f}ms budget")
+            over_budget = True
+
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Re-analysis time after small edits: full re-run versus incremental (per-agent fingerprints).
+
+    python benchmarks/bench_incremental_reanalysis.py --runs 3
+
+Runs the AI analysis against the local stand-in LLM server. For each edit the
+application is first analyzed once, then re-analyzed after the edit either
+from scratch or with the first run's node memo (as the app does with the memo
+kept in the session). The shared node cache and the response cache are
+cleared before every run so only the session memo can skip work.
+
+Edits that move the score across a routing band switch the affected agents to
+another model, so they re-run. The stand-in server's reply does not depend on
+the prompt, so a downstream agent whose upstream text is unchanged is reused
+here; with a real LLM the recommendation re-runs whenever an upstream agent did.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stand_in_llm_server import start_stand_in_server
+
+import underwriting_core as core
+from agent_graph import node_cache, NODE_REUSED
+from generation_profiles import response_cache
+
+SAMPLE_APPLICANT = {
+    'name': "John Smith",
+    'age': 35,
+    'occupation': "Software Engineer",
+    'location': "New York, NY",
+    'coverage_amount': 500000,
+    'health_status': "Good",
+    'lifestyle_factors': "Non-smoker, Regular exercise"
+}
+SAMPLE_CLAIMS = [
+    {'type': "Auto", 'amount': 4500, 'date': '2023-01-15'},
+    {'type': "Property", 'amount': 8000, 'date': '2024-03-20'}
+]
+SAMPLE_REPORTS = {'credit_score': 720, 'criminal_record': False, 'driving_record': "Clean"}
+
+EDITS = {
+    'no change': lambda a, c, r: (a, c, r),
+    'credit score 720 -> 740': lambda a, c, r: (a, c, dict(r, credit_score=740)),
+    'credit score 720 -> 780': lambda a, c, r: (a, c, dict(r, credit_score=780)),
+    'driving record': lambda a, c, r: (a, c, dict(r, driving_record="Minor violations")),
+    'coverage amount': lambda a, c, r: (dict(a, coverage_amount=750000), c, r),
+    'claim amount': lambda a, c, r: (a, [dict(c[0], amount=5200)] + c[1:], r)
+}
+
+
+def analyze(applicant, claims, reports, previous_run=None):
+    node_cache._entries.clear()
+    response_cache._entries.clear()
+    start = time.perf_counter()
+    results = core.analyze_with_ai_agents(applicant, claims, reports, "hf_benchmark", step_delay=0, previous_run=previous_run)
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--ttft", type=float, default=0.05)
+    parser.add_argument("--per-token", type=float, default=0.002)
+    args = parser.parse_args()
+
+    server, url = start_stand_in_server(ttft=args.ttft, per_token=args.per_token)
+    os.environ["UNDERWRITING_LLM_ENDPOINT_URL"] = url
+    core.prewarm_llm_clients("hf_benchmark")
+    analyze(SAMPLE_APPLICANT, SAMPLE_CLAIMS, SAMPLE_REPORTS)
+
+    print(f"{'edit':<26}{'full':>9}{'incremental':>13}{'saved':>8}  reused agents")
+    for label, edit in EDITS.items():
+        full, incremental, reused = [], [], []
+        for _ in range(args.runs):
+            _, first = analyze(SAMPLE_APPLICANT, SAMPLE_CLAIMS, SAMPLE_REPORTS)
+            edited = edit(SAMPLE_APPLICANT, SAMPLE_CLAIMS, SAMPLE_REPORTS)
+            full.append(analyze(*edited)[0])
+            elapsed, results = analyze(*edited, previous_run=first['node_memo'])
+            incremental.append(elapsed)
+            reused = [entry['node'] for entry in results['trace'] if entry['status'] == NODE_REUSED and entry['node'] in core.AGENT_CLASSES]
+        full_s, incremental_s = statistics.median(full), statistics.median(incremental)
+        print(f"{label:<26}{full_s:>8.2f}s{incremental_s:>12.2f}s{1 - incremental_s / full_s:>8.0%}  {', '.join(reused) or '-'}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""Micro-batching trade-off: throughput and latency versus batch window.
+
+    python benchmarks/bench_micro_batching.py --callers 32 --seconds 2
+
+Part 1 times the vectorized kernel (batch_scoring.calculate_risk_scores) per
+applicant at several batch sizes against the scalar calculate_risk_score.
+Part 2 runs concurrent caller threads that each score one applicant at a
+time, either directly or through a MicroBatcher with different windows, and
+reports throughput, p50/p99 latency and the mean batch size reached.
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_scoring import MicroBatcher, calculate_risk_scores
+from underwriting_core import calculate_risk_score
+
+
+def random_application(rng):
+    applicant = {
+        'age': rng.randint(18, 90),
+        'health_status': rng.choice(["Excellent", "Good", "Fair", "Poor"]),
+        'lifestyle_factors': rng.choice(["Non-smoker", "Smoker", "Smoker, High-risk sports", "Non-smoker, Regular exercise"])
+    }
+    claims = [{'type': "Auto", 'amount': 1000, 'date': "2023-01-01"}] * rng.randint(0, 6)
+    external_reports = {
+        'credit_score': rng.randint(300, 850),
+        'criminal_record': rng.random() < 0.1,
+        'driving_record': rng.choice(["Clean", "Minor violations", "Major violations"])
+    }
+    return applicant, claims, external_reports
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def time_kernel(applications, batch_size, min_items=20000):
+    batch = applications[:batch_size]
+    repeats = max(1, min_items // batch_size)
+    applicants, claims, reports = zip(*batch)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        calculate_risk_scores(applicants, claims, reports)
+    return (time.perf_counter() - start) / (repeats * batch_size)
+
+
+def run_callers(applications, callers, seconds, score):
+    """Each caller scores one application at a time for ``seconds``; returns throughput and latencies"""
+    latencies = []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + seconds
+
+    def caller(offset):
+        local = []
+        i = offset
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            score(applications[i % len(applications)])
+            local.append(time.perf_counter() - start)
+            i += callers
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=caller, args=(n,)) for n in range(callers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--callers", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--windows-ms", type=float, nargs="+", default=[0.5, 2.0, 5.0])
+    parser.add_argument("--max-batch", type=int, default=64)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    applications = [random_application(rng) for _ in range(4096)]
+
+    vectorized = calculate_risk_scores(*zip(*applications))
+    scalar = [calculate_risk_score(*application) for application in applications]
+    assert vectorized == scalar, "vectorized kernel disagrees with calculate_risk_score"
+
+    start = time.perf_counter()
+    for application in applications:
+        calculate_risk_score(*application)
+    scalar_us = (time.perf_counter() - start) / len(applications) * 1e6
+
+    print(f"kernel cost per applicant (scalar calculate_risk_score: {scalar_us:.2f}us)")
+    for batch_size in (1, 8, 64, 512, 4096):
+        print(f"  batch {batch_size:>5}: {time_kernel(applications, batch_size) * 1e6:>7.2f}us")
+
+    print(f"\n{args.callers} concurrent callers, {args.seconds:g}s per configuration")
+    print(f"{'dispatch':<26}{'scores/s':>10}{'p50':>10}{'p99':>10}{'mean batch':>12}")
+
+    throughput, latencies = run_callers(applications, args.callers, args.seconds, lambda a: calculate_risk_score(*a))
+    print(f"{'direct (scalar)':<26}{throughput:>10.0f}{percentile(latencies, 50) * 1e6:>8.0f}us{percentile(latencies, 99) * 1e6:>8.0f}us{'-':>12}")
+
+    for window_ms in args.windows_ms:
+        batcher = MicroBatcher(max_batch=args.max_batch, max_wait=window_ms / 1000)
+        throughput, latencies = run_callers(applications, args.callers, args.seconds, lambda a: batcher.submit(a).result())
+        metrics = batcher.metrics()
+        batcher.close()
+        label = f"batched {window_ms:g}ms / {args.max_batch} items"
+        print(f"{label:<26}{throughput:>10.0f}{percentile(latencies, 50) * 1e6:>8.0f}us{percentile(latencies, 99) * 1e6:>8.0f}us{metrics['mean_batch_size']:>12.1f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
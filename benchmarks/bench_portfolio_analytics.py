@@ -0,0 +1,86 @@
+"""Portfolio dashboard cost: recomputing over the stored history versus the incrementally maintained aggregates.
+
+    python benchmarks/bench_portfolio_analytics.py --sizes 10000 100000 1000000
+
+Grows a temporary assessment store (synthetic assessments from
+bench_assessment_store) through each size and times the dashboard figures
+there two ways. The first recomputes them with one GROUP BY per dimension
+over all stored assessments. The second reads the running sums in
+portfolio_stats, which save_many keeps up to date. Also reports what keeping
+the aggregates costs per stored assessment, and checks that both ways agree.
+"""
+import argparse
+import itertools
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assessment_store import AssessmentStore, ASSESSMENT_COLUMNS, UPSERT_STAT, assessment_rows
+from bench_assessment_store import synthetic_records
+from portfolio_analytics import DIMENSIONS, portfolio_summary, stat_deltas
+
+TOP_GROUPS = 15
+
+
+def recomputed_summary(conn):
+    rows = []
+    for dimension, (expression, _) in DIMENSIONS.items():
+        rows += [
+            {'dimension': dimension, 'key': key, 'assessments': n, 'score_sum': score_sum, 'coverage_sum': coverage_sum}
+            for key, n, score_sum, coverage_sum in conn.execute(
+                f"SELECT {expression}, COUNT(*), SUM(risk_score), COALESCE(SUM(coverage_amount), 0) FROM assessments GROUP BY 1"
+            )
+        ]
+    return portfolio_summary(rows)
+
+
+def median_ms(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = AssessmentStore(os.path.join(tmp, "history.db"))
+        conn = store._connection()
+        records = synthetic_records(max(args.sizes))
+        stored = 0
+
+        print(f"{'assessments':>12}{'recompute':>12}{'aggregates':>12}{'speedup':>9}")
+        for size in sorted(args.sizes):
+            while stored < size:
+                chunk = list(itertools.islice(records, min(5000, size - stored)))
+                store.save_many(chunk, batch_size=5000)
+                stored += len(chunk)
+            recompute_ms, recomputed = median_ms(lambda: recomputed_summary(conn), args.repeats)
+            incremental_ms, incremental = median_ms(lambda: portfolio_summary(store.portfolio_stats(top=TOP_GROUPS)), args.repeats)
+            recomputed = dict(recomputed, by_occupation=recomputed['by_occupation'][:TOP_GROUPS], by_location=recomputed['by_location'][:TOP_GROUPS])
+            assert recomputed == incremental, "aggregates disagree with the recomputed figures"
+            print(f"{size:>12,}{recompute_ms:>10.1f}ms{incremental_ms:>10.2f}ms{recompute_ms / incremental_ms:>8.0f}x")
+
+        # Maintenance cost: the deltas and upserts of one 5000-assessment batch, rolled back
+        batch = list(synthetic_records(5000, seed=99))
+        rows = [dict(zip(ASSESSMENT_COLUMNS, assessment_rows(0, *record)[0])) for record in batch]
+        start = time.perf_counter()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(UPSERT_STAT, [key + tuple(delta) for key, delta in stat_deltas(rows).items()])
+        conn.execute("ROLLBACK")
+        print(f"\nkeeping the aggregates: {(time.perf_counter() - start) / len(rows) * 1e6:.1f}us per stored assessment")
+        store.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""Cost of the rule-based agent narratives with memoized templates versus rebuilding them.
+
+    python benchmarks/bench_rule_narratives.py --applicants 20000
+
+Renders the four fallback narratives for random applicants twice: with the
+template caches warm (the normal path) and with every cache cleared before
+each applicant, which rebuilds all static text on every call. The rebuilt
+figure also pays for clearing the caches and splitting the templates, so it
+is an upper bound on the cost of the old per-call f-strings. Also reports
+the template cache sizes and hit rates.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import narrative_templates as templates
+from bench_micro_batching import random_application
+
+CACHED_FUNCTIONS = (
+    templates.summary_template, templates.claims_template, templates.risk_factors_template,
+    templates.recommendation_text, templates.occupation_risk, templates.occupation_tier, templates.location_type
+)
+
+
+def random_case(rng):
+    applicant, claims, external_reports = random_application(rng)
+    applicant.update(
+        name=f"Applicant {rng.randint(1, 10 ** 6)}",
+        occupation=rng.choice(["Pilot", "Registered Nurse", "Software Engineer", "Teacher", "Roofer", "Accountant"]),
+        location=rng.choice(["New York, NY", "Springfield, IL", "Boston, MA", "Kansas City, MO", "Bend, OR"]),
+        coverage_amount=rng.choice([100000, 250000, 500000, 750000, 1000000, 2500000])
+    )
+    claims = [dict(claim, type=rng.choice(["Auto", "Property", "Health"]), amount=rng.randint(500, 40000)) for claim in claims]
+    return applicant, claims, external_reports
+
+
+def render_all(cases, clear):
+    for applicant, claims, external_reports in cases:
+        if clear:
+            for fn in CACHED_FUNCTIONS:
+                fn.cache_clear()
+        templates.render_summary(applicant)
+        templates.render_claims_analysis(claims)
+        templates.render_risk_factors(applicant, claims, external_reports)
+        templates.render_recommendation(55, "Medium Risk")
+
+
+def measure(cases, clear):
+    render_all(cases[:200], clear)
+    start = time.perf_counter()
+    render_all(cases, clear)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    render_all(cases[:2000], clear)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed / len(cases) * 1e6, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--applicants", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    cases = [random_case(rng) for _ in range(args.applicants)]
+
+    print(f"{'templates':<12}{'per applicant':>15}{'peak traced':>14}")
+    for label, clear in (("rebuilt", True), ("memoized", False)):
+        per_applicant, peak = measure(cases, clear)
+        print(f"{label:<12}{per_applicant:>13.2f}us{peak / 1024:>12.0f}KiB")
+
+    print("\ntemplate caches:")
+    for name, info in templates.template_cache_info().items():
+        calls = info['hits'] + info['misses']
+        print(f"  {name:<22}{info['currsize']:>6} entries  {info['hits'] / calls if calls else 0:>6.1%} hits")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
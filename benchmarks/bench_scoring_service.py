@@ -0,0 +1,167 @@
+"""Load test for the scoring service: latency percentiles and throughput per concurrency level.
+
+    python benchmarks/bench_scoring_service.py --concurrency 1 4 16 64 --requests 2000
+    python benchmarks/bench_scoring_service.py --url http://127.0.0.1:8020   # an already running service
+
+Without --url the service is started in a subprocess (rule-based scoring, so
+no API key is needed). Every client thread keeps one HTTP/1.1 connection
+alive for all of its requests. A final run streams one NDJSON batch through
+/v1/score/batch.
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_APPLICATION = {
+    'applicant': {
+        'name': "John Smith",
+        'age': 35,
+        'occupation': "Software Engineer",
+        'location': "New York, NY",
+        'coverage_amount': 500000,
+        'health_status': "Good",
+        'lifestyle_factors': "Non-smoker, Regular exercise"
+    },
+    'claims_history': [
+        {'type': "Auto", 'amount': 4500, 'date': "2023-06-15"},
+        {'type': "Property", 'amount': 8000, 'date': "2024-03-20"}
+    ],
+    'external_reports': {'credit_score': 720, 'criminal_record': False, 'driving_record': "Clean"},
+    'mode': "rules"
+}
+
+
+def start_service(workers, max_pending, batch_window_ms=0.0):
+    """Run scoring_service.py in a subprocess on a free port; returns (process, url)"""
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(REPO_DIR, "scoring_service.py"), "--port", "0",
+         "--workers", str(workers), "--max-pending", str(max_pending),
+         "--batch-window-ms", str(batch_window_ms)],
+        stdout=subprocess.PIPE,
+        text=True,
+        cwd=REPO_DIR
+    )
+    line = proc.stdout.readline()
+    if "listening on" not in line:
+        proc.kill()
+        raise RuntimeError(f"scoring service failed to start: {line!r}")
+    return proc, line.rsplit(" ", 1)[1].strip()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_level(host, port, concurrency, total_requests, path="/v1/score"):
+    """Send ``total_requests`` single-application requests from ``concurrency`` keep-alive clients"""
+    body = json.dumps(SAMPLE_APPLICATION).encode("utf-8")
+    per_client = [total_requests // concurrency + (1 if i < total_requests % concurrency else 0) for i in range(concurrency)]
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def client(count):
+        conn = http.client.HTTPConnection(host, port, timeout=60)
+        local_latencies, local_statuses = [], {}
+        for _ in range(count):
+            start = time.perf_counter()
+            try:
+                conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                status = "connection error"
+            local_latencies.append(time.perf_counter() - start)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+        conn.close()
+        with lock:
+            latencies.extend(local_latencies)
+            for status, n in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + n
+
+    threads = [threading.Thread(target=client, args=(count,)) for count in per_client if count]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {
+        'throughput': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'mean_ms': statistics.mean(latencies) * 1000,
+        'statuses': statuses
+    }
+
+
+def run_batch(host, port, items):
+    lines = "\n".join(json.dumps(dict(SAMPLE_APPLICATION, id=i)) for i in range(items)).encode("utf-8")
+    conn = http.client.HTTPConnection(host, port, timeout=300)
+    start = time.perf_counter()
+    conn.request("POST", "/v1/score/batch", body=lines, headers={"Content-Type": "application/x-ndjson"})
+    response = conn.getresponse()
+    results = [json.loads(line) for line in response.read().splitlines() if line.strip()]
+    elapsed = time.perf_counter() - start
+    conn.close()
+    errors = sum('error' in record for record in results)
+    return elapsed, len(results), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=None, help="target a running service instead of starting one")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-pending", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=2000, help="requests per concurrency level")
+    parser.add_argument("--batch-items", type=int, default=5000)
+    parser.add_argument("--path", default="/v1/score", help="single-application endpoint to load (/v1/score or /v1/risk-score)")
+    parser.add_argument("--batch-window-ms", type=float, default=0.0, help="micro-batch window of the started service")
+    args = parser.parse_args()
+
+    proc = None
+    url = args.url
+    if url is None:
+        proc, url = start_service(args.workers, args.max_pending, args.batch_window_ms)
+    target = urlparse(url)
+
+    try:
+        # Warm up imports and code paths before timing
+        run_level(target.hostname, target.port, 1, 20, args.path)
+
+        print(f"POST {args.path}, {args.requests} requests per level ({url})")
+        print(f"{'concurrency':>11}{'req/s':>10}{'p50':>10}{'p99':>10}{'mean':>10}  statuses")
+        for concurrency in args.concurrency:
+            level = run_level(target.hostname, target.port, concurrency, args.requests, args.path)
+            print(f"{concurrency:>11}{level['throughput']:>10.0f}{level['p50_ms']:>8.2f}ms{level['p99_ms']:>8.2f}ms{level['mean_ms']:>8.2f}ms  {level['statuses']}")
+
+        elapsed, count, errors = run_batch(target.hostname, target.port, args.batch_items)
+        print(f"\nPOST /v1/score/batch, {count} NDJSON lines: {elapsed * 1000:.0f}ms ({count / elapsed:.0f} applications/s, {errors} errors)")
+
+        conn = http.client.HTTPConnection(target.hostname, target.port)
+        conn.request("GET", "/metrics")
+        metrics = json.loads(conn.getresponse().read())
+        print(f"service /metrics endpoints: {metrics['endpoints']}")
+        if 'micro_batching' in metrics:
+            print(f"service micro-batching: {metrics['micro_batching']}")
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
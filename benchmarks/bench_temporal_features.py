@@ -0,0 +1,76 @@
+"""Throughput of the vectorized temporal claims features on large claim tables.
+
+    python benchmarks/bench_temporal_features.py --rows 5000000 --applicants 1000000
+
+Builds a synthetic claims table (owner index, datetime64 date, amount) and
+times claims_temporal.temporal_features_from_arrays over all rows, then the
+optional score terms. A smaller run also times the conversion from
+per-applicant lists of claim dicts (claims_to_arrays), which is what
+temporal_features pays on top when given Python objects.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from claims_temporal import claims_to_arrays, temporal_features_from_arrays, temporal_score_adjustments
+
+
+def synthetic_table(rows, applicants, as_of, seed=3):
+    rng = np.random.default_rng(seed)
+    owners = rng.integers(0, applicants, rows)
+    dates = np.datetime64(as_of, 'D') - rng.integers(0, 365 * 15, rows).astype('timedelta64[D]')
+    amounts = rng.integers(100, 250000, rows).astype(np.float64)
+    return owners, dates, amounts
+
+
+def synthetic_histories(applicants, as_of, seed=4):
+    rng = random.Random(seed)
+    return [
+        [
+            {'type': "Auto", 'amount': rng.randint(100, 250000), 'date': (as_of - timedelta(days=rng.randint(0, 365 * 15))).isoformat()}
+            for _ in range(rng.randint(0, 10))
+        ]
+        for _ in range(applicants)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000000)
+    parser.add_argument("--applicants", type=int, default=1000000)
+    parser.add_argument("--dict-applicants", type=int, default=100000)
+    args = parser.parse_args()
+    as_of = date.today()
+
+    owners, dates, amounts = synthetic_table(args.rows, args.applicants, as_of)
+    start = time.perf_counter()
+    features = temporal_features_from_arrays(owners, dates, amounts, args.applicants, as_of)
+    features_s = time.perf_counter() - start
+    start = time.perf_counter()
+    adjustments = temporal_score_adjustments(features)
+    terms_s = time.perf_counter() - start
+    print(f"{args.rows} claim rows over {args.applicants} applicants")
+    print(f"  features:    {features_s:.2f}s ({args.rows / features_s / 1e6:.1f}M rows/s)")
+    print(f"  score terms: {terms_s * 1000:.0f}ms (mean adjustment {adjustments.mean():+.2f} points)")
+
+    histories = synthetic_histories(args.dict_applicants, as_of)
+    rows = sum(len(claims) for claims in histories)
+    start = time.perf_counter()
+    arrays = claims_to_arrays(histories)
+    convert_s = time.perf_counter() - start
+    start = time.perf_counter()
+    temporal_features_from_arrays(*arrays, len(histories), as_of)
+    dict_features_s = time.perf_counter() - start
+    print(f"{rows} claim dicts over {len(histories)} applicants")
+    print(f"  claims_to_arrays: {convert_s:.2f}s ({rows / convert_s / 1e6:.2f}M rows/s), features: {dict_features_s:.2f}s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""Local stand-in for the Hugging Face chat-completion endpoint.
+
+Latency is modelled as a fixed time-to-first-token plus a per-token cost, so
+benchmarks show how generation settings (max tokens, stop sequences) affect
+wall-clock time without calling the real API.
+
+    python benchmarks/stand_in_llm_server.py --port 8010 --ttft 0.05 --per-token 0.004
+
+Point the app at it with UNDERWRITING_LLM_ENDPOINT_URL=http://127.0.0.1:8010
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FILLER_PARAGRAPHS = [
+    "• Demographic Risk: The applicant's age and occupation place them within a standard underwriting band with no unusual exposure.",
+    "• Health Risk: Reported health status and lifestyle factors are consistent with the stated risk profile and do not require further evidence.",
+    "• Claims Pattern: Prior claims are modest in size and spread over time, indicating manageable frequency and severity.",
+    "• Financial Stability: The credit report supports the requested coverage amount and shows no signs of distress.",
+    "• Recommendation: Proceed with standard terms subject to routine verification of the submitted documents.",
+    "\n\nNote: This assessment is based solely on the information provided and should be reviewed alongside internal underwriting guidelines.",
+    "\n\nOverall, the profile is consistent with the requested product and no further escalation is required at this stage."
+]
+
+
+def generate_text(max_tokens, stop, natural_tokens):
+    """Produce filler text of up to ``max_tokens`` whitespace tokens, honouring stop sequences"""
+    words = []
+    paragraph = 0
+    while len(words) < natural_tokens:
+        words.extend(FILLER_PARAGRAPHS[paragraph % len(FILLER_PARAGRAPHS)].split(" "))
+        paragraph += 1
+    text = " ".join(words[:min(max_tokens, natural_tokens)])
+    finish_reason = "length" if max_tokens < natural_tokens else "stop"
+    for sequence in stop or []:
+        index = text.find(sequence)
+        if index != -1:
+            text = text[:index]
+            finish_reason = "stop"
+    return text, len(text.split()), finish_reason
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    ttft = 0.05
+    per_token = 0.004
+    natural_tokens = 500
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        max_tokens = payload.get("max_tokens") or payload.get("parameters", {}).get("max_new_tokens") or self.natural_tokens
+        stop = payload.get("stop") or []
+        if isinstance(stop, str):
+            stop = [stop]
+
+        text, tokens, finish_reason = generate_text(max_tokens, stop, self.natural_tokens)
+        time.sleep(self.ttft + tokens * self.per_token)
+
+        body = json.dumps({
+            "id": "stand-in",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "stand-in"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": finish_reason
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": tokens, "total_tokens": tokens}
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stand_in_server(port=0, ttft=0.05, per_token=0.004, natural_tokens=500):
+    """Start the server on a background thread and return (server, base_url)"""
+    handler = type("ConfiguredStandInHandler", (StandInHandler,), {
+        'ttft': ttft,
+        'per_token': per_token,
+        'natural_tokens': natural_tokens
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--ttft", type=float, default=0.05, help="seconds before the first token")
+    parser.add_argument("--per-token", type=float, default=0.004, help="seconds per generated token")
+    parser.add_argument("--natural-tokens", type=int, default=500, help="tokens generated when uncapped")
+    args = parser.parse_args()
+    server, url = start_stand_in_server(args.port, args.ttft, args.per_token, args.natural_tokens)
+    print(f"Stand-in LLM server listening on {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
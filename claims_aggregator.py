@@ -0,0 +1,138 @@
+"""Single-pass aggregation of claim histories.
+
+``aggregate_claims`` walks any iterable of claims once (a list, a generator
+or one of the stream readers below) and keeps only running totals, so
+histories with thousands of claims per insured never need to be held in
+memory. Claim dates are ISO ``YYYY-MM-DD`` strings and are compared as
+strings against the window cut-offs, so no per-claim date parsing is needed.
+Dates not in that form count as undated.
+"""
+import argparse
+import csv
+import json
+import sys
+from datetime import date
+
+DEFAULT_WINDOWS = (1, 3, 5)
+
+
+def years_before(as_of, years):
+    try:
+        return as_of.replace(year=as_of.year - years)
+    except ValueError:  # 29 February
+        return as_of.replace(year=as_of.year - years, day=28)
+
+
+def claim_day(value):
+    """YYYY-MM-DD prefix of a claim date, or None when it is missing or not in that form"""
+    if not value:
+        return None
+    day = str(value)[:10]
+    return day if len(day) == 10 and day[4] == day[7] == '-' else None
+
+
+class ClaimsSummary:
+    """Running totals over a claim history: count, amounts, per-type figures and time-window counts"""
+
+    def __init__(self, as_of=None, windows=DEFAULT_WINDOWS):
+        self.as_of = as_of or date.today()
+        self.windows = tuple(windows)
+        self._cutoffs = [(years, years_before(self.as_of, years).isoformat()) for years in self.windows]
+        self.count = 0
+        self.total_amount = 0
+        self.max_amount = None
+        self.by_type = {}
+        self.window_counts = {years: 0 for years in self.windows}
+        self.undated = 0
+
+    def add(self, claim):
+        amount = claim['amount']
+        self.count += 1
+        self.total_amount += amount
+        if self.max_amount is None or amount > self.max_amount:
+            self.max_amount = amount
+
+        per_type = self.by_type.get(claim['type'])
+        if per_type is None:
+            per_type = self.by_type[claim['type']] = {'count': 0, 'amount': 0}
+        per_type['count'] += 1
+        per_type['amount'] += amount
+
+        claim_date = claim_day(claim.get('date'))
+        if claim_date is None:
+            self.undated += 1
+            return
+        for years, cutoff in self._cutoffs:
+            if claim_date >= cutoff:
+                self.window_counts[years] += 1
+
+    @property
+    def mean_amount(self):
+        return self.total_amount / self.count if self.count else 0
+
+    @property
+    def claim_types(self):
+        """Distinct claim types in order of first appearance"""
+        return list(self.by_type)
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total_amount': self.total_amount,
+            'mean_amount': self.mean_amount,
+            'max_amount': self.max_amount or 0,
+            'by_type': {claim_type: dict(figures) for claim_type, figures in self.by_type.items()},
+            'window_counts': {f"{years}y": n for years, n in self.window_counts.items()},
+            'undated': self.undated,
+            'as_of': self.as_of.isoformat()
+        }
+
+
+def aggregate_claims(claims, as_of=None, windows=DEFAULT_WINDOWS):
+    """Consume ``claims`` once and return a ClaimsSummary"""
+    summary = ClaimsSummary(as_of, windows)
+    add = summary.add
+    for claim in claims:
+        add(claim)
+    return summary
+
+
+def parse_amount(value):
+    amount = float(value)
+    return int(amount) if amount.is_integer() else amount
+
+
+def read_claims_csv(stream):
+    """Yield claims from a CSV text stream with type, amount and date columns"""
+    for row in csv.DictReader(stream):
+        yield {'type': row['type'], 'amount': parse_amount(row['amount']), 'date': row.get('date') or None}
+
+
+def read_claims_ndjson(stream):
+    """Yield claims from a text stream with one JSON object per line"""
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a claims file (CSV with type,amount,date columns, or NDJSON) in one pass")
+    parser.add_argument("path", help="claims file, or - for stdin")
+    parser.add_argument("--format", choices=("csv", "ndjson"), default=None, help="defaults to the file extension")
+    parser.add_argument("--as-of", default=None, help="reference date for the time windows (YYYY-MM-DD, default today)")
+    args = parser.parse_args()
+
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    reader = read_claims_ndjson if fmt == "ndjson" else read_claims_csv
+    as_of = date.fromisoformat(args.as_of) if args.as_of else None
+    stream = sys.stdin if args.path == "-" else open(args.path, newline="", encoding="utf-8")
+    try:
+        summary = aggregate_claims(reader(stream), as_of=as_of)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    print(json.dumps(summary.to_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""Spreadsheet-style claims history editor for the Streamlit front ends.
+
+One ``st.data_editor`` grid replaces the per-claim expanders. Claims can be
+typed into the grid or imported from a CSV file (``type,amount,date``
+columns). Long histories are shown a page at a time, so a rerun renders one
+grid of at most ``PAGE_SIZE`` rows however many claims there are.
+
+The full history (the draft) lives in ``st.session_state`` under the editor
+key. Edits on the current page are merged into it on every run and folded in
+for good when the page changes, a file is imported or ``commit_claims`` is
+called. ``render_claims_grid`` can sit inside an ``st.form``. Its edits then
+arrive on submit, like any other form widget.
+"""
+import csv
+import io
+from datetime import date
+
+import streamlit as st
+
+from claims_aggregator import parse_amount, read_claims_csv
+
+CLAIM_TYPES = ["Auto", "Property", "Health", "Liability"]
+CLAIM_COLUMNS = ['type', 'amount', 'date']
+PAGE_SIZE = 50
+
+
+def claims_to_frame(claims):
+    """DataFrame with type, amount and date (datetime.date or None) columns for the grid"""
+    import pandas as pd
+    return pd.DataFrame({
+        'type': [claim['type'] for claim in claims],
+        'amount': [claim['amount'] for claim in claims],
+        'date': [date.fromisoformat(str(claim['date'])[:10]) if claim.get('date') else None for claim in claims]
+    }, columns=CLAIM_COLUMNS)
+
+
+def frame_to_claims(frame):
+    """claims_history entries from a grid DataFrame; rows without a type or amount are skipped"""
+    import pandas as pd
+    claims = []
+    for claim_type, amount, claim_date in frame[CLAIM_COLUMNS].itertuples(index=False, name=None):
+        if not claim_type or pd.isna(claim_type) or pd.isna(amount):
+            continue
+        claims.append({
+            'type': claim_type,
+            'amount': parse_amount(amount),
+            'date': None if pd.isna(claim_date) else str(claim_date)[:10]
+        })
+    return claims
+
+
+def read_claims_upload(stream):
+    """Claims from an uploaded CSV (binary stream); raises ValueError naming the offending row"""
+    claims = []
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        header = next(csv.reader([text.readline()]), [])
+        missing = [column for column in ('type', 'amount') if column not in header]
+        if missing:
+            raise KeyError(', '.join(missing))
+        text.seek(0)
+        for claim in read_claims_csv(text):
+            if claim['date']:
+                claim['date'] = date.fromisoformat(claim['date'].strip()[:10]).isoformat()
+            claims.append(claim)
+    except KeyError as e:
+        raise ValueError(f"missing column {e.args[0]}; expected {', '.join(CLAIM_COLUMNS)}")
+    except ValueError as e:
+        raise ValueError(f"row {len(claims) + 1}: {e}")
+    finally:
+        text.detach()
+    return claims
+
+
+def page_bounds(page, page_size=PAGE_SIZE):
+    start = (page - 1) * page_size
+    return start, start + page_size
+
+
+def _state_key(key, name):
+    return f"{key}_{name}"
+
+
+def get_claims_draft(key, default_claims=()):
+    draft_key = _state_key(key, 'draft')
+    if draft_key not in st.session_state:
+        st.session_state[draft_key] = [dict(claim) for claim in default_claims]
+        st.session_state[_state_key(key, 'version')] = 0
+    return st.session_state[draft_key]
+
+
+def set_claims_draft(key, claims):
+    """Replace the draft; bumping the version gives the grid a fresh widget without stale edits"""
+    st.session_state[_state_key(key, 'draft')] = claims
+    st.session_state[_state_key(key, 'merged')] = claims
+    st.session_state[_state_key(key, 'version')] += 1
+
+
+def commit_claims(key):
+    """Fold the current page's edits into the draft and return the full claims history"""
+    claims = st.session_state.get(_state_key(key, 'merged'), get_claims_draft(key))
+    set_claims_draft(key, claims)
+    return claims
+
+
+def render_claims_controls(key, default_claims=(), page_size=PAGE_SIZE):
+    """CSV import and page selector; must sit outside any form. Returns the current page number"""
+    claims = get_claims_draft(key, default_claims)
+    page_key = _state_key(key, 'page')
+
+    upload = st.file_uploader(
+        "Import Claims History (CSV)", type=["csv"], key=_state_key(key, 'upload'),
+        help="Columns: type, amount, date (YYYY-MM-DD). Replaces the claims in the grid."
+    )
+    if upload is not None and upload.file_id != st.session_state.get(_state_key(key, 'upload_id')):
+        st.session_state[_state_key(key, 'upload_id')] = upload.file_id
+        try:
+            claims = read_claims_upload(upload)
+        except ValueError as e:
+            st.error(f"❌ Could not import {upload.name}: {e}")
+        else:
+            set_claims_draft(key, claims)
+            st.session_state[page_key] = 1
+            st.success(f"✅ Imported {len(claims)} claims from {upload.name}.")
+
+    pages = max(1, -(-len(claims) // page_size))
+    if pages == 1:
+        return 1
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = pages
+    page = st.number_input(
+        f"Claims page (of {pages})", 1, pages, key=page_key, on_change=commit_claims, args=(key,),
+        help=f"{page_size} claims per page. Edits made in a form are kept only once saved."
+    )
+    start, end = page_bounds(page, page_size)
+    st.caption(f"Showing claims {start + 1}-{min(end, len(claims))} of {len(claims)}.")
+    return page
+
+
+def render_claims_grid(key, page=1, page_size=PAGE_SIZE):
+    """Grid editor for one page of the draft; returns the full claims history including this page's edits"""
+    claims = get_claims_draft(key)
+    start, end = page_bounds(page, page_size)
+    options = CLAIM_TYPES + sorted(set(claim['type'] for claim in claims) - set(CLAIM_TYPES))
+    edited = st.data_editor(
+        claims_to_frame(claims[start:end]),
+        key=_state_key(key, f"grid_{st.session_state[_state_key(key, 'version')]}_{page}"),
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            'type': st.column_config.SelectboxColumn("Type", options=options, required=True, default="Auto"),
+            'amount': st.column_config.NumberColumn("Amount ($)", min_value=0, step=1, format="$%d", required=True),
+            'date': st.column_config.DateColumn("Date", format="YYYY-MM-DD")
+        }
+    )
+    merged = claims[:start] + frame_to_claims(edited) + claims[end:]
+    st.session_state[_state_key(key, 'merged')] = merged
+    return merged
@@ -0,0 +1,144 @@
+"""Recency-weighted claims features computed with vectorized datetime64 math.
+
+Claim histories are flattened into three parallel arrays (owner index, claim
+date as ``datetime64[D]``, amount), so features for a whole batch of
+applicants come from a handful of NumPy passes over all claim rows:
+
+* claims in the last 1/3/5 years
+* exponentially decayed claim frequency and severity (a claim ``half_life_days``
+  old counts half as much as one filed today)
+* days since the most recent claim, and the mean and shortest interval
+  between consecutive claims
+
+``temporal_score_adjustments`` turns the features into optional risk score
+terms (see ``underwriting_core.calculate_risk_score``).
+"""
+from datetime import date
+
+import numpy as np
+
+from claims_aggregator import DEFAULT_WINDOWS, claim_day, years_before
+
+DEFAULT_HALF_LIFE_DAYS = 730
+DAY_BITS = 20  # day offsets within one sort key; ~2,870 years of claim dates
+
+# Optional scoring terms: points added to the rule-based score
+RECENT_CLAIM_POINTS = 5             # one claim in the last year
+REPEAT_RECENT_CLAIM_POINTS = 10     # two or more claims in the last year
+STALE_HISTORY_POINTS = -5           # claims on record, none in the last 5 years
+DECAYED_SEVERITY_THRESHOLD = 50000  # recency-weighted claim amount
+DECAYED_SEVERITY_POINTS = 5
+
+
+def to_days(days):
+    """datetime64[D] array of YYYY-MM-DD strings or 'NaT'; invalid dates (e.g. 2023-02-30) become NaT"""
+    try:
+        return np.array(days, dtype='datetime64[D]')
+    except ValueError:
+        return np.array([parse_day(day) for day in days], dtype='datetime64[D]')
+
+
+def parse_day(day):
+    try:
+        return np.datetime64(day, 'D')
+    except ValueError:
+        return np.datetime64('NaT', 'D')
+
+
+def claims_to_arrays(claims_histories):
+    """Flatten per-applicant claim lists into (owner, dates, amounts) arrays; missing or malformed dates become NaT"""
+    owners, dates, amounts = [], [], []
+    for index, claims in enumerate(claims_histories):
+        for claim in claims:
+            owners.append(index)
+            dates.append(claim_day(claim.get('date')) or 'NaT')
+            amounts.append(claim['amount'])
+    return (
+        np.array(owners, dtype=np.int64),
+        to_days(dates),
+        np.array(amounts, dtype=np.float64)
+    )
+
+
+def sort_by_owner_and_date(owners, day_numbers):
+    """(owner, day) pairs sorted by owner, then date, so consecutive rows of one owner give the intervals.
+
+    Both fit in one int64 key (owner in the high bits, day offset in the low
+    20 bits), and sorting that key is much faster than a two-key lexsort.
+    """
+    if not len(owners):
+        return owners, day_numbers
+    first_day = day_numbers.min()
+    offsets = day_numbers - first_day
+    if offsets.max() >= 1 << DAY_BITS or owners.max() >= 1 << (63 - DAY_BITS):
+        order = np.lexsort((day_numbers, owners))
+        return owners[order], day_numbers[order]
+    keys = (owners << DAY_BITS) | offsets
+    keys.sort()
+    return keys >> DAY_BITS, (keys & ((1 << DAY_BITS) - 1)) + first_day
+
+
+def temporal_features_from_arrays(owners, dates, amounts, n_applicants, as_of=None,
+                                  half_life_days=DEFAULT_HALF_LIFE_DAYS, windows=DEFAULT_WINDOWS):
+    """Features for ``n_applicants`` from flat claim arrays; returns a dict of arrays of length n_applicants"""
+    as_of = as_of or date.today()
+    today = np.datetime64(as_of, 'D')
+    dated = ~np.isnat(dates)
+    owners, dates, amounts = owners[dated], dates[dated], amounts[dated]
+
+    features = {'dated_claims': np.bincount(owners, minlength=n_applicants)}
+    for years in windows:
+        cutoff = np.datetime64(years_before(as_of, years), 'D')
+        features[f'claims_last_{years}y'] = np.bincount(owners[dates >= cutoff], minlength=n_applicants)
+
+    age_days = np.maximum((today - dates).astype(np.float64), 0.0)
+    weights = np.exp2(-age_days / half_life_days)
+    features['decayed_frequency'] = np.bincount(owners, weights=weights, minlength=n_applicants).astype(np.float64)
+    features['decayed_severity'] = np.bincount(owners, weights=weights * amounts, minlength=n_applicants).astype(np.float64)
+
+    sorted_owners, sorted_days = sort_by_owner_and_date(owners, dates.astype(np.int64))
+    days_since_last = np.full(n_applicants, np.nan)
+    if len(sorted_owners):
+        last = np.append(sorted_owners[1:] != sorted_owners[:-1], True)
+        days_since_last[sorted_owners[last]] = today.astype(np.int64) - sorted_days[last]
+    features['days_since_last'] = days_since_last
+
+    same_owner = sorted_owners[1:] == sorted_owners[:-1]
+    gaps = np.diff(sorted_days)[same_owner].astype(np.float64)
+    gap_owners = sorted_owners[1:][same_owner]
+    gap_counts = np.bincount(gap_owners, minlength=n_applicants)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        features['mean_interval_days'] = np.bincount(gap_owners, weights=gaps, minlength=n_applicants) / gap_counts
+    shortest = np.full(n_applicants, np.inf)
+    np.minimum.at(shortest, gap_owners, gaps)
+    shortest[gap_counts == 0] = np.nan
+    features['min_interval_days'] = shortest
+    return features
+
+
+def temporal_features(claims_histories, as_of=None, half_life_days=DEFAULT_HALF_LIFE_DAYS, windows=DEFAULT_WINDOWS):
+    """Features for a batch of claim histories (one list of claim dicts per applicant)"""
+    claims_histories = list(claims_histories)
+    owners, dates, amounts = claims_to_arrays(claims_histories)
+    return temporal_features_from_arrays(owners, dates, amounts, len(claims_histories), as_of, half_life_days, windows)
+
+
+def claims_temporal_features(claims_history, as_of=None, half_life_days=DEFAULT_HALF_LIFE_DAYS):
+    """Features of a single applicant as plain Python values (None where not applicable)"""
+    features = temporal_features([claims_history], as_of, half_life_days)
+    result = {}
+    for name, values in features.items():
+        value = values[0].item()
+        if isinstance(value, float) and not np.isfinite(value):
+            value = None
+        result[name] = round(value, 4) if isinstance(value, float) else value
+    return result
+
+
+def temporal_score_adjustments(features):
+    """Optional risk score terms per applicant (int array)"""
+    last_year = features['claims_last_1y']
+    adjustment = np.where(last_year >= 2, REPEAT_RECENT_CLAIM_POINTS, np.where(last_year == 1, RECENT_CLAIM_POINTS, 0))
+    adjustment += np.where((features['dated_claims'] > 0) & (features['claims_last_5y'] == 0), STALE_HISTORY_POINTS, 0)
+    adjustment += np.where(features['decayed_severity'] > DECAYED_SEVERITY_THRESHOLD, DECAYED_SEVERITY_POINTS, 0)
+    return adjustment.astype(np.int64)
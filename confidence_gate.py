@@ -0,0 +1,95 @@
+import json
+import threading
+
+from model_router import RISK_BOUNDARIES, boundary_margin
+
+AGENT_NAMES = ('summarization', 'claims_analysis', 'risk_factors', 'recommendation')
+
+
+class GatingRule:
+    """Skip the LLM call for ``skip_agents`` when the rule-based decision is clear enough.
+
+    min_margin  -- minimum distance of the risk score from the category boundaries
+    categories  -- optional risk categories the rule is limited to
+    """
+
+    def __init__(self, name, skip_agents, min_margin, categories=None):
+        self.name = name
+        self.skip_agents = set(skip_agents)
+        self.min_margin = min_margin
+        self.categories = set(categories) if categories else None
+
+    def matches(self, risk_score, risk_category, boundaries):
+        if self.categories is not None and risk_category not in self.categories:
+            return False
+        return boundary_margin(risk_score, boundaries) >= self.min_margin
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'skip_agents': sorted(self.skip_agents),
+            'min_margin': self.min_margin,
+            'categories': sorted(self.categories) if self.categories else None
+        }
+
+
+class ConfidenceGate:
+    """Decides which agents are worth an LLM call given the deterministic score (first match wins)"""
+
+    def __init__(self, rules, boundaries=RISK_BOUNDARIES):
+        self.rules = list(rules)
+        self.boundaries = tuple(boundaries)
+        self._lock = threading.Lock()
+        self._evaluated = 0
+        self._skipped = dict.fromkeys(AGENT_NAMES, 0)
+
+    def evaluate(self, risk_score, risk_category):
+        """Return (rule name or None, set of agent names whose LLM call is skipped)"""
+        rule_name, skipped = None, set()
+        for rule in self.rules:
+            if rule.matches(risk_score, risk_category, self.boundaries):
+                rule_name, skipped = rule.name, set(rule.skip_agents)
+                break
+        with self._lock:
+            self._evaluated += 1
+            for agent_name in skipped:
+                self._skipped[agent_name] = self._skipped.get(agent_name, 0) + 1
+        return rule_name, skipped
+
+    def metrics(self):
+        with self._lock:
+            possible_calls = self._evaluated * len(AGENT_NAMES)
+            skipped_calls = sum(self._skipped.values())
+            return {
+                'analyses': self._evaluated,
+                'skipped_calls': skipped_calls,
+                'skipped_share': round(skipped_calls / possible_calls, 3) if possible_calls else 0.0,
+                'skipped_by_agent': dict(self._skipped)
+            }
+
+    def to_config(self):
+        return {
+            'boundaries': list(self.boundaries),
+            'rules': [rule.to_dict() for rule in self.rules]
+        }
+
+    @classmethod
+    def from_config(cls, config):
+        rules = [GatingRule(**rule) for rule in config.get('rules', [])]
+        return cls(rules, config.get('boundaries', RISK_BOUNDARIES))
+
+
+def default_gating_rules():
+    """Skip the recommendation 20+ points from a boundary, and the risk factors too at 25+"""
+    return [
+        GatingRule("unambiguous", ['risk_factors', 'recommendation'], min_margin=25),
+        GatingRule("clear-decision", ['recommendation'], min_margin=20)
+    ]
+
+
+def load_confidence_gate(config_path=None):
+    """Gate from a JSON config file, or the default rules when no file is given"""
+    if config_path:
+        with open(config_path) as f:
+            return ConfidenceGate.from_config(json.load(f))
+    return ConfidenceGate(default_gating_rules())
@@ -0,0 +1,241 @@
+"""Category cutoffs that meet target approval and referral rates or a loss-ratio objective.
+
+The two cutoffs split a scored batch into the rule-based decisions:
+* below ``low``: Low Risk, approved at standard rates
+* from ``low`` up to ``high``: Medium Risk, approved with conditions
+* from ``high``: High Risk, referred for manual review
+
+``ScoreDistribution`` sorts the batch once. It keeps cumulative counts (and
+cumulative losses and premiums) below each distinct score. Each target is
+then a search over those prefix sums, so the whole optimization costs
+O(n log n) for the sort and is independent of how many cutoffs are tried.
+* A referral or approval rate target takes the cutoff nearest the current
+  rules' conservative side: the lowest ``high`` with at most that share
+  referred, and the lowest ``low`` that approves at least that share.
+* A loss-ratio target takes the highest cutoff whose approved (``low``) or
+  accepted (``high``) policies stay within the loss ratio.
+A cutoff without a target keeps its current value.
+
+The result carries the category mix at the new cutoffs and at the current
+ones. ``cutoff_config`` turns it into the rule configuration that
+UNDERWRITING_RISK_CUTOFFS loads.
+
+    python cutoff_optimizer.py scored.csv --max-referral-rate 0.08 --out cutoffs.json
+"""
+import argparse
+import json
+import math
+import sys
+import time
+
+import numpy as np
+
+from batch_scoring import RISK_CATEGORIES
+from model_router import RISK_BOUNDARIES
+
+LOW_TARGETS = ('min_approval_rate', 'max_approved_loss_ratio')
+HIGH_TARGETS = ('max_referral_rate', 'max_accepted_loss_ratio')
+
+
+def score_value(value):
+    """Cutoff as an int when it is a whole number, so configs read 40 rather than 40.0"""
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+class ScoreDistribution:
+    """Distinct scores of a batch with the count, losses and premiums of the policies below each"""
+
+    def __init__(self, scores, loss_amount=None, premiums=None):
+        scores = np.asarray(scores, dtype=np.float64)
+        self.values, inverse, counts = np.unique(scores, return_inverse=True, return_counts=True)
+        self.count = len(scores)
+        # Index i of the prefix arrays: policies scoring below values[i]; the last entry is the whole batch
+        self.below = np.r_[0, np.cumsum(counts)]
+        self.losses_below = np.r_[0.0, np.cumsum(np.bincount(inverse, weights=loss_amount, minlength=len(self.values)))] if loss_amount is not None else None
+        self.premiums_below = np.r_[0.0, np.cumsum(np.bincount(inverse, weights=premiums, minlength=len(self.values)))] if premiums is not None else None
+
+    def cutoff(self, index):
+        """Score at prefix ``index``; past the highest score, one point above it"""
+        return score_value(self.values[index] if index < len(self.values) else (self.values[-1] + 1 if len(self.values) else 0))
+
+    def index(self, cutoff):
+        return int(np.searchsorted(self.values, cutoff, side='left'))
+
+    def lowest_with_at_least(self, share):
+        """Prefix index of the lowest cutoff with at least ``share`` of the batch below it"""
+        needed = math.ceil(share * self.count - 1e-9)
+        return min(int(np.searchsorted(self.below, needed, side='left')), len(self.values))
+
+    def highest_within_loss_ratio(self, loss_ratio):
+        """Prefix index of the highest cutoff whose policies below it stay within ``loss_ratio``"""
+        if self.losses_below is None or self.premiums_below is None:
+            raise ValueError("a loss-ratio target needs loss amounts and premiums")
+        premiums = self.premiums_below[1:]
+        ratios = np.divide(self.losses_below[1:], premiums, out=np.full(len(premiums), np.inf), where=premiums > 0)
+        within = np.flatnonzero(ratios <= loss_ratio)
+        return int(within[-1]) + 1 if len(within) else 0
+
+    def category_mix(self, boundaries):
+        """Policies, share and loss ratio of each category at the given cutoffs"""
+        edges = [0, self.index(boundaries[0]), max(self.index(boundaries[0]), self.index(boundaries[1])), len(self.values)]
+        mix = {}
+        for category, start, end in zip(RISK_CATEGORIES, edges, edges[1:]):
+            policies = int(self.below[end] - self.below[start])
+            figures = {'policies': policies, 'share': policies / self.count if self.count else 0.0}
+            if self.losses_below is not None and self.premiums_below is not None:
+                premium = self.premiums_below[end] - self.premiums_below[start]
+                figures['loss_ratio'] = float((self.losses_below[end] - self.losses_below[start]) / premium) if premium else None
+            mix[category] = figures
+        return mix
+
+
+def optimize_cutoffs(scores, loss_amount=None, premiums=None, current=RISK_BOUNDARIES, **targets):
+    """Cutoffs for a scored batch (parallel arrays) meeting at most one target per cutoff.
+
+    Targets (shares as fractions): min_approval_rate or max_approved_loss_ratio
+    for the Low Risk cutoff, max_referral_rate or max_accepted_loss_ratio for
+    the High Risk cutoff.
+    """
+    unknown = set(targets) - set(LOW_TARGETS + HIGH_TARGETS)
+    if unknown:
+        raise ValueError(f"unknown targets: {', '.join(sorted(unknown))}")
+    targets = {name: value for name, value in targets.items() if value is not None}
+    for group in (LOW_TARGETS, HIGH_TARGETS):
+        if len(set(group) & set(targets)) > 1:
+            raise ValueError(f"set at most one of {' and '.join(group)}")
+
+    distribution = ScoreDistribution(scores, loss_amount, premiums)
+    low, high = (score_value(boundary) for boundary in current)
+    if 'max_referral_rate' in targets:
+        high = distribution.cutoff(distribution.lowest_with_at_least(1 - targets['max_referral_rate']))
+    elif 'max_accepted_loss_ratio' in targets:
+        high = distribution.cutoff(distribution.highest_within_loss_ratio(targets['max_accepted_loss_ratio']))
+    if 'min_approval_rate' in targets:
+        low = distribution.cutoff(distribution.lowest_with_at_least(targets['min_approval_rate']))
+    elif 'max_approved_loss_ratio' in targets:
+        low = distribution.cutoff(distribution.highest_within_loss_ratio(targets['max_approved_loss_ratio']))
+    # Low Risk cannot extend past High Risk; the high cutoff (capacity) wins
+    low = min(low, high)
+
+    mix = distribution.category_mix((low, high))
+    achieved = {
+        'min_approval_rate': mix["Low Risk"]['share'],
+        'max_referral_rate': mix["High Risk"]['share'],
+        'max_approved_loss_ratio': mix["Low Risk"].get('loss_ratio'),
+        'max_accepted_loss_ratio': accepted_loss_ratio(distribution, high)
+    }
+    return {
+        'policies': distribution.count,
+        'boundaries': (low, high),
+        'current_boundaries': tuple(score_value(boundary) for boundary in current),
+        'category_mix': mix,
+        'current_mix': distribution.category_mix(current),
+        'targets': {
+            name: {
+                'target': value,
+                'achieved': achieved[name],
+                'met': target_met(name, value, achieved[name])
+            }
+            for name, value in targets.items()
+        }
+    }
+
+
+def target_met(name, target, achieved):
+    if name == 'min_approval_rate':
+        return achieved >= target - 1e-12
+    # An empty category has no loss ratio and so stays within any cap
+    return achieved is None or achieved <= target + 1e-12
+
+
+def accepted_loss_ratio(distribution, high):
+    if distribution.losses_below is None or distribution.premiums_below is None:
+        return None
+    index = distribution.index(high)
+    premium = distribution.premiums_below[index]
+    return float(distribution.losses_below[index] / premium) if premium else None
+
+
+def cutoff_config(result):
+    """Rule configuration for UNDERWRITING_RISK_CUTOFFS, recording what the cutoffs were optimized for"""
+    return {
+        'boundaries': list(result['boundaries']),
+        'optimized_for': {name: figures['target'] for name, figures in result['targets'].items()},
+        'policies': result['policies'],
+        'category_mix': {category: round(figures['share'], 4) for category, figures in result['category_mix'].items()}
+    }
+
+
+def mix_rows(result):
+    """Category mix at the current and new cutoffs, one row per category"""
+    rows = []
+    for category in RISK_CATEGORIES:
+        current, proposed = result['current_mix'][category], result['category_mix'][category]
+        row = {
+            'category': category,
+            'current_policies': current['policies'],
+            'current_share': current['share'],
+            'new_policies': proposed['policies'],
+            'new_share': proposed['share']
+        }
+        if 'loss_ratio' in proposed:
+            row['current_loss_ratio'] = current['loss_ratio']
+            row['new_loss_ratio'] = proposed['loss_ratio']
+        rows.append(row)
+    return rows
+
+
+def read_scored_batch(path_or_buffer):
+    """(scores, loss amounts or None, premiums or None) from a CSV with risk_score, or with the scoring inputs"""
+    import pandas as pd
+    from backtest import OUTCOME_COLUMNS, SCORING_COLUMNS, book_premiums, rating_flags, score_book
+    book = pd.read_csv(path_or_buffer, usecols=lambda column: column in ('risk_score',) + SCORING_COLUMNS + OUTCOME_COLUMNS)
+    flags = None
+    if 'risk_score' in book:
+        scores = book['risk_score'].to_numpy()
+    else:
+        flags = rating_flags(book)
+        scores = score_book(book, flags)
+    if 'loss_amount' not in book:
+        return scores, None, None
+    premiums = book_premiums(book, scores, flags) if 'premium' in book or flags is not None else None
+    return scores, book['loss_amount'].to_numpy(dtype=np.float64), premiums
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Category cutoffs for a scored batch (risk_score, or the scoring inputs; loss_amount and premium for loss-ratio targets)")
+    parser.add_argument("path", help="scored CSV, or - for stdin")
+    parser.add_argument("--max-referral-rate", type=float, default=None, help="largest share referred for manual review (High Risk)")
+    parser.add_argument("--max-accepted-loss-ratio", type=float, default=None, help="largest loss ratio of the policies not referred")
+    parser.add_argument("--min-approval-rate", type=float, default=None, help="smallest share approved at standard rates (Low Risk)")
+    parser.add_argument("--max-approved-loss-ratio", type=float, default=None, help="largest loss ratio of the Low Risk policies")
+    parser.add_argument("--out", default=None, help="write the cutoffs as a rule configuration (JSON) here")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    scores, loss_amount, premiums = read_scored_batch(sys.stdin if args.path == "-" else args.path)
+    loaded = time.perf_counter()
+    result = optimize_cutoffs(
+        scores, loss_amount, premiums,
+        max_referral_rate=args.max_referral_rate,
+        max_accepted_loss_ratio=args.max_accepted_loss_ratio,
+        min_approval_rate=args.min_approval_rate,
+        max_approved_loss_ratio=args.max_approved_loss_ratio
+    )
+    print(f"{result['policies']:,} policies read in {loaded - start:.2f}s, optimized in {time.perf_counter() - loaded:.3f}s")
+    print("cutoffs: {} -> {}".format("/".join(f"{b:g}" for b in result['current_boundaries']), "/".join(f"{b:g}" for b in result['boundaries'])))
+    print(f"\n{'category':<14}{'current':>10}{'new':>10}")
+    for row in mix_rows(result):
+        print(f"{row['category']:<14}{row['current_share']:>10.1%}{row['new_share']:>10.1%}")
+    for name, figures in result['targets'].items():
+        achieved = f"{figures['achieved']:.2%}" if figures['achieved'] is not None else "n/a (no policies)"
+        print(f"{name}: target {figures['target']:.2%}, achieved {achieved}{'' if figures['met'] else ' (NOT MET)'}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(cutoff_config(result), f, indent=2)
+        print(f"\nwrote {args.out}; apply it with UNDERWRITING_RISK_CUTOFFS={args.out}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
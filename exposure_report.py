@@ -0,0 +1,238 @@
+"""Concentration of coverage exposure by city, occupation risk tier and risk category.
+
+``ExposureReport`` accumulates a scored book of policies chunk by chunk. Each
+chunk is a mapping of columns (a DataFrame, or the dicts yielded by
+``AssessmentStore.iter_columns``) with the applicant fields the form
+captures:
+* ``location``
+* ``occupation``
+* ``coverage_amount``
+* ``risk_category``, or a ``risk_score`` to derive it from
+
+Per chunk, every dimension is factorized once. The policy counts, the exposure
+and the High Risk exposure per group then come from ``np.bincount``. Only the
+per-group totals are kept between chunks, so memory is bounded by the number
+of distinct cities, not by the size of the book.
+
+The report lists the top-N concentrations per dimension, the High Risk share
+of exposure overall and per group, and breaches of the concentration and
+High Risk share limits. Every table can be exported as CSV.
+
+    python exposure_report.py book.csv --top 10 --out-dir exposure/
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+
+import numpy as np
+
+from batch_scoring import RISK_CATEGORIES
+from model_router import RISK_BOUNDARIES
+from narrative_templates import occupation_tier
+
+HIGH_RISK = RISK_CATEGORIES.index("High Risk")
+DIMENSIONS = ('city', 'occupation_tier', 'risk_category')
+DIMENSION_SOURCES = {'city': 'location', 'occupation_tier': 'occupation', 'risk_category': None}
+BOOK_COLUMNS = ('location', 'occupation', 'coverage_amount', 'risk_category', 'risk_score')
+
+# Largest share of total exposure a single group may hold (None: no limit)
+DEFAULT_CONCENTRATION_LIMITS = {'city': 0.10, 'occupation_tier': 0.60, 'risk_category': None}
+# Largest High Risk share of a group's own exposure, checked for groups with at least HIGH_RISK_MIN_POLICIES
+DEFAULT_HIGH_RISK_LIMIT = 0.25
+HIGH_RISK_MIN_POLICIES = 10
+CHUNK_ROWS = 250000
+TABLE_COLUMNS = ('policies', 'exposure', 'exposure_share', 'high_risk_exposure', 'high_risk_share')
+
+
+def city_of(location):
+    """City part of a 'City, ST' location"""
+    if not isinstance(location, str):
+        return "Unknown"
+    return location.split(',')[0].strip() or "Unknown"
+
+
+def occupation_tier_of(occupation):
+    """Occupation risk tier, Standard when missing"""
+    return occupation_tier(occupation) if isinstance(occupation, str) else "Standard"
+
+
+def factorize(values, key_of=None):
+    """(keys, codes) for a column; ``key_of`` maps each distinct raw value to its group key"""
+    import pandas as pd
+    # Series and arrays are factorized as they are; lists (store chunks) go through an object array
+    codes, uniques = pd.factorize(values if hasattr(values, 'dtype') else np.asarray(values, dtype=object), use_na_sentinel=False)
+    if key_of is None:
+        return list(uniques), codes
+    # Mapping the few distinct raw values, then merging those that share a key
+    keys, remap = np.unique(np.array([key_of(value) for value in uniques], dtype=object), return_inverse=True)
+    return list(keys), remap[codes]
+
+
+def category_codes(chunk):
+    """Risk category index per row (0 Low, 1 Medium, 2 High) from risk_category or risk_score"""
+    if 'risk_category' in chunk and chunk['risk_category'] is not None:
+        keys, codes = factorize(chunk['risk_category'])
+        lookup = np.array([RISK_CATEGORIES.index(key) if key in RISK_CATEGORIES else -1 for key in keys], dtype=np.int64)
+        categories = lookup[codes]
+        if (categories >= 0).all():
+            return categories
+        if 'risk_score' not in chunk:
+            raise ValueError(f"unknown risk categories: {sorted(set(keys) - set(RISK_CATEGORIES))}")
+    scores = np.asarray(chunk['risk_score'], dtype=np.float64)
+    return np.searchsorted(np.asarray(RISK_BOUNDARIES), scores, side='right')
+
+
+class ExposureReport:
+    """Exposure totals per city, occupation tier and risk category, accumulated over chunks"""
+
+    def __init__(self):
+        self.policies = 0
+        self.exposure = 0.0
+        self.high_risk_exposure = 0.0
+        # dimension -> {key: [policies, exposure, high_risk_exposure]}
+        self.groups = {dimension: {} for dimension in DIMENSIONS}
+
+    def add_chunk(self, chunk):
+        coverage = np.asarray(chunk['coverage_amount'], dtype=np.float64)
+        if not len(coverage):
+            return self
+        categories = category_codes(chunk)
+        high_risk_coverage = np.where(categories == HIGH_RISK, coverage, 0.0)
+        self.policies += len(coverage)
+        self.exposure += float(coverage.sum())
+        self.high_risk_exposure += float(high_risk_coverage.sum())
+
+        for dimension in DIMENSIONS:
+            if dimension == 'risk_category':
+                keys, codes = list(RISK_CATEGORIES), categories
+            else:
+                keys, codes = factorize(chunk[DIMENSION_SOURCES[dimension]], city_of if dimension == 'city' else occupation_tier_of)
+            policies = np.bincount(codes, minlength=len(keys))
+            exposure = np.bincount(codes, weights=coverage, minlength=len(keys))
+            high_risk = np.bincount(codes, weights=high_risk_coverage, minlength=len(keys))
+            groups = self.groups[dimension]
+            for key, n, amount, high_amount in zip(keys, policies.tolist(), exposure.tolist(), high_risk.tolist()):
+                if not n:
+                    continue
+                totals = groups.get(key)
+                if totals is None:
+                    groups[key] = [n, amount, high_amount]
+                else:
+                    totals[0] += n
+                    totals[1] += amount
+                    totals[2] += high_amount
+        return self
+
+    def add_chunks(self, chunks):
+        for chunk in chunks:
+            self.add_chunk(chunk)
+        return self
+
+    @property
+    def high_risk_share(self):
+        return self.high_risk_exposure / self.exposure if self.exposure else 0.0
+
+    def table(self, dimension, top=None):
+        """Groups of a dimension by exposure, largest first, with their shares"""
+        rows = [
+            {
+                dimension: key,
+                'policies': n,
+                'exposure': amount,
+                'exposure_share': amount / self.exposure if self.exposure else 0.0,
+                'high_risk_exposure': high_amount,
+                'high_risk_share': high_amount / amount if amount else 0.0
+            }
+            for key, (n, amount, high_amount) in self.groups[dimension].items()
+        ]
+        rows.sort(key=lambda row: -row['exposure'])
+        return rows[:top] if top else rows
+
+    def breaches(self, concentration_limits=None, high_risk_limit=DEFAULT_HIGH_RISK_LIMIT, min_policies=HIGH_RISK_MIN_POLICIES):
+        """Groups over a concentration limit, and groups (and the book) over the High Risk share limit"""
+        limits = dict(DEFAULT_CONCENTRATION_LIMITS, **(concentration_limits or {}))
+        found = []
+        if high_risk_limit is not None and self.high_risk_share > high_risk_limit:
+            found.append({'dimension': 'book', 'group': 'all policies', 'measure': 'high_risk_share', 'value': self.high_risk_share, 'limit': high_risk_limit})
+        for dimension in DIMENSIONS:
+            for row in self.table(dimension):
+                limit = limits.get(dimension)
+                if limit is not None and row['exposure_share'] > limit:
+                    found.append({'dimension': dimension, 'group': row[dimension], 'measure': 'exposure_share', 'value': row['exposure_share'], 'limit': limit})
+                if (dimension != 'risk_category' and high_risk_limit is not None
+                        and row['policies'] >= min_policies and row['high_risk_share'] > high_risk_limit):
+                    found.append({'dimension': dimension, 'group': row[dimension], 'measure': 'high_risk_share', 'value': row['high_risk_share'], 'limit': high_risk_limit})
+        return found
+
+    def summary(self):
+        return {
+            'policies': self.policies,
+            'exposure': self.exposure,
+            'high_risk_exposure': self.high_risk_exposure,
+            'high_risk_share': self.high_risk_share
+        }
+
+
+def rows_to_csv(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(columns), extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def table_csv(report, dimension, top=None):
+    return rows_to_csv(report.table(dimension, top), (dimension,) + TABLE_COLUMNS)
+
+
+def breaches_csv(breaches):
+    return rows_to_csv(breaches, ('dimension', 'group', 'measure', 'value', 'limit'))
+
+
+def read_book_chunks(path_or_buffer, chunk_rows=CHUNK_ROWS):
+    """DataFrame chunks of a policy CSV, reading only the columns the report uses"""
+    import pandas as pd
+    return pd.read_csv(path_or_buffer, usecols=lambda column: column in BOOK_COLUMNS, chunksize=chunk_rows)
+
+
+def store_chunks(store, chunk_rows=CHUNK_ROWS):
+    """Chunks of the assessments in an AssessmentStore"""
+    return store.iter_columns(('location', 'occupation', 'coverage_amount', 'risk_category'), chunk_rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concentration of coverage exposure in a scored policy CSV (location, occupation, coverage_amount and risk_category or risk_score columns)")
+    parser.add_argument("path", help="policy CSV, or - for stdin")
+    parser.add_argument("--top", type=int, default=10, help="groups listed per dimension")
+    parser.add_argument("--city-limit", type=float, default=DEFAULT_CONCENTRATION_LIMITS['city'], help="largest share of total exposure in one city")
+    parser.add_argument("--tier-limit", type=float, default=DEFAULT_CONCENTRATION_LIMITS['occupation_tier'], help="largest share of total exposure in one occupation tier")
+    parser.add_argument("--high-risk-limit", type=float, default=DEFAULT_HIGH_RISK_LIMIT, help="largest High Risk share of exposure")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--out-dir", default=None, help="also write one CSV per table here")
+    args = parser.parse_args()
+
+    report = ExposureReport().add_chunks(read_book_chunks(sys.stdin if args.path == "-" else args.path, args.chunk_rows))
+    breaches = report.breaches({'city': args.city_limit, 'occupation_tier': args.tier_limit}, args.high_risk_limit)
+    summary = report.summary()
+    print(f"{summary['policies']:,} policies, ${summary['exposure']:,.0f} exposure, {summary['high_risk_share']:.1%} of it High Risk")
+    for dimension in DIMENSIONS:
+        print(f"\n{dimension:<24}{'policies':>12}{'exposure':>18}{'share':>8}{'high risk':>11}")
+        for row in report.table(dimension, args.top):
+            print(f"{str(row[dimension])[:23]:<24}{row['policies']:>12,}{row['exposure']:>18,.0f}{row['exposure_share']:>8.1%}{row['high_risk_share']:>11.1%}")
+    print(f"\n{len(breaches)} limit breaches")
+    for breach in breaches:
+        print(f"  {breach['dimension']} {breach['group']}: {breach['measure']} {breach['value']:.1%} > {breach['limit']:.1%}")
+
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+        for dimension in DIMENSIONS:
+            with open(os.path.join(args.out_dir, f"exposure_by_{dimension}.csv"), "w", newline="", encoding="utf-8") as f:
+                f.write(table_csv(report, dimension))
+        with open(os.path.join(args.out_dir, "exposure_breaches.csv"), "w", newline="", encoding="utf-8") as f:
+            f.write(breaches_csv(breaches))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Stop sequences that Mixtral-style instruct models sometimes leak past the answer
+INSTRUCT_STOP_SEQUENCES = ("</s>", "[INST]")
+
+
+class GenerationProfile:
+    """Per-agent decoding settings passed to the chat client on each call"""
+
+    def __init__(self, name, max_tokens, temperature, stop_sequences=()):
+        self.name = name
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.stop_sequences = tuple(stop_sequences)
+
+    @property
+    def deterministic(self):
+        """Greedy decoding - identical prompts give identical answers, so responses can be cached"""
+        return self.temperature == 0
+
+    def invoke_kwargs(self):
+        kwargs = {
+            'max_tokens': self.max_tokens,
+            'temperature': self.temperature
+        }
+        if self.stop_sequences:
+            kwargs['stop'] = list(self.stop_sequences)
+        return kwargs
+
+    def cache_key(self, model_id, prompt):
+        raw = f"{model_id}\x00{self.name}\x00{self.max_tokens}\x00{self.temperature}\x00{self.stop_sequences}\x00{prompt}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def __repr__(self):
+        return f"GenerationProfile({self.name!r}, max_tokens={self.max_tokens}, temperature={self.temperature})"
+
+
+DEFAULT_PROFILE = GenerationProfile("default", max_tokens=500, temperature=0.7, stop_sequences=INSTRUCT_STOP_SEQUENCES)
+
+AGENT_PROFILES = {
+    # Structured overview with three headed sections
+    'summarization': GenerationProfile("summarization", max_tokens=450, temperature=0.3, stop_sequences=INSTRUCT_STOP_SEQUENCES),
+    # Roughly ten sentences of analysis
+    'claims_analysis': GenerationProfile("claims_analysis", max_tokens=320, temperature=0.3, stop_sequences=INSTRUCT_STOP_SEQUENCES),
+    # 3-5 short bullets; stop before the model starts adding commentary
+    'risk_factors': GenerationProfile("risk_factors", max_tokens=220, temperature=0.2, stop_sequences=INSTRUCT_STOP_SEQUENCES + ("\n\nNote", "\n\nIn summary", "\n\nOverall")),
+    # Decision must be reproducible for the same inputs; includes the trailing DECISION_JSON line
+    'recommendation': GenerationProfile("recommendation", max_tokens=320, temperature=0.0, stop_sequences=INSTRUCT_STOP_SEQUENCES)
+}
+
+
+def get_generation_profile(name):
+    return AGENT_PROFILES.get(name, DEFAULT_PROFILE)
+
+
+class ResponseCache:
+    """Small thread-safe LRU cache for responses from deterministic profiles"""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+response_cache = ResponseCache()
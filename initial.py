@@ -2,6 +2,9 @@ import streamlit as st
 import json
 from datetime import datetime
 import pandas as pd
+from underwriting_core import calculate_risk_score
+from claims_aggregator import aggregate_claims
+from claims_editor import render_claims_controls, render_claims_grid
 
 # Page config
 st.set_page_config(
@@ -84,85 +87,64 @@ def analyze_risk(applicant_data, claims_history, external_reports):
     """
     
     # Step 2: Claims Analysis
-    total_claims = len(claims_history)
-    total_claim_amount = sum([c['amount'] for c in claims_history])
+    claims_totals = aggregate_claims(claims_history)
+    total_claims = claims_totals.count
+    total_claim_amount = claims_totals.total_amount
     
     claims_summary = f"""
     Claims History:
     - Total Claims: {total_claims}
     - Total Amount: ${total_claim_amount:,}
-    - Claim Types: {', '.join(set([c['type'] for c in claims_history]))}
+    - Claim Types: {', '.join(claims_totals.claim_types)}
     """
     
-    # Step 3: Risk Scoring (Simulated LLM chain)
+    # Step 3: Risk Scoring (shared core scoring rules)
+    risk_score, risk_category, color_class = calculate_risk_score(applicant_data, claims_history, external_reports)
+    
     risk_factors = []
-    risk_score = 50  # Base score
     
     # Age factor
     if applicant_data['age'] < 25:
-        risk_score += 10
         risk_factors.append("Young driver/applicant - higher risk profile")
     elif applicant_data['age'] > 65:
-        risk_score += 15
         risk_factors.append("Senior age - increased health considerations")
-    else:
-        risk_score -= 5
     
     # Claims history factor
     if total_claims > 3:
-        risk_score += 20
         risk_factors.append("Multiple prior claims indicating pattern")
     elif total_claims > 0:
-        risk_score += 10
         risk_factors.append("Previous claims history present")
     else:
-        risk_score -= 10
         risk_factors.append("Clean claims history - positive indicator")
     
     # Health status factor
     if applicant_data['health_status'] == 'Excellent':
-        risk_score -= 15
         risk_factors.append("Excellent health status - low risk")
     elif applicant_data['health_status'] == 'Poor':
-        risk_score += 25
         risk_factors.append("Poor health status - significant risk factor")
     
     # Lifestyle factor
     if 'Smoker' in applicant_data['lifestyle_factors']:
-        risk_score += 15
         risk_factors.append("Smoking habit increases risk profile")
     if 'High-risk sports' in applicant_data['lifestyle_factors']:
-        risk_score += 10
         risk_factors.append("High-risk activities noted")
     
     # External reports factor
     if external_reports['credit_score'] < 600:
-        risk_score += 10
         risk_factors.append("Low credit score indicates financial instability")
     elif external_reports['credit_score'] > 750:
-        risk_score -= 5
         risk_factors.append("Strong credit score - financially stable")
     
     if external_reports['criminal_record']:
-        risk_score += 20
         risk_factors.append("Criminal record present - elevated risk")
     
-    # Normalize score to 0-100
-    risk_score = max(0, min(100, risk_score))
-    
-    # Determine risk category
-    if risk_score < 40:
-        risk_category = "Low Risk"
+    # Recommendation by risk category
+    if risk_category == "Low Risk":
         recommendation = "APPROVE - Standard premium rates recommended"
-        color_class = "risk-low"
-    elif risk_score < 70:
-        risk_category = "Medium Risk"
+    elif risk_category == "Medium Risk":
         recommendation = "APPROVE WITH CONDITIONS - Consider adjusted premium or additional clauses"
-        color_class = "risk-medium"
     else:
-        risk_category = "High Risk"
         recommendation = "REVIEW REQUIRED - Manual underwriter review recommended before approval"
-        color_class = "risk-high"
     
     return {
         'risk_score': risk_score,
@@ -222,26 +204,10 @@ def main():
                 ["Non-smoker", "Regular exercise"])
             
         st.markdown("### Claims History")
-        num_claims = st.number_input("Number of Previous Claims", 0, 10, 2)
-        
-        claims_history = []
-        if num_claims > 0:
-            for i in range(num_claims):
-                with st.expander(f"Claim {i+1}"):
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        claim_type = st.selectbox(f"Type", 
-                            ["Auto", "Property", "Health", "Liability"], key=f"type_{i}")
-                    with col2:
-                        claim_amount = st.number_input(f"Amount ($)", 100, 100000, 5000, key=f"amt_{i}")
-                    with col3:
-                        claim_date = st.date_input(f"Date", key=f"date_{i}")
-                    
-                    claims_history.append({
-                        'type': claim_type,
-                        'amount': claim_amount,
-                        'date': str(claim_date)
-                    })
+        # One grid, paged for long histories, instead of an expander per claim
+        default_claims = [{'type': "Auto", 'amount': 5000, 'date': str(datetime.now().date())} for _ in range(2)]
+        claims_page = render_claims_controls("claims", default_claims)
+        claims_history = render_claims_grid("claims", claims_page)
         
         st.markdown("### External Reports")
         col1, col2, col3 = st.columns(3)
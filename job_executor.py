@@ -0,0 +1,140 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATES = (JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once cancellation has been requested"""
+
+
+def checkpoint(cancel_event, progress_callback, progress, status_text):
+    """Abort if the job was cancelled, otherwise report progress"""
+    if cancel_event is not None and cancel_event.is_set():
+        raise JobCancelled()
+    if progress_callback is not None:
+        progress_callback(progress, status_text)
+
+
+class AnalysisJob:
+    """State of a single background analysis"""
+
+    def __init__(self, label):
+        self.job_id = uuid.uuid4().hex
+        self.label = label
+        self.status = JOB_PENDING
+        self.progress = 0
+        self.status_text = "Queued - waiting for a free worker..."
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    @property
+    def done(self):
+        return self.status in FINISHED_STATES
+
+    @property
+    def elapsed(self):
+        start = self.started_at or self.submitted_at
+        end = self.finished_at or time.time()
+        return end - start
+
+    def report_progress(self, progress, status_text):
+        self.progress = progress
+        self.status_text = status_text
+
+
+class AnalysisJobExecutor:
+    """Process-wide worker pool that runs analyses outside the Streamlit script thread.
+
+    Submitted callables receive ``progress_callback`` and ``cancel_event`` keyword
+    arguments so they can report progress and stop early when cancelled.
+    """
+
+    def __init__(self, max_workers=4, max_retained_jobs=200):
+        self.max_workers = max_workers
+        self.max_retained_jobs = max_retained_jobs
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="underwriting-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, label="analysis", **kwargs):
+        """Queue ``fn`` on the pool and return the new job id"""
+        job = AnalysisJob(label)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._prune_finished()
+        job.future = self._pool.submit(self._run, job, fn, args, kwargs)
+        return job.job_id
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Request cancellation; queued jobs are dropped, running ones stop at the next checkpoint"""
+        job = self.get(job_id)
+        if job is None or job.done:
+            return False
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            self._finish(job, JOB_CANCELLED, status_text="Cancelled before start")
+        return True
+
+    def discard(self, job_id):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def active_count(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.done)
+
+    def shutdown(self):
+        for job_id in list(self._jobs):
+            self.cancel(job_id)
+        self._pool.shutdown(wait=False)
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancel_event.is_set():
+            self._finish(job, JOB_CANCELLED, status_text="Cancelled before start")
+            return
+        job.status = JOB_RUNNING
+        job.started_at = time.time()
+        job.status_text = "Starting..."
+        try:
+            result = fn(*args, progress_callback=job.report_progress, cancel_event=job.cancel_event, **kwargs)
+        except JobCancelled:
+            self._finish(job, JOB_CANCELLED, status_text="Cancelled")
+        except Exception as e:
+            self._finish(job, JOB_FAILED, error=str(e), status_text="Failed")
+        else:
+            self._finish(job, JOB_COMPLETED, result=result, status_text="Complete")
+
+    def _finish(self, job, status, result=None, error=None, status_text=""):
+        job.result = result
+        job.error = error
+        job.status_text = status_text
+        job.finished_at = time.time()
+        if status == JOB_COMPLETED:
+            job.progress = 100
+        job.status = status
+
+    def _prune_finished(self):
+        excess = len(self._jobs) - self.max_retained_jobs
+        if excess <= 0:
+            return
+        for job_id in [jid for jid, job in self._jobs.items() if job.done][:excess]:
+            del self._jobs[job_id]
@@ -0,0 +1,143 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+HF_TOKEN_PREFIXES = ("hf_", "api_")
+MIN_TOKEN_LENGTH = 20
+
+
+def hash_api_key(api_key):
+    """Stable identifier for an API key so raw keys are never used as cache keys"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+def looks_like_api_key(api_key):
+    """Cheap format check used before paying for client construction"""
+    api_key = (api_key or "").strip()
+    return len(api_key) >= MIN_TOKEN_LENGTH and api_key.startswith(HF_TOKEN_PREFIXES)
+
+
+class _PoolEntry:
+    def __init__(self, client):
+        self.client = client
+        self.created_at = time.time()
+        self.last_used = self.created_at
+
+
+class LLMClientPool:
+    """LRU pool of LLM clients keyed by API key hash and model, with idle eviction.
+
+    Clients are built on first use by ``factory(api_key, model_id)``; keys that
+    fail to build are remembered (by hash) for ``failure_ttl`` seconds, so the
+    UI can report them without retrying on every rerun.
+    """
+
+    def __init__(self, factory, max_size=8, idle_ttl=1800, failure_ttl=300):
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self.failure_ttl = failure_ttl
+        self._entries = OrderedDict()
+        self._failures = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks = {}
+
+    def get(self, api_key, model_id=None):
+        """Return a pooled client for ``api_key`` and ``model_id``, building it if needed (None on failure).
+
+        A key that failed to build within ``failure_ttl`` seconds returns None without rebuilding.
+        """
+        if not api_key:
+            return None
+        key_hash = self._pool_key(api_key, model_id)
+        client = self._lookup(key_hash)
+        if client is not None or self._recent_failure(key_hash) is not None:
+            return client
+
+        with self._build_lock(key_hash):
+            # Another thread may have finished building while we waited
+            client = self._lookup(key_hash)
+            if client is not None or self._recent_failure(key_hash) is not None:
+                return client
+            try:
+                client = self.factory(api_key, model_id) if model_id else self.factory(api_key)
+            except Exception as e:
+                with self._lock:
+                    self._failures[key_hash] = (str(e), time.time())
+                    self._failures.move_to_end(key_hash)
+                    self._build_locks.pop(key_hash, None)
+                    while len(self._failures) > self.max_size:
+                        self._failures.popitem(last=False)
+                return None
+
+            with self._lock:
+                self._failures.pop(key_hash, None)
+                self._build_locks.pop(key_hash, None)
+                self._entries[key_hash] = _PoolEntry(client)
+                self._entries.move_to_end(key_hash)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return client
+
+    def prewarm(self, api_key, model_ids=(None,), background=True):
+        """Build the clients for ``api_key`` ahead of the first analysis"""
+        if not looks_like_api_key(api_key):
+            return None
+        if background:
+            thread = threading.Thread(target=self.prewarm, args=(api_key, model_ids, False), name="llm-pool-prewarm", daemon=True)
+            thread.start()
+            return thread
+        return [self.get(api_key, model_id) for model_id in model_ids]
+
+    def is_ready(self, api_key, model_id=None):
+        with self._lock:
+            return bool(api_key) and self._pool_key(api_key, model_id) in self._entries
+
+    def last_error(self, api_key, model_id=None):
+        return self._recent_failure(self._pool_key(api_key, model_id)) if api_key else None
+
+    def evict_idle(self):
+        """Drop clients that have not been used within ``idle_ttl`` seconds"""
+        cutoff = time.time() - self.idle_ttl
+        with self._lock:
+            for key_hash in [k for k, entry in self._entries.items() if entry.last_used < cutoff]:
+                del self._entries[key_hash]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'failed_keys': len(self._failures)
+            }
+
+    def _pool_key(self, api_key, model_id):
+        key_hash = hash_api_key(api_key)
+        return f"{key_hash}:{model_id}" if model_id else key_hash
+
+    def _lookup(self, key_hash):
+        self.evict_idle()
+        with self._lock:
+            entry = self._entries.get(key_hash)
+            if entry is None:
+                return None
+            entry.last_used = time.time()
+            self._entries.move_to_end(key_hash)
+            return entry.client
+
+    def _recent_failure(self, key_hash):
+        """Error message of a build failure within ``failure_ttl`` seconds, else None"""
+        with self._lock:
+            failure = self._failures.get(key_hash)
+            if failure is None:
+                return None
+            error, failed_at = failure
+            if time.time() - failed_at >= self.failure_ttl:
+                del self._failures[key_hash]
+                return None
+            return error
+
+    def _build_lock(self, key_hash):
+        with self._lock:
+            return self._build_locks.setdefault(key_hash, threading.Lock())
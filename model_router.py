@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+
+LARGE_MODEL = "mistralai/Mixtral-8x7B-Instruct-v0.1"
+SMALL_MODEL = "mistralai/Mistral-7B-Instruct-v0.3"
+
+# Category boundaries: Low Risk below the first, High Risk from the second
+DEFAULT_RISK_BOUNDARIES = (40, 70)
+# Medium Risk scores this close below the High Risk boundary get the higher premium band
+MEDIUM_HIGH_BAND = 10
+
+
+def load_risk_boundaries(config_path=None):
+    """Category cutoffs from a JSON rule config ({"boundaries": [low, high]}), or the defaults when no file is given"""
+    if not config_path:
+        return DEFAULT_RISK_BOUNDARIES
+    with open(config_path) as f:
+        boundaries = tuple(json.load(f)['boundaries'])
+    if len(boundaries) != 2 or not boundaries[0] <= boundaries[1]:
+        raise ValueError(f"risk boundaries must be [low, high] with low <= high, got {list(boundaries)}")
+    return boundaries
+
+
+# Category boundaries used by calculate_risk_score and the rule-based decision (UNDERWRITING_RISK_CUTOFFS)
+RISK_BOUNDARIES = load_risk_boundaries(os.environ.get("UNDERWRITING_RISK_CUTOFFS"))
+
+
+def boundary_margin(risk_score, boundaries=RISK_BOUNDARIES):
+    """Distance from the score to the nearest category boundary"""
+    return min(abs(risk_score - boundary) for boundary in boundaries)
+
+
+class RoutingRule:
+    """Send matching agent calls to ``model``; unset conditions match anything.
+
+    agents      -- agent names the rule applies to (see generation_profiles.AGENT_PROFILES)
+    categories  -- risk categories the rule applies to
+    min_margin  -- minimum distance of the risk score from the category boundaries
+    """
+
+    def __init__(self, name, model, agents=None, categories=None, min_margin=None):
+        self.name = name
+        self.model = model
+        self.agents = set(agents) if agents else None
+        self.categories = set(categories) if categories else None
+        self.min_margin = min_margin
+
+    def matches(self, agent_name, risk_score, risk_category, boundaries):
+        if self.agents is not None and agent_name not in self.agents:
+            return False
+        if self.categories is not None and risk_category not in self.categories:
+            return False
+        if self.min_margin is not None:
+            if risk_score is None or boundary_margin(risk_score, boundaries) < self.min_margin:
+                return False
+        return True
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'model': self.model,
+            'agents': sorted(self.agents) if self.agents else None,
+            'categories': sorted(self.categories) if self.categories else None,
+            'min_margin': self.min_margin
+        }
+
+
+class RouteStats:
+    def __init__(self):
+        self.count = 0
+        self.failures = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'failures': self.failures,
+            'mean_latency_s': round(self.total_seconds / self.count, 3) if self.count else 0.0,
+            'max_latency_s': round(self.max_seconds, 3)
+        }
+
+
+class ModelRouter:
+    """Picks a model for each agent call from ordered rules (first match wins)"""
+
+    def __init__(self, rules, default_model=LARGE_MODEL, boundaries=RISK_BOUNDARIES):
+        self.rules = list(rules)
+        self.default_model = default_model
+        self.boundaries = tuple(boundaries)
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def route(self, agent_name, risk_score=None, risk_category=None):
+        """Return (route name, model id) for an agent call"""
+        for rule in self.rules:
+            if rule.matches(agent_name, risk_score, risk_category, self.boundaries):
+                return rule.name, rule.model
+        return "default", self.default_model
+
+    def record(self, route_name, seconds, ok=True):
+        with self._lock:
+            stats = self._stats.setdefault(route_name, RouteStats())
+            stats.count += 1
+            stats.total_seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            if not ok:
+                stats.failures += 1
+
+    def metrics(self):
+        with self._lock:
+            return {name: stats.to_dict() for name, stats in self._stats.items()}
+
+    def to_config(self):
+        return {
+            'default_model': self.default_model,
+            'boundaries': list(self.boundaries),
+            'rules': [rule.to_dict() for rule in self.rules]
+        }
+
+    @classmethod
+    def from_config(cls, config):
+        rules = [RoutingRule(**rule) for rule in config.get('rules', [])]
+        return cls(rules, config.get('default_model', LARGE_MODEL), config.get('boundaries', RISK_BOUNDARIES))
+
+
+def default_routing_rules(small_model=SMALL_MODEL, large_model=LARGE_MODEL, clear_margin=15):
+    """Summaries and clear-cut Low/Medium applicants use the small model; borderline and High Risk use the large one"""
+    return [
+        RoutingRule("fast-summarization", small_model, agents=["summarization"]),
+        RoutingRule("high-risk", large_model, categories=["High Risk"]),
+        RoutingRule("clear-cut", small_model, min_margin=clear_margin),
+        RoutingRule("borderline", large_model)
+    ]
+
+
+def load_model_router(config_path=None, small_model=SMALL_MODEL, large_model=LARGE_MODEL):
+    """Router from a JSON config file, or the default rules when no file is given"""
+    if config_path:
+        with open(config_path) as f:
+            return ModelRouter.from_config(json.load(f))
+    return ModelRouter(default_routing_rules(small_model, large_model), default_model=large_model)
@@ -0,0 +1,262 @@
+"""Memoized templates for the rule-based agent narratives.
+
+Most of each fallback narrative only depends on a few discrete buckets (age
+band, health, exposure, claim frequency and severity bands, risk flags). The
+text for every bucket combination is rendered once, split into its static
+chunks and cached; per applicant only the bucket lookup and the splicing of
+the applicant's own values (name, age, amounts) into those chunks remain.
+
+The summary, risk factor and recommendation narratives match the original
+f-string narratives. The claims narrative adds a sentence with the 1/3/5-year
+claim counts when any claim is dated, and the recommendation bands follow the
+configured risk cutoffs (RISK_BOUNDARIES) rather than a fixed 40/70.
+"""
+import re
+from functools import lru_cache
+
+from claims_aggregator import aggregate_claims
+from model_router import RISK_BOUNDARIES, MEDIUM_HIGH_BAND
+
+HIGH_RISK_OCCUPATIONS = ("pilot", "firefighter", "police officer", "stunt person", "construction worker", "roofer", "electrician")
+MEDIUM_RISK_OCCUPATIONS = ("nurse", "doctor", "teacher", "lawyer", "truck driver")
+URBAN_CITIES = (
+    'York', 'Angeles', 'Chicago', 'Houston', 'Phoenix', 'Philadelphia', 'San Antonio', 'San Diego', 'Dallas',
+    'San Jose', 'Austin', 'Jacksonville', 'Miami', 'Denver', 'Boston', 'Seattle', 'Washington', 'Atlanta'
+)
+HEALTH_RISK = {
+    "Excellent": "Low",
+    "Good": "Low",
+    "Fair": "Moderate",
+    "Poor": "High"
+}
+
+PLACEHOLDER = re.compile(r"\{\w+\}")
+
+NO_CLAIMS_ANALYSIS = "No previous claims on record. This is an excellent indicator for risk assessment, suggesting responsible and low-risk behavior throughout the applicant's insurance history."
+
+
+def split_template(template):
+    """Static chunks around the ``{field}`` placeholders of a template"""
+    return tuple(PLACEHOLDER.split(template))
+
+
+def age_risk(age):
+    if age < 25:
+        return "High"
+    elif age < 55:
+        return "Low"
+    elif age < 65:
+        return "Moderate"
+    return "High"
+
+
+OCCUPATION_RISK_NOTES = {
+    "High": "This high-risk occupation requires enhanced scrutiny.",
+    "Moderate": "This moderate-risk occupation warrants standard underwriting procedures.",
+    "Standard": "This occupation presents standard underwriting risk factors."
+}
+
+
+@lru_cache(maxsize=4096)
+def occupation_tier(occupation):
+    """'High', 'Moderate' or 'Standard' occupation risk tier"""
+    occupation_lower = occupation.lower()
+    if any(h in occupation_lower for h in HIGH_RISK_OCCUPATIONS):
+        return "High"
+    elif any(m in occupation_lower for m in MEDIUM_RISK_OCCUPATIONS):
+        return "Moderate"
+    return "Standard"
+
+
+@lru_cache(maxsize=4096)
+def occupation_risk(occupation):
+    return OCCUPATION_RISK_NOTES[occupation_tier(occupation)]
+
+
+def health_risk(health_status):
+    return HEALTH_RISK.get(health_status, "Moderate")
+
+
+@lru_cache(maxsize=4096)
+def location_type(location):
+    if 'City' in location or any(city in location for city in URBAN_CITIES):
+        return 'urban'
+    return 'suburban/rural'
+
+
+def exposure_band(coverage_amount):
+    if coverage_amount > 1000000:
+        return 'significant'
+    elif coverage_amount > 500000:
+        return 'moderate'
+    return 'standard'
+
+
+@lru_cache(maxsize=None)
+def summary_template(age_band, health_band, exposure, geography, occupation_note):
+    if age_band == 'Low' and health_band == 'Low':
+        overall = 'favorable'
+    elif age_band in ['Low', 'Moderate'] and health_band in ['Low', 'Moderate']:
+        overall = 'moderate'
+    else:
+        overall = 'elevated'
+    return split_template(f"""<strong>APPLICANT OVERVIEW:</strong>
+{{name}}, a {{age}}-year-old {{occupation}} from {{location}}, is seeking ${{coverage}} in coverage. The applicant reports {{health}} health status with lifestyle factors including {{lifestyle}}.
+
+<strong>KEY RISK INDICATORS:</strong>
+• Demographic Risk: {age_band} - Age {{age}} contributes a baseline demographic risk profile
+• Health Risk: {health_band} - Current health status and lifestyle choices are contributing factors
+• Financial Exposure: Coverage amount of ${{coverage}} represents a {exposure} financial exposure
+• Geographic Risk: Location in {{location}} presents {geography} risk considerations
+
+<strong>INITIAL ASSESSMENT:</strong>
+{occupation_note} Overall preliminary risk assessment indicates a {overall} risk profile requiring further evaluation.""")
+
+
+def render_summary(applicant_data):
+    """DataSummarizationAgent.fallback_summarize"""
+    location = applicant_data['location']
+    c = summary_template(
+        age_risk(applicant_data['age']),
+        health_risk(applicant_data['health_status']),
+        exposure_band(applicant_data['coverage_amount']),
+        location_type(location),
+        occupation_risk(applicant_data['occupation'])
+    )
+    age = applicant_data['age']
+    coverage = f"{applicant_data['coverage_amount']:,}"
+    return (
+        f"{c[0]}{applicant_data['name']}{c[1]}{age}{c[2]}{applicant_data['occupation']}{c[3]}{location}{c[4]}{coverage}"
+        f"{c[5]}{applicant_data['health_status'].lower()}{c[6]}{applicant_data['lifestyle_factors']}{c[7]}{age}{c[8]}{coverage}{c[9]}{location}{c[10]}"
+    )
+
+
+@lru_cache(maxsize=1024)
+def claims_template(frequency_band, severity_band, claim_types, elevated):
+    frequency = {
+        1: "Single claim on record",
+        2: "Limited claims history",
+        4: "Moderate claims frequency",
+        5: "High claims frequency pattern"
+    }[frequency_band]
+    severity = {
+        0: "claims are relatively low-severity",
+        1: "claims show moderate severity",
+        2: "claims indicate significant severity"
+    }[severity_band]
+    diversity = f"involving {claim_types} different claim categories" if claim_types > 1 else "concentrated in a single category"
+    return split_template(
+        f"{frequency} with total claims value of ${{total}}. The claims {severity}, averaging ${{average}} per incident, "
+        f"{diversity}. This pattern suggests {'elevated' if elevated else 'manageable'} risk exposure based on historical claims behavior."
+    )
+
+
+def render_claims_analysis(claims_history, as_of=None):
+    """ClaimsAnalysisAgent.fallback_analyze_claims"""
+    if not claims_history:
+        return NO_CLAIMS_ANALYSIS
+    summary = aggregate_claims(claims_history, as_of=as_of)
+    total_claims, total_amount, average = summary.count, summary.total_amount, summary.mean_amount
+    claim_types = len(summary.by_type)
+
+    frequency_band = total_claims if total_claims <= 2 else 4 if total_claims <= 4 else 5
+    severity_band = 0 if average < 5000 else 1 if average < 15000 else 2
+    c = claims_template(frequency_band, severity_band, claim_types, total_claims > 3)
+    text = f"{c[0]}{total_amount:,}{c[1]}{average:,.0f}{c[2]}"
+    if summary.undated == total_claims:
+        return text
+    windows = summary.window_counts
+    return f"{text} Claims filed in the last {'/'.join(str(y) for y in windows)} years: {'/'.join(str(n) for n in windows.values())}."
+
+
+@lru_cache(maxsize=4096)
+def risk_factors_template(age_band, total_claims, poor_health, smoker, risky_sports, low_credit, criminal, driving_record):
+    lines = []
+    if age_band == 'young':
+        lines.append("• Youth Factor: Applicant under 25 years old presents elevated risk due to less experience and statistical higher incident rates")
+    elif age_band == 'senior':
+        lines.append("• Advanced Age: Applicant over 65 years old presents age-related risk factors")
+    if total_claims > 3:
+        lines.append(f"• Claims History: {total_claims} previous claims indicate established pattern of claims, suggesting elevated risk profile")
+    elif total_claims > 0:
+        lines.append(f"• Prior Claims: {total_claims} previous claim(s) on record affects risk assessment")
+    if poor_health:
+        lines.append("• Health Concerns: Poor health status represents a significant risk factor for coverage viability")
+    if smoker:
+        lines.append("• Smoking: Tobacco use is a substantial risk multiplier in underwriting assessment")
+    if risky_sports:
+        lines.append("• High-Risk Activities: Participation in dangerous sports elevates overall risk exposure")
+    if low_credit:
+        lines.append(None)  # credit line, spliced per applicant
+    if criminal:
+        lines.append("• Criminal History: Presence of criminal record is a significant risk factor")
+    if driving_record != 'Clean':
+        lines.append(f"• Driving Record: {driving_record} indicates elevated liability risk")
+    if not lines:
+        lines.append("• Low Risk Profile: Applicant demonstrates favorable risk characteristics across all evaluation categories")
+    lines = lines[:5]
+    if None not in lines:
+        return ('\n'.join(lines),)
+    split = lines.index(None)
+    return (
+        '\n'.join(lines[:split] + ["• Credit Risk: Credit score of "]),
+        '\n'.join([" indicates financial instability"] + lines[split + 1:])
+    )
+
+
+def render_risk_factors(applicant_data, claims_history, external_reports):
+    """RiskFactorAgent.fallback_identify_risk_factors"""
+    age = applicant_data['age']
+    lifestyle = applicant_data['lifestyle_factors']
+    credit_score = external_reports['credit_score']
+    # Claim counts and driving records take few values, so they are part of the key; only the credit score is spliced
+    c = risk_factors_template(
+        'young' if age < 25 else 'senior' if age > 65 else None,
+        len(claims_history),
+        applicant_data['health_status'] == 'Poor',
+        'Smoker' in lifestyle,
+        'High-risk sports' in lifestyle,
+        credit_score < 600,
+        bool(external_reports['criminal_record']),
+        external_reports['driving_record']
+    )
+    return c[0] if len(c) == 1 else f"{c[0]}{credit_score}{c[1]}"
+
+
+@lru_cache(maxsize=None)
+def recommendation_text(score_band, health_focus):
+    """Full recommendation for a score band: 'low', 'medium', 'medium-high' or 'high'"""
+    if score_band == 'low':
+        decision = "✅ APPROVE"
+        rationale = "Low-risk profile meets standard underwriting criteria."
+        recommendation = "Standard premium rates apply. Issue policy with standard terms and conditions."
+        additional = "No additional documentation required. Standard annual review recommended."
+    elif score_band in ('medium', 'medium-high'):
+        decision = "✅ APPROVE WITH CONDITIONS"
+        rationale = "Medium-risk profile requires enhanced terms."
+        recommendation = f"Apply {'15-25%' if score_band == 'medium-high' else '10-15%'} premium increase. Consider higher deductibles or specific exclusions."
+        additional = f"Require annual {'health' if health_focus else 'risk'} reassessment. Enhanced monitoring recommended."
+    else:
+        decision = "⚠️ MANUAL REVIEW REQUIRED"
+        rationale = "High-risk profile necessitates senior underwriter evaluation."
+        recommendation = "Refer to senior underwriting team for detailed risk assessment and policy customization."
+        additional = "May require additional documentation, medical records, or investigation. Decision pending specialist review."
+    return f"{decision}\n\nRationale: {rationale}\n\nRecommendation: {recommendation}\n\nAdditional Steps: {additional}"
+
+
+def render_recommendation(risk_score, risk_category):
+    """RecommendationAgent.fallback_generate_recommendation"""
+    low, high = RISK_BOUNDARIES
+    if risk_score < low:
+        return recommendation_text('low', False)
+    elif risk_score < high:
+        return recommendation_text('medium-high' if risk_score >= high - MEDIUM_HIGH_BAND else 'medium', 'health' in risk_category.lower())
+    return recommendation_text('high', False)
+
+
+def template_cache_info():
+    """lru_cache statistics per template, for benchmarks"""
+    return {
+        fn.__name__: fn.cache_info()._asdict()
+        for fn in (summary_template, claims_template, risk_factors_template, recommendation_text, occupation_risk, occupation_tier, location_type)
+    }
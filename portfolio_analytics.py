@@ -0,0 +1,109 @@
+"""Incrementally maintained portfolio aggregates for the analytics dashboard.
+
+Each stored assessment adds to running sums kept in the ``portfolio_stats``
+table of the assessment store, in the same transaction as the assessment. A
+row is (dimension, key, assessments, score_sum, coverage_sum), e.g.
+('category', 'High Risk', ...) or ('score_bin', '70', ...). The dashboard
+reads those few rows instead of scanning the history, so it renders in the
+same time for a hundred or a million assessments:
+
+* risk category mix and coverage exposure per category
+* mean score by occupation and location
+* total coverage exposure
+* decision mix, including manual referral and decline rates
+* a 10-point score histogram
+"""
+SCORE_BIN_WIDTH = 10
+
+# dimension -> (SQL expression over the assessments table, the same key in Python)
+DIMENSIONS = {
+    'all': ("''", lambda row: ''),
+    'category': ("risk_category", lambda row: row['risk_category']),
+    'decision': ("COALESCE(decision, '')", lambda row: row['decision'] or ''),
+    'occupation': ("COALESCE(occupation, '')", lambda row: row['occupation'] or ''),
+    'location': ("COALESCE(location, '')", lambda row: row['location'] or ''),
+    'score_bin': (
+        f"printf('%02d', MIN(risk_score / {SCORE_BIN_WIDTH}, {100 // SCORE_BIN_WIDTH - 1}) * {SCORE_BIN_WIDTH})",
+        lambda row: score_bin(row['risk_score'])
+    )
+}
+# Dimensions with one row per distinct free-text value; the dashboard shows their largest groups
+OPEN_DIMENSIONS = ('occupation', 'location')
+
+
+def score_bin(risk_score):
+    """Lower edge of the histogram bin, as a two-digit key; 100 falls in the 90 bin"""
+    return f"{min(int(risk_score) // SCORE_BIN_WIDTH, 100 // SCORE_BIN_WIDTH - 1) * SCORE_BIN_WIDTH:02d}"
+
+
+def stat_deltas(rows):
+    """Per (dimension, key) [assessments, score_sum, coverage_sum] for a batch of assessment rows (dicts)"""
+    deltas = {}
+    for row in rows:
+        score = row['risk_score']
+        coverage = row['coverage_amount'] or 0
+        for dimension, (_, key_of) in DIMENSIONS.items():
+            delta = deltas.get((dimension, key_of(row)))
+            if delta is None:
+                delta = deltas[(dimension, key_of(row))] = [0, 0, 0]
+            delta[0] += 1
+            delta[1] += score
+            delta[2] += coverage
+    return deltas
+
+
+def rebuild_queries():
+    """INSERT ... SELECT statements recomputing every dimension from the assessments table"""
+    return [
+        f"INSERT INTO portfolio_stats (dimension, key, assessments, score_sum, coverage_sum) "
+        f"SELECT '{dimension}', {expression}, COUNT(*), SUM(risk_score), COALESCE(SUM(coverage_amount), 0) "
+        f"FROM assessments GROUP BY 2"
+        for dimension, (expression, _) in DIMENSIONS.items()
+    ]
+
+
+def _group(stat):
+    count = stat['assessments']
+    return {
+        'assessments': count,
+        'mean_score': stat['score_sum'] / count if count else 0.0,
+        'coverage': stat['coverage_sum']
+    }
+
+
+def portfolio_summary(stats):
+    """Dashboard figures from portfolio_stats rows (dicts with dimension, key and the sums)"""
+    by_dimension = {}
+    for stat in stats:
+        by_dimension.setdefault(stat['dimension'], {})[stat['key']] = stat
+    total = by_dimension.get('all', {}).get('', {'assessments': 0, 'score_sum': 0, 'coverage_sum': 0})
+    count = total['assessments']
+
+    def share(n):
+        return n / count if count else 0.0
+
+    decisions = {key: share(stat['assessments']) for key, stat in by_dimension.get('decision', {}).items()}
+    bins = by_dimension.get('score_bin', {})
+    summary = {
+        'assessments': count,
+        'total_coverage': total['coverage_sum'],
+        'mean_score': total['score_sum'] / count if count else 0.0,
+        'category_mix': {
+            key: dict(_group(stat), share=share(stat['assessments']))
+            for key, stat in sorted(by_dimension.get('category', {}).items())
+        },
+        'decision_mix': decisions,
+        'referral_rate': decisions.get('MANUAL_REVIEW', 0.0),
+        'decline_rate': decisions.get('DECLINE', 0.0),
+        'score_histogram': {
+            f"{low}-{low + SCORE_BIN_WIDTH - 1 if low + SCORE_BIN_WIDTH < 100 else 100}": bins.get(f"{low:02d}", {'assessments': 0})['assessments']
+            for low in range(0, 100, SCORE_BIN_WIDTH)
+        }
+    }
+    for dimension in OPEN_DIMENSIONS:
+        groups = by_dimension.get(dimension, {})
+        summary[f'by_{dimension}'] = [
+            dict(_group(stat), **{dimension: key})
+            for key, stat in sorted(groups.items(), key=lambda item: -item[1]['assessments'])
+        ]
+    return summary
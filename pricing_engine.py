@@ -0,0 +1,257 @@
+"""Premium pricing from the risk score, category, coverage amount and rating factors.
+
+The annual premium is built from configurable rate tables:
+
+    base premium  = coverage / 1000 * base rate per thousand * coverage band factor
+    risk premium  = base premium * category loading * score loading
+    factor amount = risk premium * loading, for each rating factor the policy has
+    premium       = max(minimum premium, risk premium + factor amounts)
+
+The score loading is interpolated linearly between the points of the score
+table. The coverage band factor is a volume discount taken from the band the
+coverage falls in. The rating factors are the applicant traits the rules
+already look at (smoking, high-risk sports, poor health, criminal record,
+driving violations, occupation tier). Each factor's amount is reported on its
+own, so a quote shows what every factor adds.
+
+``RateTables.price`` reprices whole books as NumPy arrays, with one row per
+policy. ``RateTables.quote`` prices one applicant for the UI and the reports
+through the same arithmetic. The default tables can be replaced by a JSON
+file (UNDERWRITING_RATE_TABLES) with the layout of ``DEFAULT_RATE_TABLES``.
+
+    python pricing_engine.py book.csv --out priced.csv
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from batch_scoring import RISK_CATEGORIES
+from model_router import RISK_BOUNDARIES
+from narrative_templates import occupation_tier
+
+FACTORS = ('smoker', 'high_risk_sports', 'poor_health', 'criminal_record', 'driving_violations', 'high_risk_occupation', 'moderate_risk_occupation')
+FACTOR_LABELS = {
+    'smoker': "Smoker",
+    'high_risk_sports': "High-risk sports",
+    'poor_health': "Poor health",
+    'criminal_record': "Criminal record",
+    'driving_violations': "Driving violations",
+    'high_risk_occupation': "High-risk occupation",
+    'moderate_risk_occupation': "Moderate-risk occupation"
+}
+
+DEFAULT_RATE_TABLES = {
+    'version': "1.0",
+    'base_rate_per_thousand': 1.20,
+    'minimum_premium': 250.0,
+    'category_loadings': {'Low Risk': 1.00, 'Medium Risk': 1.15, 'High Risk': 1.50},
+    # Interpolated between the points; scores outside the table take the end loadings
+    'score_loadings': {'scores': [0, 40, 70, 100], 'loadings': [0.90, 1.00, 1.10, 1.40]},
+    # [lowest coverage of the band, factor]; the band with the highest lowest coverage at or below the coverage applies
+    'coverage_bands': [[0, 1.00], [1000000, 0.95], [2500000, 0.90]],
+    # Added to 1 and applied to the risk premium when the factor is present
+    'factor_loadings': {
+        'smoker': 0.35,
+        'high_risk_sports': 0.15,
+        'poor_health': 0.25,
+        'criminal_record': 0.10,
+        'driving_violations': 0.05,
+        'high_risk_occupation': 0.20,
+        'moderate_risk_occupation': 0.08
+    }
+}
+BOOK_COLUMNS = ('risk_score', 'risk_category', 'coverage_amount', 'occupation') + FACTORS
+PRICED_COLUMNS = ('annual_premium', 'base_premium', 'risk_premium', 'factor_premium')
+CHUNK_ROWS = 250000
+
+
+def policy_factors(applicant_data, external_reports):
+    """Rating factor flags of one applicant, from the form fields"""
+    lifestyle = applicant_data.get('lifestyle_factors') or []
+    tier = occupation_tier(applicant_data['occupation']) if applicant_data.get('occupation') else "Standard"
+    return {
+        'smoker': 'Smoker' in lifestyle,
+        'high_risk_sports': 'High-risk sports' in lifestyle,
+        'poor_health': applicant_data.get('health_status') == 'Poor',
+        'criminal_record': bool(external_reports.get('criminal_record')),
+        'driving_violations': external_reports.get('driving_record', 'Clean') != 'Clean',
+        'high_risk_occupation': tier == "High",
+        'moderate_risk_occupation': tier == "Moderate"
+    }
+
+
+class RateTables:
+    """Base rate, loading tables and minimum premium; prices arrays of policies at once"""
+
+    def __init__(self, config=None):
+        config = dict(DEFAULT_RATE_TABLES, **(config or {}))
+        self.version = str(config['version'])
+        self.base_rate = float(config['base_rate_per_thousand'])
+        self.minimum_premium = float(config['minimum_premium'])
+        unknown = set(config['factor_loadings']) - set(FACTORS)
+        if unknown:
+            raise ValueError(f"unknown rating factors: {', '.join(sorted(unknown))}")
+        self.category_loadings = np.array([float(config['category_loadings'][category]) for category in RISK_CATEGORIES])
+        self.score_points = np.array(config['score_loadings']['scores'], dtype=np.float64)
+        self.score_loadings = np.array(config['score_loadings']['loadings'], dtype=np.float64)
+        if len(self.score_points) != len(self.score_loadings) or np.any(np.diff(self.score_points) <= 0):
+            raise ValueError("score_loadings needs increasing scores and one loading per score")
+        bands = sorted((float(low), float(factor)) for low, factor in config['coverage_bands'])
+        self.band_floors = np.array([low for low, _ in bands])
+        self.band_factors = np.array([factor for _, factor in bands])
+        self.factor_loadings = np.array([float(config['factor_loadings'].get(factor, 0.0)) for factor in FACTORS])
+        self.config = config
+
+    def price(self, risk_score, coverage_amount, factors=None, risk_category=None):
+        """Premiums of many policies; arguments are parallel arrays, one entry per policy.
+
+        ``factors`` maps rating factor names to flag arrays (missing factors
+        count as absent), or is an (n, len(FACTORS)) array. ``risk_category``
+        holds category indexes into RISK_CATEGORIES and is derived from the
+        score when omitted. Returns a dict of arrays: the PRICED_COLUMNS and
+        ``factor_amounts``, an (n, len(FACTORS)) array of each factor's amount.
+        """
+        score = np.asarray(risk_score, dtype=np.float64)
+        coverage = np.asarray(coverage_amount, dtype=np.float64)
+        if risk_category is None:
+            risk_category = np.searchsorted(np.asarray(RISK_BOUNDARIES), score, side='right')
+        flags = factor_matrix(factors, len(score))
+
+        band = np.searchsorted(self.band_floors, coverage, side='right') - 1
+        base = coverage * (self.base_rate / 1000) * self.band_factors[np.maximum(band, 0)]
+        risk = base * self.category_loadings[np.asarray(risk_category)] * np.interp(score, self.score_points, self.score_loadings)
+        factor_amounts = flags * self.factor_loadings * risk[:, None]
+        factor_premium = factor_amounts.sum(axis=1)
+        return {
+            'annual_premium': np.maximum(risk + factor_premium, self.minimum_premium),
+            'base_premium': base,
+            'risk_premium': risk,
+            'factor_premium': factor_premium,
+            'factor_amounts': factor_amounts
+        }
+
+    def quote(self, risk_score, risk_category, coverage_amount, factors):
+        """Priced breakdown of one policy (``factors`` as from policy_factors), for the UI and reports"""
+        category = RISK_CATEGORIES.index(risk_category)
+        priced = self.price([risk_score], [coverage_amount], factors, [category])
+        premium = float(priced['annual_premium'][0])
+        band = int(np.searchsorted(self.band_floors, coverage_amount, side='right')) - 1
+        return {
+            'annual_premium': round(premium, 2),
+            'monthly_premium': round(premium / 12, 2),
+            'rate_per_thousand': round(premium / coverage_amount * 1000, 4) if coverage_amount else None,
+            'base_premium': round(float(priced['base_premium'][0]), 2),
+            'risk_premium': round(float(priced['risk_premium'][0]), 2),
+            'category_loading': float(self.category_loadings[category]),
+            'score_loading': round(float(np.interp(risk_score, self.score_points, self.score_loadings)), 4),
+            'coverage_factor': float(self.band_factors[max(band, 0)]),
+            'factor_contributions': {
+                factor: round(amount, 2)
+                for factor, amount in zip(FACTORS, priced['factor_amounts'][0].tolist()) if amount
+            },
+            'minimum_applied': premium == self.minimum_premium,
+            'indicative': risk_category == "High Risk",
+            'rates_version': self.version
+        }
+
+    def to_config(self):
+        return json.loads(json.dumps(self.config))
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config)
+
+
+def factor_matrix(factors, count):
+    """(count, len(FACTORS)) float array of factor flags"""
+    if factors is None:
+        return np.zeros((count, len(FACTORS)))
+    if isinstance(factors, np.ndarray):
+        return factors.reshape(count, len(FACTORS)).astype(np.float64, copy=False)
+    if isinstance(factors, list):
+        # One flags dict per policy
+        return np.array([[bool(flags.get(factor)) for factor in FACTORS] for flags in factors], dtype=np.float64).reshape(count, len(FACTORS))
+    flags = np.zeros((count, len(FACTORS)))
+    for i, factor in enumerate(FACTORS):
+        if factor in factors and factors[factor] is not None:
+            flags[:, i] = np.asarray(factors[factor], dtype=bool)
+    return flags
+
+
+def load_rate_tables(config_path=None):
+    """Rate tables from a JSON config file, or the defaults when no file is given"""
+    if config_path:
+        with open(config_path) as f:
+            return RateTables.from_config(json.load(f))
+    return RateTables()
+
+
+def book_factors(book):
+    """Factor flags of a book chunk: the factor columns it has, with the occupation tiers derived from ``occupation``"""
+    factors = {factor: np.asarray(book[factor]) for factor in FACTORS if factor in book}
+    if 'occupation' in book and not {'high_risk_occupation', 'moderate_risk_occupation'} & set(factors):
+        from exposure_report import factorize, occupation_tier_of
+        tiers, codes = factorize(book['occupation'], occupation_tier_of)
+        tiers = np.array(tiers, dtype=object)
+        factors['high_risk_occupation'] = (tiers == "High")[codes]
+        factors['moderate_risk_occupation'] = (tiers == "Moderate")[codes]
+    return factors
+
+
+def price_book(rate_tables, book):
+    """Priced columns for a book chunk (a DataFrame or a dict of columns with risk_score and coverage_amount)"""
+    categories = None
+    if 'risk_category' in book:
+        from exposure_report import category_codes
+        categories = category_codes(book)
+    priced = rate_tables.price(book['risk_score'], book['coverage_amount'], book_factors(book), categories)
+    return {column: priced[column] for column in PRICED_COLUMNS}
+
+
+def format_quote(quote):
+    """Human-readable lines for reports and the results panel"""
+    premium = f"${quote['annual_premium']:,.2f} per year (${quote['monthly_premium']:,.2f} per month)"
+    contributions = '; '.join(
+        f"{FACTOR_LABELS[factor]} +${amount:,.2f}" for factor, amount in quote['factor_contributions'].items()
+    )
+    return [
+        f"Premium: {premium}{' - indicative, subject to manual review' if quote['indicative'] else ''}",
+        f"Rate: ${quote['rate_per_thousand']:,.2f} per $1,000 of coverage" if quote['rate_per_thousand'] is not None else "Rate: N/A",
+        f"Base Premium: ${quote['base_premium']:,.2f} (coverage band factor x{quote['coverage_factor']:g})",
+        f"Risk Loadings: category x{quote['category_loading']:g}, score x{quote['score_loading']:g}",
+        f"Factor Loadings: {contributions or 'None'}",
+        f"Minimum Premium Applied: {'Yes' if quote['minimum_applied'] else 'No'}",
+        f"Rate Tables: {quote['rates_version']}"
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reprice a scored policy CSV (risk_score, coverage_amount, optional risk_category, occupation and factor flag columns)")
+    parser.add_argument("path", help="policy CSV, or - for stdin")
+    parser.add_argument("--out", default=None, help="write the policies with their priced columns here")
+    parser.add_argument("--rates", default=None, help="rate tables JSON (default: the built-in tables)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    import pandas as pd
+    rate_tables = load_rate_tables(args.rates)
+    start = time.perf_counter()
+    policies, total = 0, 0.0
+    header = True
+    for chunk in pd.read_csv(sys.stdin if args.path == "-" else args.path, chunksize=args.chunk_rows):
+        priced = price_book(rate_tables, chunk)
+        policies += len(chunk)
+        total += float(priced['annual_premium'].sum())
+        if args.out:
+            chunk.assign(**{column: np.round(values, 2) for column, values in priced.items()}).to_csv(args.out, mode="w" if header else "a", header=header, index=False)
+            header = False
+    elapsed = time.perf_counter() - start
+    print(f"{policies:,} policies repriced in {elapsed:.2f}s ({policies / elapsed if elapsed else 0:,.0f}/s), rate tables {rate_tables.version}")
+    print(f"total annual premium ${total:,.2f}, mean ${total / policies if policies else 0:,.2f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
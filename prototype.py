@@ -2,8 +2,9 @@ import streamlit as st
 import json
 from datetime import datetime
 import pandas as pd
-import requests
 import time
+from claims_editor import render_claims_controls, render_claims_grid
+from underwriting_core import analyze_with_ai_agents
 
 # Page config
 st.set_page_config(
@@ -93,243 +94,15 @@ if 'analysis_results' not in st.session_state:
     st.session_state.analysis_results = None
 if 'agent_outputs' not in st.session_state:
     st.session_state.agent_outputs = {}
-
-# AI Agent Class
-class UnderwritingAgent:
-    def __init__(self, api_key):
-        self.api_key = api_key
-        self.api_url = "https://api-inference.huggingface.co/models/mistralai/Mixtral-8x7B-Instruct-v0.1"
-        self.headers = {"Authorization": f"Bearer {api_key}"}
-    
-    def query_llm(self, prompt, max_tokens=500):
-        """Query Hugging Face LLM API"""
-        if not self.api_key or self.api_key == "":
-            return self._fallback_response(prompt)
-        
-        payload = {
-            "inputs": prompt,
-            "parameters": {
-                "max_new_tokens": max_tokens,
-                "temperature": 0.7,
-                "top_p": 0.95,
-                "return_full_text": False
-            }
-        }
-        
-        try:
-            response = requests.post(self.api_url, headers=self.headers, json=payload, timeout=30)
-            if response.status_code == 200:
-                result = response.json()
-                if isinstance(result, list) and len(result) > 0:
-                    return result[0].get('generated_text', '').strip()
-                return str(result)
-            else:
-                return self._fallback_response(prompt)
-        except Exception as e:
-            st.warning(f"API call failed: {str(e)}. Using fallback logic.")
-            return self._fallback_response(prompt)
-    
-    def _fallback_response(self, prompt):
-        """Fallback response when API is unavailable"""
-        if "summarize" in prompt.lower():
-            return "Applicant profile analyzed. Key factors identified include age, occupation, health status, and lifestyle factors that contribute to overall risk assessment."
-        elif "claims" in prompt.lower():
-            return "Claims history reviewed. Pattern analysis indicates frequency and severity of previous claims, which are important predictors of future risk."
-        elif "risk factors" in prompt.lower():
-            return "Multiple risk factors identified including age demographics, health conditions, lifestyle choices, financial stability indicators, and historical claims patterns."
-        elif "recommendation" in prompt.lower():
-            return "Based on comprehensive analysis, underwriting decision should consider all identified risk factors with appropriate premium adjustments or policy conditions."
-        return "Analysis complete. Risk assessment performed based on available data."
-
-class DataSummarizationAgent(UnderwritingAgent):
-    def summarize_applicant(self, applicant_data):
-        """Agent 1: Summarize applicant information"""
-        prompt = f"""You are an expert insurance underwriting assistant. Provide a comprehensive analysis of the following applicant:
-
-APPLICANT PROFILE:
-- Name: {applicant_data['name']}
-- Age: {applicant_data['age']} years old
-- Occupation: {applicant_data['occupation']}
-- Location: {applicant_data['location']}
-- Requested Coverage: ${applicant_data['coverage_amount']:,}
-- Health Status: {applicant_data['health_status']}
-- Lifestyle Factors: {applicant_data['lifestyle_factors']}
-
-Provide a detailed professional summary with the following structure:
-
-**APPLICANT OVERVIEW:**
-[2-3 sentences providing general profile overview]
-
-**KEY RISK INDICATORS:**
-• Demographic Risk: [Analyze age and occupation factors]
-• Health Risk: [Analyze health status and lifestyle]
-• Financial Exposure: [Analyze coverage amount requested]
-• Geographic Risk: [Analyze location factors]
-
-**INITIAL ASSESSMENT:**
-[1-2 sentences summarizing preliminary risk profile]
-
-Format your response with clear bullet points and bold headers as shown above."""
-
-        return self.query_llm(prompt, max_tokens=500)
-
-class ClaimsAnalysisAgent(UnderwritingAgent):
-    def analyze_claims(self, claims_history):
-        """Agent 2: Analyze claims history"""
-        if not claims_history:
-            return "No previous claims on record. This is a positive indicator for risk assessment."
-        
-        total_claims = len(claims_history)
-        total_amount = sum([c['amount'] for c in claims_history])
-        claim_types = ', '.join(set([c['type'] for c in claims_history]))
-        
-        prompt = f"""You are an insurance claims analyst. Analyze the following claims history and provide insights about risk patterns:
-
-Claims Summary:
-- Total Number of Claims: {total_claims}
-- Total Claim Amount: ${total_amount:,}
-- Types of Claims: {claim_types}
-- Claims Details: {json.dumps(claims_history, indent=2)}
-
-Provide a 2-3 sentence analysis focusing on frequency, severity, and any concerning patterns."""
-
-        return self.query_llm(prompt, max_tokens=200)
-
-class RiskFactorAgent(UnderwritingAgent):
-    def identify_risk_factors(self, applicant_data, claims_history, external_reports):
-        """Agent 3: Identify key risk factors"""
-        prompt = f"""You are a risk assessment specialist. Identify the top 3-5 key risk factors based on:
-
-Applicant: Age {applicant_data['age']}, {applicant_data['occupation']}, Health: {applicant_data['health_status']}
-Lifestyle: {applicant_data['lifestyle_factors']}
-Claims: {len(claims_history)} previous claims
-Credit Score: {external_reports['credit_score']}
-Criminal Record: {'Yes' if external_reports['criminal_record'] else 'No'}
-Driving Record: {external_reports['driving_record']}
-
-List the most significant risk factors in bullet points, each with a brief explanation."""
-
-        return self.query_llm(prompt, max_tokens=300)
-
-class RecommendationAgent(UnderwritingAgent):
-    def generate_recommendation(self, risk_score, risk_category, all_factors):
-        """Agent 4: Generate underwriting recommendation"""
-        prompt = f"""You are a senior underwriter. Based on the following risk assessment, provide a clear underwriting decision and recommendation:
-
-Risk Score: {risk_score}/100
-Risk Category: {risk_category}
-Key Factors: {all_factors}
-
-Provide:
-1. Clear decision (Approve/Approve with Conditions/Decline/Manual Review)
-2. Specific recommendations for premium adjustments or policy conditions
-3. Any additional steps needed
-
-Keep response concise and actionable (3-4 sentences)."""
-
-        return self.query_llm(prompt, max_tokens=250)
-
-def calculate_risk_score(applicant_data, claims_history, external_reports):
-    """Calculate numerical risk score"""
-    risk_score = 50  # Base score
-    
-    # Age factor
-    if applicant_data['age'] < 25:
-        risk_score += 10
-    elif applicant_data['age'] > 65:
-        risk_score += 15
-    else:
-        risk_score -= 5
-    
-    # Claims history factor
-    total_claims = len(claims_history)
-    if total_claims > 3:
-        risk_score += 20
-    elif total_claims > 0:
-        risk_score += 10
-    else:
-        risk_score -= 10
-    
-    # Health status factor
-    if applicant_data['health_status'] == 'Excellent':
-        risk_score -= 15
-    elif applicant_data['health_status'] == 'Poor':
-        risk_score += 25
-    
-    # Lifestyle factor
-    if 'Smoker' in applicant_data['lifestyle_factors']:
-        risk_score += 15
-    if 'High-risk sports' in applicant_data['lifestyle_factors']:
-        risk_score += 10
-    
-    # External reports factor
-    if external_reports['credit_score'] < 600:
-        risk_score += 10
-    elif external_reports['credit_score'] > 750:
-        risk_score -= 5
-    
-    if external_reports['criminal_record']:
-        risk_score += 20
-    
-    # Normalize score
-    risk_score = max(0, min(100, risk_score))
-    
-    # Determine category
-    if risk_score < 40:
-        risk_category = "Low Risk"
-        color_class = "risk-low"
-    elif risk_score < 70:
-        risk_category = "Medium Risk"
-        color_class = "risk-medium"
-    else:
-        risk_category = "High Risk"
-        color_class = "risk-high"
-    
-    return risk_score, risk_category, color_class
+if 'node_memo' not in st.session_state:
+    st.session_state.node_memo = {}
 
 def analyze_with_agents(applicant_data, claims_history, external_reports, api_key):
-    """Orchestrate multi-agent analysis"""
-    
-    # Initialize agents
-    data_agent = DataSummarizationAgent(api_key)
-    claims_agent = ClaimsAnalysisAgent(api_key)
-    risk_agent = RiskFactorAgent(api_key)
-    rec_agent = RecommendationAgent(api_key)
-    
-    # Agent 1: Summarize applicant
-    st.session_state.agent_outputs['applicant_summary'] = data_agent.summarize_applicant(applicant_data)
-    time.sleep(0.5)
-    
-    # Agent 2: Analyze claims
-    st.session_state.agent_outputs['claims_analysis'] = claims_agent.analyze_claims(claims_history)
-    time.sleep(0.5)
-    
-    # Agent 3: Identify risk factors
-    st.session_state.agent_outputs['risk_factors'] = risk_agent.identify_risk_factors(
-        applicant_data, claims_history, external_reports
-    )
-    time.sleep(0.5)
-    
-    # Calculate risk score
-    risk_score, risk_category, color_class = calculate_risk_score(
-        applicant_data, claims_history, external_reports
-    )
-    
-    # Agent 4: Generate recommendation
-    all_factors = f"{st.session_state.agent_outputs['applicant_summary']} {st.session_state.agent_outputs['claims_analysis']}"
-    st.session_state.agent_outputs['recommendation'] = rec_agent.generate_recommendation(
-        risk_score, risk_category, all_factors
-    )
-    
-    # Compile results
-    return {
-        'risk_score': risk_score,
-        'risk_category': risk_category,
-        'color_class': color_class,
-        'agent_outputs': st.session_state.agent_outputs,
-        'total_claims': len(claims_history),
-        'total_claim_amount': sum([c['amount'] for c in claims_history]) if claims_history else 0
-    }
+    """Orchestrate multi-agent analysis (shared core agents; rule-based when no LLM client is available)"""
+    results = analyze_with_ai_agents(applicant_data, claims_history, external_reports, api_key, previous_run=st.session_state.node_memo)
+    st.session_state.node_memo = results.pop('node_memo', {})
+    st.session_state.agent_outputs = results['agent_outputs']
+    return results
 
 def main():
     # Header
@@ -400,26 +173,10 @@ def main():
                 ["Non-smoker", "Regular exercise"])
             
         st.markdown("### Claims History")
-        num_claims = st.number_input("Number of Previous Claims", 0, 10, 2)
-        
-        claims_history = []
-        if num_claims > 0:
-            for i in range(num_claims):
-                with st.expander(f"Claim {i+1}"):
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        claim_type = st.selectbox(f"Type", 
-                            ["Auto", "Property", "Health", "Liability"], key=f"type_{i}")
-                    with col2:
-                        claim_amount = st.number_input(f"Amount ($)", 100, 100000, 5000, key=f"amt_{i}")
-                    with col3:
-                        claim_date = st.date_input(f"Date", key=f"date_{i}")
-                    
-                    claims_history.append({
-                        'type': claim_type,
-                        'amount': claim_amount,
-                        'date': str(claim_date)
-                    })
+        # One grid, paged for long histories, instead of an expander per claim
+        default_claims = [{'type': "Auto", 'amount': 5000, 'date': str(datetime.now().date())} for _ in range(2)]
+        claims_page = render_claims_controls("claims", default_claims)
+        claims_history = render_claims_grid("claims", claims_page)
         
         st.markdown("### External Reports")
         col1, col2, col3 = st.columns(3)
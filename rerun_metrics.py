@@ -0,0 +1,25 @@
+class RerunMetrics:
+    """Per-session counts and timings of script and fragment reruns"""
+
+    def __init__(self):
+        self._scopes = {}
+
+    def record(self, scope, seconds):
+        stats = self._scopes.setdefault(scope, {'runs': 0, 'total_s': 0.0, 'last_s': 0.0})
+        stats['runs'] += 1
+        stats['total_s'] += seconds
+        stats['last_s'] = seconds
+
+    def summary(self):
+        """One row per scope: runs, mean and last render time in milliseconds"""
+        return {
+            scope: {
+                'runs': stats['runs'],
+                'mean_ms': round(stats['total_s'] / stats['runs'] * 1000, 1),
+                'last_ms': round(stats['last_s'] * 1000, 1)
+            }
+            for scope, stats in self._scopes.items()
+        }
+
+    def reset(self):
+        self._scopes.clear()
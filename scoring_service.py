@@ -0,0 +1,529 @@
+"""Local HTTP scoring service for the underwriting engine.
+
+    python scoring_service.py --port 8020 --workers 4
+
+Endpoints (JSON unless noted):
+
+    POST /v1/score          one application -> one result
+    POST /v1/score/batch    NDJSON in (one application per line) -> NDJSON out, streamed in order
+    POST /v1/risk-score     one application -> risk score and category only (no agent narratives)
+    GET  /metrics           request counts, latency percentiles, queue state, routing/gating metrics
+    GET  /health
+
+An application is ``{"applicant": {...}, "claims_history": [...],
+"external_reports": {...}, "mode": "rules" | "ai", "id": optional}``. AI mode
+uses the API key from an ``Authorization: Bearer`` header or
+HUGGINGFACE_API_KEY, and falls back to the rules when no LLM client is
+available, like the app.
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from underwriting_core import analyze_with_ai_agents, analyze_with_fallback, calculate_risk_score, get_model_router, get_confidence_gate
+
+APPLICANT_FIELDS = ('name', 'age', 'occupation', 'location', 'coverage_amount', 'health_status', 'lifestyle_factors')
+EXTERNAL_REPORT_FIELDS = ('credit_score', 'criminal_record', 'driving_record')
+CLAIM_FIELDS = ('type', 'amount', 'date')
+SCORING_MODES = ('rules', 'ai')
+ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+class ServiceBusy(Exception):
+    """Raised when the pending-work limit is reached"""
+
+
+def parse_application(payload):
+    """Validate one application payload; returns (mode, applicant, claims, external reports) or raises ValueError"""
+    if not isinstance(payload, dict):
+        raise ValueError("application must be a JSON object")
+
+    mode = payload.get('mode', 'rules')
+    if mode not in SCORING_MODES:
+        raise ValueError(f"mode must be one of {', '.join(SCORING_MODES)}")
+
+    applicant = payload.get('applicant')
+    external_reports = payload.get('external_reports')
+    claims_history = payload.get('claims_history') or []
+    if not isinstance(applicant, dict):
+        raise ValueError("applicant must be an object")
+    if not isinstance(external_reports, dict):
+        raise ValueError("external_reports must be an object")
+    if not isinstance(claims_history, list):
+        raise ValueError("claims_history must be a list")
+
+    missing = [field for field in APPLICANT_FIELDS if field not in applicant]
+    missing += [f"external_reports.{field}" for field in EXTERNAL_REPORT_FIELDS if field not in external_reports]
+    for i, claim in enumerate(claims_history):
+        if not isinstance(claim, dict):
+            raise ValueError(f"claims_history[{i}] must be an object")
+        missing += [f"claims_history[{i}].{field}" for field in CLAIM_FIELDS if field not in claim]
+    if missing:
+        raise ValueError(f"missing fields: {', '.join(missing)}")
+
+    for field in ('age', 'coverage_amount'):
+        if not isinstance(applicant[field], (int, float)) or isinstance(applicant[field], bool):
+            raise ValueError(f"applicant.{field} must be a number")
+    if not isinstance(external_reports['credit_score'], (int, float)):
+        raise ValueError("external_reports.credit_score must be a number")
+    if any(not isinstance(claim['amount'], (int, float)) for claim in claims_history):
+        raise ValueError("claim amounts must be numbers")
+    for field in ('name', 'occupation', 'location', 'health_status'):
+        if not isinstance(applicant[field], str):
+            raise ValueError(f"applicant.{field} must be a string")
+    if not isinstance(external_reports['driving_record'], str):
+        raise ValueError("external_reports.driving_record must be a string")
+    lifestyle_factors = applicant['lifestyle_factors']
+    if isinstance(lifestyle_factors, list) and all(isinstance(factor, str) for factor in lifestyle_factors):
+        # The core reads lifestyle factors as the comma-joined string the app stores
+        applicant = {**applicant, 'lifestyle_factors': ', '.join(lifestyle_factors)}
+    elif not isinstance(lifestyle_factors, str):
+        raise ValueError("applicant.lifestyle_factors must be a string or a list of strings")
+    for i, claim in enumerate(claims_history):
+        if not isinstance(claim['type'], str):
+            raise ValueError(f"claims_history[{i}].type must be a string")
+        # Undated claims are allowed (null); dated ones must be YYYY-MM-DD so every endpoint reads them alike
+        if claim['date'] is not None and not is_iso_date(claim['date']):
+            raise ValueError(f"claims_history[{i}].date must be an ISO date (YYYY-MM-DD)")
+
+    return mode, applicant, claims_history, external_reports
+
+
+def is_iso_date(value):
+    if not isinstance(value, str):
+        return False
+    """True for a YYYY-MM-DD string (not the basic or week forms fromisoformat also accepts)"""
+    if not ISO_DATE.fullmatch(value):
+        return False
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+class LatencyWindow:
+    """Latencies of the most recent requests, for percentile reporting"""
+
+    def __init__(self, size=4096):
+        self._samples = deque(maxlen=size)
+
+    def add(self, seconds):
+        self._samples.append(seconds)
+
+    def percentile(self, pct):
+        samples = sorted(self._samples)
+        if not samples:
+            return 0.0
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+
+class EndpointStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.items = 0
+        self.latency = LatencyWindow()
+
+    def to_dict(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'items': self.items,
+            'p50_ms': round(self.latency.percentile(50) * 1000, 2),
+            'p99_ms': round(self.latency.percentile(99) * 1000, 2)
+        }
+
+
+class ServiceMetrics:
+    def __init__(self):
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self.rejected = 0
+
+    def record(self, endpoint, seconds, ok=True, items=1):
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, EndpointStats())
+            stats.requests += 1
+            stats.items += items
+            stats.latency.add(seconds)
+            if not ok:
+                stats.errors += 1
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'uptime_s': round(time.time() - self.started_at, 1),
+                'rejected': self.rejected,
+                'endpoints': {name: stats.to_dict() for name, stats in self._endpoints.items()}
+            }
+
+
+class ScoringService:
+    """Runs applications on a bounded worker pool.
+
+    max_workers  -- applications scored concurrently
+    max_pending  -- queued plus running applications before single requests get 503
+    step_delay   -- pacing between agent steps (the UI uses 0.1s/0.5s; a service wants none)
+    batch_window -- seconds /v1/risk-score requests wait to be scored together (0 scores each directly)
+    """
+
+    def __init__(self, max_workers=4, max_pending=64, max_body_bytes=64 * 1024,
+                 max_batch_bytes=16 * 1024 * 1024, max_batch_items=10000,
+                 default_api_key=None, step_delay=0.0, batch_window=0.0, max_micro_batch=64):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_body_bytes = max_body_bytes
+        self.max_batch_bytes = max_batch_bytes
+        self.max_batch_items = max_batch_items
+        self.default_api_key = default_api_key
+        self.step_delay = step_delay
+        self.metrics = ServiceMetrics()
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._pending_count = 0
+        self._count_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scoring")
+        self._batcher = None
+        if batch_window > 0:
+            # numpy is only needed when micro-batching is enabled
+            from batch_scoring import MicroBatcher
+            self._batcher = MicroBatcher(max_batch=max_micro_batch, max_wait=batch_window)
+
+    def score(self, payload, api_key=None):
+        """Score one validated payload in the calling thread"""
+        mode, applicant, claims_history, external_reports = parse_application(payload)
+        if mode == 'ai':
+            return analyze_with_ai_agents(
+                applicant, claims_history, external_reports,
+                api_key or self.default_api_key,
+                step_delay=self.step_delay
+            )
+        return analyze_with_fallback(applicant, claims_history, external_reports, step_delay=self.step_delay)
+
+    def risk_score(self, payload):
+        """Score only (no agents), through the micro-batcher when enabled"""
+        _, applicant, claims_history, external_reports = parse_application(payload)
+        if self._batcher is None:
+            risk_score, risk_category, color_class = calculate_risk_score(applicant, claims_history, external_reports)
+        else:
+            risk_score, risk_category, color_class = self._batcher.submit((applicant, claims_history, external_reports)).result()
+        return {'risk_score': risk_score, 'risk_category': risk_category, 'color_class': color_class}
+
+    def submit(self, payload, api_key=None, wait=False):
+        """Queue one application; raises ServiceBusy when the pending limit is reached and ``wait`` is false"""
+        if not self._pending.acquire(blocking=wait):
+            self.metrics.record_rejected()
+            raise ServiceBusy("too many pending applications")
+        with self._count_lock:
+            self._pending_count += 1
+        try:
+            future = self._executor.submit(self.score, payload, api_key)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _release(self):
+        with self._count_lock:
+            self._pending_count -= 1
+        self._pending.release()
+
+    def metrics_snapshot(self):
+        snapshot = self.metrics.snapshot()
+        with self._count_lock:
+            pending = self._pending_count
+        snapshot['workers'] = {
+            'max_workers': self.max_workers,
+            'max_pending': self.max_pending,
+            'pending': pending
+        }
+        if self._batcher is not None:
+            snapshot['micro_batching'] = self._batcher.metrics()
+        snapshot['model_routes'] = get_model_router().metrics()
+        snapshot['gating'] = get_confidence_gate().metrics()
+        return snapshot
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._batcher is not None:
+            self._batcher.close()
+
+
+class ScoringRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections alive between requests; idle ones close after ``timeout`` seconds
+    protocol_version = "HTTP/1.1"
+    timeout = 30
+    # Headers and body are separate writes; without TCP_NODELAY each response waits on a delayed ACK (~40ms)
+    disable_nagle_algorithm = True
+    server_version = "UnderwritingScoring/1.0"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json(200, {'status': 'ok'})
+        elif self.path == "/metrics":
+            self.send_json(200, self.service.metrics_snapshot())
+        else:
+            self.send_json(404, {'error': f"unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path == "/v1/score":
+            self.handle_single()
+        elif self.path == "/v1/score/batch":
+            self.handle_batch()
+        elif self.path == "/v1/risk-score":
+            self.handle_risk_score()
+        else:
+            self.discard_body()
+            self.send_json(404, {'error': f"unknown path {self.path}"})
+
+    def handle_single(self):
+        start = time.perf_counter()
+        status = 200
+        try:
+            body = self.read_body(self.service.max_body_bytes)
+            if body is None:
+                return
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                status = 400
+                self.send_json(400, {'error': "request body is not valid JSON"})
+                return
+            try:
+                results = self.service.submit(payload, self.api_key()).result()
+            except ServiceBusy as e:
+                status = 503
+                self.send_json(503, {'error': str(e)}, {'Retry-After': '1'})
+                return
+            except ValueError as e:
+                status = 400
+                self.send_json(400, {'error': str(e)})
+                return
+            except Exception as e:
+                status = 500
+                self.send_json(500, {'error': f"scoring failed: {e}"})
+                return
+            self.send_json(200, with_id(payload, results))
+        finally:
+            self.service.metrics.record("score", time.perf_counter() - start, ok=status == 200)
+
+    def handle_risk_score(self):
+        """Scored in the request thread: the rules are too cheap to be worth a worker hand-off"""
+        start = time.perf_counter()
+        status = 200
+        try:
+            body = self.read_body(self.service.max_body_bytes)
+            if body is None:
+                return
+            try:
+                payload = json.loads(body)
+                results = self.service.risk_score(payload)
+            except ValueError as e:
+                status = 400
+                self.send_json(400, {'error': "request body is not valid JSON" if isinstance(e, json.JSONDecodeError) else str(e)})
+                return
+            except Exception as e:
+                status = 500
+                self.send_json(500, {'error': f"scoring failed: {e}"})
+                return
+            self.send_json(200, with_id(payload, results))
+        finally:
+            self.service.metrics.record("risk_score", time.perf_counter() - start, ok=status == 200)
+
+    def handle_batch(self):
+        """Stream one NDJSON result line per input line, in input order"""
+        start = time.perf_counter()
+        length = self.content_length(self.service.max_batch_bytes)
+        if length is None:
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        api_key = self.api_key()
+        window = deque()
+        items, errors = 0, 0
+        remaining = length
+        # Keep enough work queued to occupy every worker without reading the whole body up front
+        max_in_flight = self.service.max_workers * 2
+
+        def drain(keep):
+            """Write finished results in input order, waiting while more than ``keep`` are in flight"""
+            nonlocal errors
+            while window and (len(window) > keep or window[0][2].done()):
+                line_number, payload, future = window.popleft()
+                record = self.batch_record(line_number, payload, future)
+                errors += 'error' in record
+                self.write_chunk(record)
+
+        while remaining > 0:
+            raw = self.rfile.readline(min(remaining, self.service.max_body_bytes + 1))
+            remaining -= len(raw)
+            oversized = len(raw) > self.service.max_body_bytes
+            # Skip the rest of an oversized line so it is reported once, under its own line number
+            tail = raw
+            while oversized and remaining > 0 and not tail.endswith(b"\n"):
+                tail = self.rfile.readline(min(remaining, 65536))
+                remaining -= len(tail)
+            if not raw.strip():
+                continue
+            items += 1
+            if items > self.service.max_batch_items:
+                errors += 1
+                self.write_chunk({'line': items, 'error': f"batch limit of {self.service.max_batch_items} applications exceeded"})
+                continue
+            try:
+                if oversized:
+                    raise ValueError(f"line exceeds {self.service.max_body_bytes} bytes")
+                payload = json.loads(raw)
+                parse_application(payload)
+            except json.JSONDecodeError:
+                error = "line is not valid JSON"
+            except ValueError as e:
+                error = str(e)
+            else:
+                window.append((items, payload, self.service.submit(payload, api_key, wait=True)))
+                drain(keep=max_in_flight - 1)
+                continue
+            drain(keep=0)
+            errors += 1
+            self.write_chunk({'line': items, 'error': error})
+        drain(keep=0)
+        self.wfile.write(b"0\r\n\r\n")
+        self.service.metrics.record("score_batch", time.perf_counter() - start, ok=errors == 0, items=items)
+
+    def batch_record(self, line_number, payload, future):
+        try:
+            return {'line': line_number, **with_id(payload, future.result())}
+        except Exception as e:
+            return {'line': line_number, 'error': str(e)}
+
+    def write_chunk(self, record):
+        data = json.dumps(record).encode("utf-8") + b"\n"
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+
+    def api_key(self):
+        auth = self.headers.get("Authorization", "")
+        return auth[len("Bearer "):].strip() if auth.startswith("Bearer ") else None
+
+    def content_length(self, limit):
+        """Declared body length, or None after sending 411/413"""
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            self.send_json(411, {'error': "chunked request bodies are not supported; send Content-Length"}, close=True)
+            return None
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            self.send_json(411, {'error': "Content-Length required"}, close=True)
+            return None
+        if length > limit:
+            self.send_json(413, {'error': f"request body exceeds {limit} bytes"}, close=True)
+            return None
+        return length
+
+    def read_body(self, limit):
+        length = self.content_length(limit)
+        if length is None:
+            return None
+        return self.rfile.read(length)
+
+    def discard_body(self):
+        length = int(self.headers.get("Content-Length", 0) or 0)
+        if 0 < length <= self.service.max_batch_bytes:
+            self.rfile.read(length)
+        elif length:
+            self.close_connection = True
+
+    def send_json(self, status, payload, headers=None, close=False):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if close:
+            # The unread body would otherwise be parsed as the next request
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def with_id(payload, results):
+    """Echo the caller's id (if any) next to the result"""
+    if isinstance(payload, dict) and 'id' in payload:
+        return {'id': payload['id'], 'result': results}
+    return {'result': results}
+
+
+class ScoringHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The stdlib default backlog of 5 resets connections under bursts of concurrent clients
+    request_queue_size = 256
+
+
+def create_server(service, host="127.0.0.1", port=8020):
+    server = ScoringHTTPServer((host, port), ScoringRequestHandler)
+    server.service = service
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8020)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("UNDERWRITING_MAX_WORKERS", "4")))
+    parser.add_argument("--max-pending", type=int, default=64)
+    parser.add_argument("--max-body-kb", type=int, default=64, help="limit for single requests and each batch line")
+    parser.add_argument("--max-batch-mb", type=int, default=16)
+    parser.add_argument("--max-batch-items", type=int, default=10000)
+    parser.add_argument("--batch-window-ms", type=float, default=0.0, help="micro-batch window for /v1/risk-score (0 disables)")
+    parser.add_argument("--max-micro-batch", type=int, default=64)
+    args = parser.parse_args()
+
+    service = ScoringService(
+        max_workers=args.workers,
+        max_pending=args.max_pending,
+        max_body_bytes=args.max_body_kb * 1024,
+        max_batch_bytes=args.max_batch_mb * 1024 * 1024,
+        max_batch_items=args.max_batch_items,
+        default_api_key=os.environ.get("HUGGINGFACE_API_KEY"),
+        batch_window=args.batch_window_ms / 1000,
+        max_micro_batch=args.max_micro_batch
+    )
+    server = create_server(service, args.host, args.port)
+    print(f"scoring service listening on http://{server.server_address[0]}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+import json
+import re
+from collections import Counter
+from enum import Enum
+
+from model_router import RISK_BOUNDARIES, MEDIUM_HIGH_BAND
+
+
+class Decision(str, Enum):
+    APPROVE = "APPROVE"
+    APPROVE_WITH_CONDITIONS = "APPROVE_WITH_CONDITIONS"
+    MANUAL_REVIEW = "MANUAL_REVIEW"
+    DECLINE = "DECLINE"
+
+
+DECISION_VALUES = frozenset(d.value for d in Decision)
+
+# Compact schema the Recommendation Agent is asked to emit on its last line
+STRUCTURED_MARKER = "DECISION_JSON:"
+SCHEMA_INSTRUCTIONS = (
+    f'End your answer with one line starting with "{STRUCTURED_MARKER}" followed by compact JSON: '
+    '{"decision": "APPROVE|APPROVE_WITH_CONDITIONS|MANUAL_REVIEW|DECLINE", '
+    '"premium_adjustment": [min_pct, max_pct] or null, "conditions": [short strings], '
+    '"required_documents": [short strings]}'
+)
+
+MAX_LIST_ITEMS = 10
+MAX_ITEM_LENGTH = 200
+PREMIUM_BOUNDS = (-50, 300)
+
+DECISION_PATTERN = re.compile(
+    r"\b(approve[d]? with conditions|conditional approval|manual review|refer(?:red)? to senior|declined?|approved?)\b",
+    re.IGNORECASE
+)
+PREMIUM_RANGE_PATTERN = re.compile(r"(\d{1,3}(?:\.\d+)?)\s*%?\s*(?:-|–|to)\s*(\d{1,3}(?:\.\d+)?)\s*%")
+PREMIUM_SINGLE_PATTERN = re.compile(r"(\d{1,3}(?:\.\d+)?)\s*%")
+CONDITION_KEYWORDS = ("deductible", "exclusion", "monitoring", "reassessment", "rider", "waiting period", "limit", "surcharge")
+DOCUMENT_KEYWORDS = {
+    "medical record": "Medical records",
+    "medical exam": "Medical examination",
+    "physician": "Attending physician statement",
+    "financial statement": "Financial statements",
+    "proof of income": "Proof of income",
+    "driving record": "Motor vehicle record",
+    "background check": "Criminal background check",
+    "criminal record": "Criminal background check",
+    "claims documentation": "Prior claims documentation",
+    "claim report": "Prior claims documentation"
+}
+
+
+def validate_structured_decision(data):
+    """Validate and normalise a parsed decision dict; raises ValueError on schema violations"""
+    if not isinstance(data, dict):
+        raise ValueError("decision must be a JSON object")
+
+    decision = str(data.get('decision', '')).strip().upper().replace(' ', '_')
+    if decision not in DECISION_VALUES:
+        raise ValueError(f"unknown decision {data.get('decision')!r}")
+
+    premium = data.get('premium_adjustment')
+    if premium is not None:
+        if isinstance(premium, (int, float)):
+            premium = [premium, premium]
+        if not isinstance(premium, list) or len(premium) != 2 or not all(isinstance(p, (int, float)) for p in premium):
+            raise ValueError("premium_adjustment must be [min_pct, max_pct] or null")
+        low, high = sorted(float(p) for p in premium)
+        if low < PREMIUM_BOUNDS[0] or high > PREMIUM_BOUNDS[1]:
+            raise ValueError("premium_adjustment out of range")
+        premium = [low, high]
+
+    lists = {}
+    for field in ('conditions', 'required_documents'):
+        items = data.get(field) or []
+        if not isinstance(items, list) or not all(isinstance(item, str) for item in items):
+            raise ValueError(f"{field} must be a list of strings")
+        lists[field] = [item.strip()[:MAX_ITEM_LENGTH] for item in items if item.strip()][:MAX_LIST_ITEMS]
+
+    return {
+        'decision': decision,
+        'premium_adjustment': premium,
+        'conditions': lists['conditions'],
+        'required_documents': lists['required_documents']
+    }
+
+
+def split_structured_output(text):
+    """Split an LLM answer into (narrative, raw JSON string or None)"""
+    index = text.rfind(STRUCTURED_MARKER)
+    if index == -1:
+        return text, None
+    narrative = text[:index].rstrip()
+    raw = text[index + len(STRUCTURED_MARKER):].strip()
+    # Tolerate code fences or trailing chatter around the object
+    start, end = raw.find('{'), raw.rfind('}')
+    if start == -1 or end < start:
+        return narrative, None
+    return narrative, raw[start:end + 1]
+
+
+def parse_structured_decision(raw):
+    """Parse and validate the compact JSON; returns None when it is missing or invalid"""
+    if not raw:
+        return None
+    try:
+        return validate_structured_decision(json.loads(raw))
+    except (ValueError, TypeError):
+        return None
+
+
+def rule_based_decision(risk_score, risk_category):
+    """Structured equivalent of RecommendationAgent.fallback_generate_recommendation"""
+    low, high = RISK_BOUNDARIES
+    if risk_score < low:
+        return {
+            'decision': Decision.APPROVE.value,
+            'premium_adjustment': [0.0, 0.0],
+            'conditions': [],
+            'required_documents': []
+        }
+    if risk_score < high:
+        return {
+            'decision': Decision.APPROVE_WITH_CONDITIONS.value,
+            'premium_adjustment': [15.0, 25.0] if risk_score >= high - MEDIUM_HIGH_BAND else [10.0, 15.0],
+            'conditions': [
+                "Higher deductible or specific exclusions",
+                f"Annual {'health' if 'health' in risk_category.lower() else 'risk'} reassessment"
+            ],
+            'required_documents': []
+        }
+    return {
+        'decision': Decision.MANUAL_REVIEW.value,
+        'premium_adjustment': None,
+        'conditions': ["Refer to senior underwriting team"],
+        'required_documents': ["Medical records", "Additional documentation as requested by reviewer"]
+    }
+
+
+def extract_decision_from_text(text, risk_score, risk_category):
+    """Deterministic extractor for free-text recommendations; rule-based values fill any gaps"""
+    fallback = rule_based_decision(risk_score, risk_category)
+    lowered = text.lower()
+
+    decision = fallback['decision']
+    match = DECISION_PATTERN.search(text)
+    if match:
+        phrase = match.group(1).lower()
+        if "condition" in phrase:
+            decision = Decision.APPROVE_WITH_CONDITIONS.value
+        elif "review" in phrase or "refer" in phrase:
+            decision = Decision.MANUAL_REVIEW.value
+        elif phrase.startswith("decline"):
+            decision = Decision.DECLINE.value
+        else:
+            decision = Decision.APPROVE.value
+
+    premium = fallback['premium_adjustment']
+    range_match = PREMIUM_RANGE_PATTERN.search(text)
+    if range_match:
+        premium = sorted([float(range_match.group(1)), float(range_match.group(2))])
+    else:
+        single_match = PREMIUM_SINGLE_PATTERN.search(text)
+        if single_match and "premium" in lowered:
+            premium = [float(single_match.group(1))] * 2
+    if premium is not None and (premium[0] < PREMIUM_BOUNDS[0] or premium[1] > PREMIUM_BOUNDS[1]):
+        # An out-of-range figure is more likely a misread than a real loading
+        premium = fallback['premium_adjustment']
+    if decision == Decision.APPROVE.value and premium is None:
+        premium = [0.0, 0.0]
+
+    sentences = re.split(r"(?<=[.!?])\s+|\n+", text)
+    conditions = [s.strip(" •-*\t") for s in sentences if any(k in s.lower() for k in CONDITION_KEYWORDS)]
+    documents = list(dict.fromkeys(label for keyword, label in DOCUMENT_KEYWORDS.items() if keyword in lowered))
+
+    return validate_structured_decision({
+        'decision': decision,
+        'premium_adjustment': premium,
+        'conditions': conditions or fallback['conditions'],
+        'required_documents': documents or fallback['required_documents']
+    })
+
+
+def structure_recommendation(text, risk_score, risk_category):
+    """Return (narrative, decision dict) for an LLM recommendation, tagging the decision source"""
+    narrative, raw = split_structured_output(text)
+    decision = parse_structured_decision(raw)
+    if decision is not None:
+        decision['source'] = 'llm'
+    else:
+        try:
+            decision = extract_decision_from_text(narrative, risk_score, risk_category)
+            decision['source'] = 'extracted'
+        except ValueError:
+            # Keep the LLM narrative; only the decision falls back to the rules
+            decision = rule_based_decision(risk_score, risk_category)
+            decision['source'] = 'rules'
+    return narrative, decision
+
+
+def summarize_decisions(decisions):
+    """Aggregate structured decisions: counts per decision and mean premium midpoint"""
+    counts = Counter(d['decision'] for d in decisions)
+    midpoints = [sum(d['premium_adjustment']) / 2 for d in decisions if d.get('premium_adjustment')]
+    return {
+        'total': sum(counts.values()),
+        'by_decision': {d.value: counts.get(d.value, 0) for d in Decision},
+        'mean_premium_adjustment_pct': round(sum(midpoints) / len(midpoints), 2) if midpoints else None
+    }
+
+
+def format_premium_adjustment(premium):
+    if premium is None:
+        return "To be determined on review"
+    low, high = premium
+    if low == high:
+        return "Standard rates" if low == 0 else f"{low:+g}%"
+    return f"{low:+g}% to {high:+g}%"
+
+
+def format_decision(decision):
+    """Human-readable lines for reports and the results panel"""
+    return [
+        f"Decision: {decision['decision'].replace('_', ' ')}",
+        f"Premium Adjustment: {format_premium_adjustment(decision.get('premium_adjustment'))}",
+        f"Conditions: {'; '.join(decision.get('conditions') or []) or 'None'}",
+        f"Required Documents: {'; '.join(decision.get('required_documents') or []) or 'None'}",
+        f"Decision Source: {decision.get('source', 'n/a')}"
+    ]
@@ -0,0 +1,766 @@
+"""Underwriting core: risk scoring, agents, orchestration and reports.
+
+Has no Streamlit dependency, so it can be used from the app, background
+workers, batch jobs and benchmarks alike. The LLM stack is imported on first
+use of the AI path.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import date, datetime
+
+from generation_profiles import get_generation_profile, response_cache
+from model_router import load_model_router, boundary_margin, LARGE_MODEL, SMALL_MODEL, RISK_BOUNDARIES, DEFAULT_RISK_BOUNDARIES
+from confidence_gate import load_confidence_gate
+from structured_decision import SCHEMA_INSTRUCTIONS, structure_recommendation, rule_based_decision, format_decision
+from llm_client_pool import LLMClientPool, hash_api_key
+from claims_aggregator import aggregate_claims
+from narrative_templates import render_summary, render_claims_analysis, render_risk_factors, render_recommendation
+from agent_graph import AgentGraph, Node, node_cache
+from assessment_store import AssessmentStore
+from pricing_engine import load_rate_tables, policy_factors, format_quote
+
+
+def build_llm_client(api_key, model_id=LARGE_MODEL, endpoint_url=None):
+    """Construct the chat client for an API key and model (raises on failure).
+    
+    The client holds the HTTP connection; per-agent generation settings are
+    passed on each call, so one client serves every agent profile.
+    """
+    # The LLM stack is imported on first use so the UI and rule-based path start without it
+    from langchain_huggingface import HuggingFaceEndpoint, ChatHuggingFace
+    
+    endpoint_url = endpoint_url or os.environ.get("UNDERWRITING_LLM_ENDPOINT_URL")
+    model_source = {'endpoint_url': endpoint_url} if endpoint_url else {'repo_id': model_id}
+    llm = HuggingFaceEndpoint(
+        **model_source,
+        huggingfacehub_api_token=api_key, # Use the passed key
+        temperature=0.7,
+        max_new_tokens=500,
+        timeout=60
+    )
+    return ChatHuggingFace(llm=llm)
+
+
+_singletons = {}
+_singletons_lock = threading.Lock()
+
+
+def _process_singleton(name, factory):
+    """Build ``factory()`` once per process and reuse it from every thread"""
+    instance = _singletons.get(name)
+    if instance is None:
+        with _singletons_lock:
+            instance = _singletons.get(name)
+            if instance is None:
+                instance = _singletons[name] = factory()
+    return instance
+
+
+def get_model_router():
+    """Process-wide model router (rules from UNDERWRITING_ROUTING_CONFIG or the defaults)."""
+    return _process_singleton('model_router', lambda: load_model_router(
+        os.environ.get("UNDERWRITING_ROUTING_CONFIG"),
+        small_model=os.environ.get("UNDERWRITING_SMALL_MODEL", SMALL_MODEL),
+        large_model=os.environ.get("UNDERWRITING_LARGE_MODEL", LARGE_MODEL)
+    ))
+
+
+def get_confidence_gate():
+    """Process-wide LLM call gate (rules from UNDERWRITING_GATING_CONFIG or the defaults)."""
+    return _process_singleton('confidence_gate', lambda: load_confidence_gate(os.environ.get("UNDERWRITING_GATING_CONFIG")))
+
+
+def get_llm_client_pool():
+    """Process-wide LRU pool of LLM clients keyed by API key hash and model."""
+    return _process_singleton('llm_client_pool', lambda: LLMClientPool(
+        build_llm_client,
+        max_size=int(os.environ.get("UNDERWRITING_LLM_POOL_SIZE", "8")),
+        idle_ttl=int(os.environ.get("UNDERWRITING_LLM_IDLE_TTL", "1800")),
+        failure_ttl=int(os.environ.get("UNDERWRITING_LLM_FAILURE_TTL", "300"))
+    ))
+
+
+def prewarm_llm_clients(api_key):
+    """Build clients for every routed model in the background so the first analysis does not wait"""
+    if not api_key:
+        return
+    router = get_model_router()
+    routed_models = [router.default_model] + [rule.model for rule in router.rules if rule.model != router.default_model]
+    get_llm_client_pool().prewarm(api_key, model_ids=list(dict.fromkeys(routed_models)))
+
+
+def get_assessment_store():
+    """Process-wide assessment history store (SQLite file from UNDERWRITING_DB_PATH), or None when persistence is disabled."""
+    path = os.environ.get("UNDERWRITING_DB_PATH", "underwriting_history.db")
+    if not path:
+        return None
+    return _process_singleton('assessment_store', lambda: AssessmentStore(path))
+
+
+def get_rate_tables():
+    """Process-wide premium rate tables (UNDERWRITING_RATE_TABLES JSON file or the defaults)."""
+    return _process_singleton('rate_tables', lambda: load_rate_tables(os.environ.get("UNDERWRITING_RATE_TABLES")))
+
+
+def get_llm_client(api_key, model_id=None):
+    """Returns the pooled LLM client for the provided API key and model."""
+    if not api_key:
+        return None
+    return get_llm_client_pool().get(api_key, model_id or get_model_router().default_model)
+
+
+# Opt-in recency terms in calculate_risk_score (see claims_temporal.temporal_score_adjustments)
+TEMPORAL_SCORING = os.environ.get("UNDERWRITING_TEMPORAL_SCORING", "0") == "1"
+
+# Stored with every assessment; bump when the scoring rules or rule-based narratives change
+RULES_VERSION = "1.0"
+
+# Long commercial histories are summarized in the prompt; only the first claims are listed in full
+MAX_PROMPT_CLAIMS = 25
+
+GATED_OUTPUT_PREFIX = "Rule-based output (LLM call skipped - the rule-based decision is unambiguous):\n"
+
+
+class UnderwritingAgent:
+    profile_name = 'default'
+    
+    def __init__(self, api_key=None, model_id=None, route_name=None):
+        self.model_id = model_id or get_model_router().default_model
+        self.chat_model = get_llm_client(api_key, self.model_id) 
+        self.profile = get_generation_profile(self.profile_name)
+        self.route_name = route_name
+    
+    def query_llm(self, prompt):
+        """Query LangChain LLM Client using this agent's generation profile"""
+        if self.chat_model is None:
+            return None
+        
+        cache_key = None
+        if self.profile.deterministic:
+            cache_key = self.profile.cache_key(getattr(self.chat_model, 'model_id', ''), prompt)
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        from langchain_core.messages import HumanMessage
+        
+        start = time.perf_counter()
+        try:
+            response = self.chat_model.invoke([HumanMessage(content=prompt)], **self.profile.invoke_kwargs())
+            content = response.content.strip()
+        except Exception:
+            content = None
+        if self.route_name:
+            get_model_router().record(self.route_name, time.perf_counter() - start, ok=bool(content))
+        if content is None:
+            return None
+        
+        if cache_key and content:
+            response_cache.put(cache_key, content)
+        return content
+        
+
+
+class DataSummarizationAgent(UnderwritingAgent):
+    profile_name = 'summarization'
+
+    def summarize_applicant(self, applicant_data):
+        """Agent 1: Summarize applicant information - AI Mode"""
+        prompt = f"""You are an expert insurance underwriting assistant. Provide a comprehensive analysis of the following applicant:
+
+APPLICANT PROFILE:
+- Name: {applicant_data['name']}
+- Age: {applicant_data['age']} years old
+- Occupation: {applicant_data['occupation']}
+- Location: {applicant_data['location']}
+- Requested Coverage: ${applicant_data['coverage_amount']:,}
+- Health Status: {applicant_data['health_status']}
+- Lifestyle Factors: {applicant_data['lifestyle_factors']}
+
+Provide a detailed professional summary with the following structure:
+
+<strong>APPLICANT OVERVIEW:</strong>
+[10 sentences providing general profile overview]
+
+<strong>KEY RISK INDICATORS:</strong>
+• Demographic Risk: [Analyze age and occupation factors]
+• Health Risk: [Analyze health status and lifestyle]
+• Financial Exposure: [Analyze coverage amount requested]
+• Geographic Risk: [Analyze location factors]
+
+<strong>INITIAL ASSESSMENT:</strong>
+[5 sentences summarizing preliminary risk profile]
+
+Format your response with clear bullet points and bold headers as shown above."""
+
+        return self.query_llm(prompt)
+    
+    def fallback_summarize(self, applicant_data):
+        """Fallback summarization using rule-based logic"""
+        return render_summary(applicant_data)
+
+
+class ClaimsAnalysisAgent(UnderwritingAgent):
+    profile_name = 'claims_analysis'
+
+    def analyze_claims(self, claims_history, as_of=None):
+        """Agent 2: Analyze claims history - AI Mode"""
+        if not claims_history:
+            prompt = """You are an insurance claims analyst. Analyze this applicant profile with NO previous claims on record and provide insights about risk patterns.
+
+Profile: Applicant with no previous claims history.
+
+Provide 10 sentences analysis focusing on the positive implications of a clean claims history."""
+            return self.query_llm(prompt)
+        
+        summary = aggregate_claims(claims_history, as_of=as_of)
+        details = json.dumps(claims_history[:MAX_PROMPT_CLAIMS], indent=2)
+        if summary.count > MAX_PROMPT_CLAIMS:
+            details += f"\n(first {MAX_PROMPT_CLAIMS} of {summary.count} claims listed; the summary covers all of them)"
+        
+        prompt = f"""You are an insurance claims analyst. Analyze the following claims history and provide insights about risk patterns:
+
+Claims Summary:
+- Total Number of Claims: {summary.count}
+- Total Claim Amount: ${summary.total_amount:,}
+- Types of Claims: {', '.join(summary.claim_types)}
+- Claims in the Last 1/3/5 Years: {'/'.join(str(n) for n in summary.window_counts.values())}
+- Claims Details: {details}
+
+Provide 10 sentences analysis focusing on frequency, severity, and any concerning patterns."""
+
+        return self.query_llm(prompt)
+    
+    def fallback_analyze_claims(self, claims_history, as_of=None):
+        """Fallback claims analysis using rule-based logic"""
+        return render_claims_analysis(claims_history, as_of)
+
+
+class RiskFactorAgent(UnderwritingAgent):
+    profile_name = 'risk_factors'
+
+    def identify_risk_factors(self, applicant_data, claims_history, external_reports):
+        """Agent 3: Identify key risk factors - AI Mode"""
+        prompt = f"""You are a risk assessment specialist. Identify the top 3-5 key risk factors based on:
+
+Applicant: Age {applicant_data['age']}, {applicant_data['occupation']}, Health: {applicant_data['health_status']}
+Lifestyle: {applicant_data['lifestyle_factors']}
+Claims: {len(claims_history)} previous claims
+Credit Score: {external_reports['credit_score']}
+Criminal Record: {'Yes' if external_reports['criminal_record'] else 'No'}
+Driving Record: {external_reports['driving_record']}
+
+List the most significant risk factors in bullet points, each with a brief explanation."""
+
+        return self.query_llm(prompt)
+    
+    def fallback_identify_risk_factors(self, applicant_data, claims_history, external_reports):
+        """Fallback risk factor identification using rule-based logic"""
+        return render_risk_factors(applicant_data, claims_history, external_reports)
+
+
+class RecommendationAgent(UnderwritingAgent):
+    profile_name = 'recommendation'
+
+    def generate_recommendation(self, risk_score, risk_category, all_factors):
+        """Agent 4: Generate underwriting recommendation - AI Mode"""
+        prompt = f"""You are a senior underwriter. Based on the following risk assessment, provide a clear underwriting decision and recommendation:
+
+Risk Score: {risk_score}/100
+Risk Category: {risk_category}
+Key Factors: {all_factors}
+
+Provide:
+1. Clear decision (Approve/Approve with Conditions/Decline/Manual Review)
+2. Specific recommendations for premium adjustments or policy conditions
+3. Any additional steps needed
+
+Keep response concise and actionable (10 sentences).
+
+{SCHEMA_INSTRUCTIONS}"""
+
+        return self.query_llm(prompt)
+    
+    def generate_structured_recommendation(self, risk_score, risk_category, all_factors):
+        """Agent 4: Recommendation narrative plus machine-readable decision - AI Mode"""
+        response = self.generate_recommendation(risk_score, risk_category, all_factors)
+        if not response:
+            return None, None
+        return structure_recommendation(response, risk_score, risk_category)
+    
+    def fallback_structured_recommendation(self, risk_score, risk_category):
+        """Fallback machine-readable decision using rule-based logic"""
+        decision = rule_based_decision(risk_score, risk_category)
+        decision['source'] = 'rules'
+        return decision
+    
+    def fallback_generate_recommendation(self, risk_score, risk_category):
+        """Fallback recommendation using rule-based logic"""
+        return render_recommendation(risk_score, risk_category)
+
+
+def calculate_risk_score(applicant_data, claims_history, external_reports, temporal=None, as_of=None):
+    """Calculate numerical risk score (temporal adds the claim recency terms; defaults to TEMPORAL_SCORING)"""
+    risk_score = 50  
+    
+    if applicant_data['age'] < 25:
+        risk_score += 10
+    elif applicant_data['age'] > 65:
+        risk_score += 15
+    else:
+        risk_score -= 5
+    
+    total_claims = len(claims_history)
+    if total_claims > 3:
+        risk_score += 20
+    elif total_claims > 0:
+        risk_score += 10
+    else:
+        risk_score -= 10
+    
+    if applicant_data['health_status'] == 'Excellent':
+        risk_score -= 15
+    elif applicant_data['health_status'] == 'Poor':
+        risk_score += 25
+    
+    if 'Smoker' in applicant_data['lifestyle_factors']:
+        risk_score += 15
+    if 'High-risk sports' in applicant_data['lifestyle_factors']:
+        risk_score += 10
+    
+    if external_reports['credit_score'] < 600:
+        risk_score += 10
+    elif external_reports['credit_score'] > 750:
+        risk_score -= 5
+    
+    if external_reports['criminal_record']:
+        risk_score += 20
+    
+    if external_reports['driving_record'] != 'Clean':
+        risk_score += 5 
+    
+    if (TEMPORAL_SCORING if temporal is None else temporal) and claims_history:
+        from claims_temporal import temporal_features, temporal_score_adjustments
+        risk_score += int(temporal_score_adjustments(temporal_features([claims_history], as_of))[0])
+        
+    risk_score = max(0, min(100, risk_score))
+    
+    if risk_score < RISK_BOUNDARIES[0]:
+        risk_category = "Low Risk"
+        color_class = "risk-low"
+    elif risk_score < RISK_BOUNDARIES[1]:
+        risk_category = "Medium Risk"
+        color_class = "risk-medium"
+    else:
+        risk_category = "High Risk"
+        color_class = "risk-high"
+    
+    return risk_score, risk_category, color_class
+
+
+def create_routed_agent(agent_class, api_key, risk_score, risk_category):
+    """Instantiate an agent on the model picked by the router for this applicant"""
+    route_name, model_id = get_model_router().route(agent_class.profile_name, risk_score, risk_category)
+    return agent_class(api_key=api_key, model_id=model_id, route_name=route_name)
+
+
+AGENT_CLASSES = {
+    'applicant_summary': DataSummarizationAgent,
+    'claims_analysis': ClaimsAnalysisAgent,
+    'risk_factors': RiskFactorAgent,
+    'recommendation': RecommendationAgent
+}
+
+ANALYSIS_INPUTS = ('applicant_data', 'claims_history', 'external_reports')
+# as_of (ISO date) is a run input so that date-dependent nodes get a new fingerprint each day
+RUN_INPUTS = ANALYSIS_INPUTS + ('as_of',)
+INTERNAL_NODES = ('risk_assessment', 'gating')
+
+_registered_nodes = []
+
+
+def register_agent_node(node, modes=('ai', 'rules')):
+    """Add an extra agent (e.g. fraud or pricing) to the analysis graphs.
+
+    The node's output is returned under ``agent_outputs[node.name]``. It may
+    depend on the analysis inputs and on any built-in node (``risk_assessment``,
+    ``applicant_summary``, ``claims_analysis``, ``risk_factors``,
+    ``recommendation``) or on other registered nodes.
+    """
+    _registered_nodes.append((node, tuple(modes)))
+
+
+def registered_nodes(mode):
+    return [node for node, modes in _registered_nodes if mode in modes]
+
+
+def _risk_assessment_node():
+    return Node(
+        'risk_assessment',
+        lambda applicant_data, claims_history, external_reports, as_of: list(
+            calculate_risk_score(applicant_data, claims_history, external_reports, as_of=date.fromisoformat(as_of))
+        ),
+        inputs=RUN_INPUTS,
+        label="📊 Calculating risk score..."
+    )
+
+
+def _paced(fn, step_delay):
+    """Wrap a node function so it sleeps for ``step_delay`` after running"""
+    def run(**inputs):
+        try:
+            return fn(**inputs)
+        finally:
+            time.sleep(step_delay)
+    return run
+
+
+def build_ai_graph(api_key, step_delay=0.5):
+    """Agent graph for AI mode.
+
+    Each agent depends on the application fields it reads plus its own route
+    (model, or 'gated' when the confidence gate skips the call), so a small
+    edit only changes the fingerprints of the agents that see it. The three
+    analysis agents run in parallel; the recommendation waits for all of them.
+    """
+    key_salt = "ai:" + (hash_api_key(api_key) if api_key else "")
+
+    def route_node(output_key, agent_class):
+        def route(risk_assessment, gating):
+            if agent_class.profile_name in gating[1]:
+                return {'route': 'gated', 'model': None}
+            route_name, model_id = get_model_router().route(agent_class.profile_name, risk_assessment[0], risk_assessment[1])
+            return {'route': route_name, 'model': model_id}
+        return Node(f'{output_key}_route', route, inputs=('risk_assessment', 'gating'))
+
+    def gated_or_llm(agent_class, route, fallback, call):
+        agent = agent_class(api_key=api_key, model_id=route['model'], route_name=route['route'])
+        if route['route'] == 'gated':
+            return GATED_OUTPUT_PREFIX + fallback(agent)
+        output = call(agent)
+        time.sleep(step_delay)
+        return output
+
+    def summary(applicant_data, applicant_summary_route):
+        return gated_or_llm(DataSummarizationAgent, applicant_summary_route,
+                            lambda agent: agent.fallback_summarize(applicant_data),
+                            lambda agent: agent.summarize_applicant(applicant_data))
+
+    def claims(claims_history, as_of, claims_analysis_route):
+        as_of = date.fromisoformat(as_of)
+        return gated_or_llm(ClaimsAnalysisAgent, claims_analysis_route,
+                            lambda agent: agent.fallback_analyze_claims(claims_history, as_of),
+                            lambda agent: agent.analyze_claims(claims_history, as_of))
+
+    def risk_factors(applicant_data, claims_history, external_reports, risk_factors_route):
+        return gated_or_llm(RiskFactorAgent, risk_factors_route,
+                            lambda agent: agent.fallback_identify_risk_factors(applicant_data, claims_history, external_reports),
+                            lambda agent: agent.identify_risk_factors(applicant_data, claims_history, external_reports))
+
+    def recommendation(risk_assessment, recommendation_route, applicant_summary, claims_analysis, risk_factors):
+        risk_score, risk_category = risk_assessment[0], risk_assessment[1]
+        agent = RecommendationAgent(api_key=api_key, model_id=recommendation_route['model'], route_name=recommendation_route['route'])
+        if recommendation_route['route'] == 'gated':
+            return {
+                'text': GATED_OUTPUT_PREFIX + agent.fallback_generate_recommendation(risk_score, risk_category),
+                'decision': agent.fallback_structured_recommendation(risk_score, risk_category)
+            }
+        all_factors = f"Applicant Summary:\n{applicant_summary}\nClaims Analysis:\n{claims_analysis}\nRisk Factors:\n{risk_factors}"
+        text, decision = agent.generate_structured_recommendation(risk_score, risk_category, all_factors)
+        if not text:
+            return None
+        return {'text': text, 'decision': decision or agent.fallback_structured_recommendation(risk_score, risk_category)}
+
+    def recommendation_fallback(risk_assessment, **_):
+        agent = RecommendationAgent()
+        return {
+            'text': "LLM API Call Failed. Fallback Recommendation:\n" + agent.fallback_generate_recommendation(risk_assessment[0], risk_assessment[1]),
+            'decision': agent.fallback_structured_recommendation(risk_assessment[0], risk_assessment[1])
+        }
+
+    nodes = [
+        _risk_assessment_node(),
+        Node('gating', lambda risk_assessment: list(get_confidence_gate().evaluate(risk_assessment[0], risk_assessment[1])),
+             inputs=('risk_assessment',), cacheable=False, label="🚦 Checking confidence gate..."),
+        Node('applicant_summary', summary, inputs=('applicant_data', 'applicant_summary_route'),
+             fallback=lambda applicant_data, **_: "LLM API Call Failed. Fallback Summary:\n" + DataSummarizationAgent().fallback_summarize(applicant_data),
+             cache_salt=key_salt, label="🛡️ Agent 1: Summarizing applicant data..."),
+        Node('claims_analysis', claims, inputs=('claims_history', 'as_of', 'claims_analysis_route'),
+             fallback=lambda claims_history, as_of, **_: "LLM API Call Failed. Fallback Claims Analysis:\n" + ClaimsAnalysisAgent().fallback_analyze_claims(claims_history, date.fromisoformat(as_of)),
+             cache_salt=key_salt, label="🛡️ Agent 2: Analyzing claims history..."),
+        Node('risk_factors', risk_factors, inputs=ANALYSIS_INPUTS + ('risk_factors_route',),
+             fallback=lambda applicant_data, claims_history, external_reports, **_: "LLM API Call Failed. Fallback Risk Factors:\n" + RiskFactorAgent().fallback_identify_risk_factors(applicant_data, claims_history, external_reports),
+             cache_salt=key_salt, label="🛡️ Agent 3: Identifying risk factors..."),
+        Node('recommendation', recommendation, inputs=('risk_assessment', 'recommendation_route', 'applicant_summary', 'claims_analysis', 'risk_factors'),
+             fallback=recommendation_fallback, cache_salt=key_salt, label="🛡️ Agent 4: Generating recommendations...")
+    ]
+    nodes += [route_node(output_key, agent_class) for output_key, agent_class in AGENT_CLASSES.items()]
+    return AgentGraph(nodes + registered_nodes('ai'), run_inputs=RUN_INPUTS)
+
+
+def build_rules_graph(step_delay=0.1):
+    """Agent graph for rule-based mode (every node is deterministic and cacheable)"""
+    def recommendation(risk_assessment):
+        agent = RecommendationAgent()
+        return {
+            'text': agent.fallback_generate_recommendation(risk_assessment[0], risk_assessment[1]),
+            'decision': agent.fallback_structured_recommendation(risk_assessment[0], risk_assessment[1])
+        }
+
+    nodes = [
+        _risk_assessment_node(),
+        Node('applicant_summary', _paced(DataSummarizationAgent().fallback_summarize, step_delay),
+             inputs=('applicant_data',), label="🛡️ Agent 1: Summarizing applicant data..."),
+        Node('claims_analysis', _paced(lambda claims_history, as_of: ClaimsAnalysisAgent().fallback_analyze_claims(claims_history, date.fromisoformat(as_of)), step_delay),
+             inputs=('claims_history', 'as_of'), label="🛡️ Agent 2: Analyzing claims history..."),
+        Node('risk_factors', _paced(RiskFactorAgent().fallback_identify_risk_factors, step_delay),
+             inputs=ANALYSIS_INPUTS, label="🛡️ Agent 3: Identifying risk factors..."),
+        Node('recommendation', recommendation, inputs=('risk_assessment',), label="🛡️ Agent 4: Generating recommendations...")
+    ]
+    return AgentGraph(nodes + registered_nodes('rules'), run_inputs=RUN_INPUTS)
+
+
+def collect_agent_outputs(graph, outputs):
+    """Agent texts keyed by node name (built-in agents first, then registered nodes)"""
+    agent_outputs = {
+        'applicant_summary': outputs['applicant_summary'],
+        'claims_analysis': outputs['claims_analysis'],
+        'risk_factors': outputs['risk_factors'],
+        'recommendation': outputs['recommendation']['text']
+    }
+    for name in graph.nodes:
+        if name not in agent_outputs and name not in INTERNAL_NODES and not name.endswith('_route'):
+            agent_outputs[name] = outputs[name]
+    return agent_outputs
+
+
+def analyze_with_ai_agents(applicant_data, claims_history, external_reports, api_key, progress_callback=None, cancel_event=None, step_delay=0.5, previous_run=None, as_of=None):
+    """Orchestrate multi-agent analysis - AI Mode (step_delay paces the agent calls for the UI)
+
+    previous_run is the 'node_memo' of an earlier result for the same session;
+    agents whose inputs are unchanged reuse their earlier output. as_of is the
+    reference date for claim recency (default today).
+    """
+    as_of = as_of or date.today()
+    
+    # The deterministic score drives model routing, so it is known before any client is needed
+    risk_score, risk_category, color_class = calculate_risk_score(applicant_data, claims_history, external_reports, as_of=as_of)
+    router = get_model_router()
+    model_ids = {router.route(agent_class.profile_name, risk_score, risk_category)[1] for agent_class in AGENT_CLASSES.values()}
+    
+    if not any(get_llm_client(api_key, model_id) for model_id in model_ids):
+        return analyze_with_fallback(applicant_data, claims_history, external_reports, fallback_only=True, step_delay=min(step_delay, 0.1), previous_run=previous_run, as_of=as_of)
+
+    graph = build_ai_graph(api_key, step_delay)
+    inputs = {'applicant_data': applicant_data, 'claims_history': claims_history, 'external_reports': external_reports, 'as_of': as_of.isoformat()}
+    run = graph.run(inputs, cache=node_cache, previous=previous_run, progress_callback=progress_callback, cancel_event=cancel_event)
+    gate_rule, skipped_agents = run.outputs['gating']
+    claims_summary = aggregate_claims(claims_history, as_of=as_of)
+    
+    return {
+        'risk_score': risk_score,
+        'risk_category': risk_category,
+        'color_class': color_class,
+        'agent_outputs': collect_agent_outputs(graph, run.outputs),
+        'decision': run.outputs['recommendation']['decision'],
+        'pricing': premium_quote(applicant_data, external_reports, risk_score, risk_category),
+        'total_claims': claims_summary.count,
+        'total_claim_amount': claims_summary.total_amount,
+        'claims_summary': claims_summary.to_dict(),
+        'claims_temporal': claims_temporal_features(claims_history, as_of),
+        'mode': 'AI Mode',
+        'analysis_id': uuid.uuid4().hex,
+        'analyzed_at': datetime.now().isoformat(),
+        'rules_version': rules_version(),
+        'model_routes': {output_key: run.outputs[f'{output_key}_route'] for output_key in AGENT_CLASSES},
+        'gating': {
+            'rule': gate_rule,
+            'boundary_margin': boundary_margin(risk_score),
+            'skipped_agents': sorted(skipped_agents),
+            'llm_calls': 4 - len(skipped_agents)
+        },
+        'trace': run.trace,
+        'node_memo': run.memo
+    }
+
+
+def analyze_with_fallback(applicant_data, claims_history, external_reports, fallback_only=False, step_delay=0.1, previous_run=None, as_of=None):
+    """Orchestrate multi-agent analysis - Fallback Mode (Rule-Based; step_delay paces the steps for the UI)"""
+    as_of = as_of or date.today()
+    
+    graph = build_rules_graph(step_delay)
+    inputs = {'applicant_data': applicant_data, 'claims_history': claims_history, 'external_reports': external_reports, 'as_of': as_of.isoformat()}
+    run = graph.run(inputs, cache=node_cache, previous=previous_run)
+    risk_score, risk_category, color_class = run.outputs['risk_assessment']
+    claims_summary = aggregate_claims(claims_history, as_of=as_of)
+    
+    mode_label = 'Rule-based Mode (Fallback Only)' if fallback_only else 'Rule-based Mode'
+    return {
+        'risk_score': risk_score,
+        'risk_category': risk_category,
+        'color_class': color_class,
+        'agent_outputs': collect_agent_outputs(graph, run.outputs),
+        'decision': run.outputs['recommendation']['decision'],
+        'pricing': premium_quote(applicant_data, external_reports, risk_score, risk_category),
+        'total_claims': claims_summary.count,
+        'total_claim_amount': claims_summary.total_amount,
+        'claims_summary': claims_summary.to_dict(),
+        'claims_temporal': claims_temporal_features(claims_history, as_of),
+        'mode': mode_label,
+        'analysis_id': uuid.uuid4().hex,
+        'analyzed_at': datetime.now().isoformat(),
+        'rules_version': rules_version(),
+        'trace': run.trace,
+        'node_memo': run.memo
+    }
+
+
+def premium_quote(applicant_data, external_reports, risk_score, risk_category):
+    """Priced premium breakdown for the applicant from the process rate tables"""
+    factors = policy_factors(applicant_data, external_reports)
+    return get_rate_tables().quote(risk_score, risk_category, applicant_data.get('coverage_amount', 0), factors)
+
+
+def rules_version():
+    """RULES_VERSION, marked when the category cutoffs are not the defaults or the opt-in temporal score terms are on"""
+    version = RULES_VERSION
+    if tuple(RISK_BOUNDARIES) != DEFAULT_RISK_BOUNDARIES:
+        version += "+cutoffs-{:g}-{:g}".format(*RISK_BOUNDARIES)
+    return version + ("+temporal" if TEMPORAL_SCORING else "")
+
+
+def claims_temporal_features(claims_history, as_of=None):
+    """Recency features of one claim history (NumPy is imported on first use)"""
+    from claims_temporal import claims_temporal_features as features
+    return features(claims_history, as_of)
+
+
+def analysis_time(results):
+    """Timestamp captured when the analysis ran (results from older sessions fall back to now)"""
+    if results.get('analyzed_at'):
+        return datetime.fromisoformat(results['analyzed_at'])
+    return datetime.now()
+
+
+def report_content_hash(results, applicant_data, claims_history, external_reports):
+    """Stable hash of everything that goes into a report"""
+    content = json.dumps(
+        [results, applicant_data, claims_history, external_reports],
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def generate_json_report(results, applicant_data):
+    """Generate the JSON report"""
+    json_report = {
+        'timestamp': analysis_time(results).isoformat(),
+        'analysis_mode': results['mode'],
+        'applicant': applicant_data,
+        'risk_assessment': {
+            'risk_score': results['risk_score'],
+            'risk_category': results['risk_category'],
+            'total_claims': results['total_claims'],
+            'total_claim_amount': results['total_claim_amount'],
+            'decision': results.get('decision'),
+            'pricing': results.get('pricing')
+        },
+        'agent_outputs': results['agent_outputs']
+    }
+    return json.dumps(json_report, indent=2)
+
+
+def generate_text_report(results, applicant_data, claims_history, external_reports):
+    """Generate a detailed text report"""
+    timestamp = analysis_time(results).strftime("%Y-%m-%d %H:%M:%S")
+    rule = '=' * 80
+    agent_rule = '-' * 80
+    agent_outputs = results['agent_outputs']
+    
+    def section(title):
+        lines.extend([rule, title, rule, ""])
+    
+    lines = [""]
+    section("INSURANCE UNDERWRITING RISK ASSESSMENT REPORT")
+    lines.extend([
+        "REPORT METADATA",
+        f"Generated: {timestamp}",
+        f"Analysis Mode: {results['mode']}",
+        f"Applicant: {applicant_data.get('name', 'N/A')}",
+        ""
+    ])
+    
+    section("EXECUTIVE SUMMARY")
+    lines.extend([
+        f"Risk Score: {results['risk_score']}/100",
+        f"Risk Category: {results['risk_category']}",
+        f"Total Claims on Record: {results['total_claims']}",
+        f"Total Claim Amount: ${results['total_claim_amount']:,}",
+        ""
+    ])
+    
+    section("APPLICANT INFORMATION")
+    lines.extend([
+        f"Name: {applicant_data.get('name', 'N/A')}",
+        f"Age: {applicant_data.get('age', 'N/A')} years old",
+        f"Occupation: {applicant_data.get('occupation', 'N/A')}",
+        f"Location: {applicant_data.get('location', 'N/A')}",
+        f"Requested Coverage: ${applicant_data.get('coverage_amount', 0):,}",
+        f"Health Status: {applicant_data.get('health_status', 'N/A')}",
+        f"Lifestyle Factors: {applicant_data.get('lifestyle_factors', 'N/A')}",
+        ""
+    ])
+    
+    section("EXTERNAL REPORTS")
+    lines.extend([
+        f"Credit Score: {external_reports.get('credit_score', 'N/A')}",
+        f"Criminal Record: {'Yes' if external_reports.get('criminal_record') else 'No'}",
+        f"Driving Record: {external_reports.get('driving_record', 'N/A')}",
+        ""
+    ])
+    
+    section("CLAIMS HISTORY")
+    lines.extend([
+        f"Total Claims: {results['total_claims']}",
+        f"Total Claim Amount: ${results['total_claim_amount']:,}",
+        ""
+    ])
+    
+    if claims_history:
+        lines.append("Detailed Claims:")
+        for i, claim in enumerate(claims_history, 1):
+            lines.extend([
+                "",
+                f"Claim {i}:",
+                f"  Type: {claim['type']}",
+                f"  Amount: ${claim['amount']:,}",
+                f"  Date: {claim['date']}"
+            ])
+    else:
+        lines.append("No previous claims on record.")
+    lines.append("")
+    
+    section("STRUCTURED DECISION")
+    lines.extend(format_decision(results['decision']) if results.get('decision') else ["N/A"])
+    lines.append("")
+    
+    section("PREMIUM QUOTE")
+    lines.extend(format_quote(results['pricing']) if results.get('pricing') else ["N/A"])
+    lines.append("")
+    
+    section("AI AGENT ANALYSIS OUTPUTS")
+    for title, output_key in [
+        ("AGENT 1: APPLICANT DATA SUMMARIZATION", 'applicant_summary'),
+        ("AGENT 2: CLAIMS HISTORY ANALYSIS", 'claims_analysis'),
+        ("AGENT 3: RISK FACTOR IDENTIFICATION", 'risk_factors'),
+        ("AGENT 4: UNDERWRITING RECOMMENDATION", 'recommendation')
+    ]:
+        lines.extend([title, agent_rule, agent_outputs.get(output_key, 'N/A'), ""])
+    
+    lines.extend([rule, "END OF REPORT", rule, ""])
+    return "\n".join(lines)